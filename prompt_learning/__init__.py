@@ -0,0 +1,49 @@
+"""Prompt learning: optimize a system prompt from LLM-judge feedback.
+
+    from prompt_learning import optimize_loop, load_datasets
+
+Names are resolved on first access, so importing the package does not import
+phoenix, pandas or scikit-learn.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "load_datasets": "core",
+    "get_query_corpus": "core",
+    "evaluate_corpus": "core",
+    "optimize_loop": "core",
+    "run_multi_rule_experiments": "core",
+    "resume_experiment": "core",
+    "online_prompt_learning": "core",
+    "evaluate_output": "core",
+    "rule_checker": "core",
+    "fused_judge": "core",
+    "generate_output": "core",
+    "generate_outputs": "core",
+    "compute_metric": "core",
+    "save_experiment_results": "core",
+    "run_single_experiment": "core",
+    "run_rule_sweep": "core",
+    "run_parallel_experiments": "parallel_runner",
+    "ResultsStore": "results_store",
+    "QueryCorpus": "query_corpus",
+    "RunCheckpoint": "checkpoint",
+    "LLMResponseCache": "llm_cache",
+    "AdaptiveScheduler": "rate_limiter",
+    "Tracer": "instrumentation",
+    "OnlinePromptLearner": "online_learning",
+    "JsonlTailSource": "online_learning",
+    "QueueSource": "online_learning",
+    "make_model": "llm_client",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
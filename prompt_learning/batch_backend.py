@@ -0,0 +1,205 @@
+"""Batch-API execution backend for generation and judging.
+
+For large offline runs (nightly multi-rule sweeps) latency doesn't matter, so
+instead of thousands of synchronous llm_generate requests, run_batch renders
+every row's request into a JSONL batch file, submits it to a batch endpoint,
+polls until it completes and maps the results back to DataFrame rows through
+the same output parsers llm_generate uses. Rows already in the response cache
+are answered locally and never submitted.
+
+OpenAIBatchClient talks to the OpenAI Batch API; LocalBatchClient is a
+file-based stand-in answering with the mock endpoint's canned responses, for
+testing without an API key.
+"""
+
+import json
+import os
+import time
+import uuid
+
+from .templates import render_column
+
+ENDPOINT = "/v1/chat/completions"
+MAX_REQUESTS_PER_BATCH = 50_000  # OpenAI Batch API limit per input file
+_FAILED_STATUSES = ("failed", "expired", "cancelled")
+
+
+def build_request(custom_id, model_name, model_kwargs, prompt, instruction=None):
+    """One chat-completions request line in the Batch API input format."""
+    messages = [{"role": "system", "content": instruction}] if instruction else []
+    messages.append({"role": "user", "content": prompt})
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": ENDPOINT,
+        "body": {"model": model_name, "messages": messages, **(model_kwargs or {})},
+    }
+
+
+def response_content(result):
+    """Message text of one Batch API output line, None if the request failed."""
+    response = result.get("response") or {}
+    if result.get("error") or response.get("status_code") != 200:
+        return None
+    choices = (response.get("body") or {}).get("choices") or []
+    return choices[0]["message"]["content"] if choices else None
+
+
+class OpenAIBatchClient:
+    """
+    Submit and collect batches through the OpenAI Batch API.
+
+    Args:
+        client: openai.Client
+        completion_window: how long the API may take to complete a batch
+    """
+
+    def __init__(self, client, completion_window="24h"):
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, input_path):
+        with open(input_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                lines.extend(self.client.files.content(file_id).text.splitlines())
+        return [json.loads(line) for line in lines if line.strip()]
+
+
+class LocalBatchClient:
+    """
+    File-based stand-in for the Batch API.
+
+    Batches are copied into directory and answered by mock_openai_server's canned
+    responses the first time their status is polled.
+
+    Args:
+        directory: where submitted batches and their outputs are kept
+        config: optional mock_openai_server.MockConfig (latency is not simulated)
+    """
+
+    def __init__(self, directory, config=None):
+        from .mock_openai_server import MockConfig
+
+        self.directory = directory
+        self.config = config or MockConfig(latency_median=0)
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, batch_id, name):
+        return os.path.join(self.directory, f"{batch_id}.{name}.jsonl")
+
+    def submit(self, input_path):
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        with open(input_path) as src, open(self._path(batch_id, "input"), "w") as dst:
+            dst.write(src.read())
+        return batch_id
+
+    def status(self, batch_id):
+        from .mock_openai_server import _completion_body, mock_completion
+
+        if not os.path.exists(self._path(batch_id, "output")):
+            with open(self._path(batch_id, "input")) as f:
+                requests = [json.loads(line) for line in f if line.strip()]
+            with open(self._path(batch_id, "output"), "w") as f:
+                for request in requests:
+                    _, content = mock_completion(request["body"], self.config)
+                    f.write(json.dumps({
+                        "custom_id": request["custom_id"],
+                        "response": {"status_code": 200, "body": _completion_body(request["body"], content)},
+                        "error": None,
+                    }) + "\n")
+        return "completed"
+
+    def results(self, batch_id):
+        with open(self._path(batch_id, "output")) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+def _wait(client, batch_id, poll_interval, timeout):
+    start = time.monotonic()
+    while True:
+        status = client.status(batch_id)
+        if status == "completed":
+            return
+        if status in _FAILED_STATUSES:
+            raise RuntimeError(f"Batch {batch_id} ended with status {status}")
+        if timeout is not None and time.monotonic() - start > timeout:
+            raise TimeoutError(f"Batch {batch_id} still {status} after {timeout}s")
+        time.sleep(poll_interval)
+
+
+def run_batch(dataframe, template, model_name, model_kwargs=None, output_parser=None, instruction=None,
+              client=None, work_dir=".cache/batches", poll_interval=30, timeout=None, cache=None):
+    """
+    Drop-in for llm_generate that runs every request through a batch endpoint.
+
+    Args:
+        dataframe: rows to render template with
+        template: prompt template with {column} variables
+        model_name: model to request
+        model_kwargs: extra request parameters (response_format, temperature, ...)
+        output_parser: parser(response, row_index) -> dict, as for llm_generate
+        instruction: optional system instruction sent with every request
+        client: OpenAIBatchClient or LocalBatchClient
+        work_dir: where batch input files are written
+        poll_interval: seconds between status checks
+        timeout: seconds to wait for a batch before giving up, None to wait for the completion window
+        cache: optional LLMResponseCache; cached rows are not submitted and new responses are stored
+
+    Returns:
+        DataFrame indexed like dataframe, with an "output" column or the parser's columns
+    """
+    import pandas as pd
+    from .llm_cache import cache_key
+
+    os.makedirs(work_dir, exist_ok=True)
+    prompts = render_column(template, dataframe)
+    responses = [None] * len(prompts)
+
+    pending = []
+    for i, prompt in enumerate(prompts):
+        cached = cache.get(cache_key(model_name, model_kwargs, prompt, instruction)) if cache is not None else None
+        if cached is not None:
+            responses[i] = cached
+        else:
+            pending.append(i)
+
+    for start in range(0, len(pending), MAX_REQUESTS_PER_BATCH):
+        chunk = pending[start:start + MAX_REQUESTS_PER_BATCH]
+        input_path = os.path.join(work_dir, f"requests-{uuid.uuid4().hex[:12]}.jsonl")
+        with open(input_path, "w") as f:
+            for i in chunk:
+                f.write(json.dumps(build_request(str(i), model_name, model_kwargs, prompts[i], instruction)) + "\n")
+
+        batch_id = client.submit(input_path)
+        print(f"📦 Submitted batch {batch_id} with {len(chunk)} {model_name} requests")
+        _wait(client, batch_id, poll_interval, timeout)
+        for result in client.results(batch_id):
+            i = int(result["custom_id"])
+            responses[i] = response_content(result)
+            if cache is not None and responses[i]:
+                cache.set(cache_key(model_name, model_kwargs, prompts[i], instruction), responses[i], model=model_name)
+        print(f"✅ Batch {batch_id} completed")
+
+    failed = sum(response is None for response in responses)
+    if failed:
+        print(f"⚠️ {failed}/{len(responses)} batch requests returned no response")
+
+    if output_parser is None:
+        return pd.DataFrame({"output": responses}, index=dataframe.index)
+    parsed = [output_parser(response, i) if response is not None else {} for i, response in enumerate(responses)]
+    return pd.DataFrame(parsed, index=dataframe.index)
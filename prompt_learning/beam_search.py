@@ -0,0 +1,99 @@
+"""Beam search over candidate prompts for optimize_loop.
+
+Instead of following a single chain of one optimize() call per loop, each
+loop expands every prompt of the beam into candidate prompts - one per
+feedback subset - scores them together with the current beam on a train
+mini-batch, and keeps the best few. The optimizer calls run in threads and the candidates are scored in one
+concurrent pipeline pass, so the extra candidates mostly use concurrency that
+would otherwise sit idle.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+def feedback_subsets(feedback_df, k, fraction=0.7, seed=0):
+    """The full feedback plus k-1 seeded random subsets of it, one per candidate."""
+    subsets = [feedback_df]
+    for i in range(1, k):
+        subsets.append(feedback_df.sample(frac=fraction, random_state=seed + i))
+    return subsets
+
+
+def candidates_per_member(k, members):
+    """Split k candidates as evenly as possible across the beam members, best members first."""
+    return [k // members + (i < k % members) for i in range(members)]
+
+
+def propose_candidates(make_optimizer, prompts, feedback_df, feedback_columns, k, fraction=0.7, seed=0,
+                       context_size_k=128000):
+    """
+    Ask the meta-prompt optimizer for k candidate prompts, spread over the given prompts.
+
+    Each prompt is expanded into its share of the k candidates, each from a different
+    feedback subset; all optimize() calls run concurrently.
+
+    Args:
+        make_optimizer: function(prompt) -> MetaPromptOptimizer
+        prompts: prompts to expand, best first (a single prompt string is also accepted)
+        feedback_df: train rows with "output" and the feedback columns
+        feedback_columns: columns passed to optimize()
+        k: number of candidates
+        fraction: share of feedback rows in each subset after the first
+        seed: base seed of the subsets
+
+    Returns:
+        list of distinct candidate prompts (may be shorter than k)
+    """
+    if isinstance(prompts, str):
+        prompts = [prompts]
+    counts = candidates_per_member(k, min(k, len(prompts)))
+    jobs = [
+        (prompt, subset)
+        for i, (prompt, count) in enumerate(zip(prompts, counts))
+        for subset in feedback_subsets(feedback_df, count, fraction, seed + i * k)
+    ]
+
+    def optimize(job):
+        prompt, subset = job
+        return make_optimizer(prompt).optimize(
+            subset,
+            "output",
+            feedback_columns=feedback_columns,
+            context_size_k=context_size_k
+        )
+
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        candidates = list(pool.map(optimize, jobs))
+    return list(dict.fromkeys(candidates))
+
+
+def select_beam(prompts, scores, width):
+    """The width best (prompt, score) pairs, best first; ties keep the earlier prompt."""
+    ranked = sorted(enumerate(zip(prompts, scores)), key=lambda item: (-item[1][1], item[0]))
+    return [pair for _, pair in ranked[:width]]
+
+
+def beam_step(beam, make_optimizer, feedback_df, feedback_columns, score_prompts, k, width,
+              fraction=0.7, seed=0, context_size_k=128000):
+    """
+    Expand every prompt of the beam, k candidates in total, and keep the best width prompts.
+
+    Each beam member gets about k / len(beam) candidates (the better members get the
+    remainder). The feedback is the train evaluation of the best prompt, beam[0].
+
+    Args:
+        beam: list of prompts from the previous loop, best first
+        score_prompts: function(list of prompts) -> list of scores, evaluated concurrently
+        k: candidates requested from the optimizer
+        width: prompts kept in the beam
+
+    Returns:
+        new beam as a list of (prompt, score) pairs, best first
+    """
+    candidates = propose_candidates(
+        make_optimizer, list(beam), feedback_df, feedback_columns, k,
+        fraction=fraction, seed=seed, context_size_k=context_size_k
+    )
+    # Previous beam members compete again, so a worse candidate cannot displace them.
+    prompts = list(dict.fromkeys(candidates + list(beam)))
+    return select_beam(prompts, score_prompts(prompts), width)
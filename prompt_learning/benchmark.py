@@ -0,0 +1,200 @@
+"""End-to-end throughput benchmark against the local mock endpoint.
+
+Runs the pipeline stages (generate + judge, the llm_generate evaluators, or a
+full optimize_loop / run_multi_rule_experiments) against mock_openai_server
+for every combination of sample count, rule count and concurrency, and
+reports rows/sec, p50/p95 latency, request counts and peak memory.
+
+    prompt-learning bench --samples 50 200 --rule-counts 10 100 --concurrency 8 32
+    python -m prompt_learning.benchmark --mode loop --output bench.jsonl --baseline bench_baseline.jsonl
+
+With --baseline, the run fails (exit code 1) when any configuration's rows/sec
+drops more than --tolerance below the baseline, so it can guard CI.
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+from .mock_openai_server import MockConfig, start_mock_server
+
+MODES = ("stages", "evaluators", "loop", "multi")
+
+
+def synthetic_queries(num_samples, seed=0):
+    """Offline stand-in for queries.csv."""
+    import pandas as pd
+
+    subjects = ["bakery", "law firm", "running shoes store", "photography portfolio", "tech conference",
+                "yoga studio", "bookshop", "SaaS pricing page", "travel blog", "dental clinic"]
+    return pd.DataFrame({
+        "input": [
+            f"Create a landing page for a {subjects[(i + seed) % len(subjects)]} with a hero image, "
+            f"{2 + i % 8} featured products and a contact form."
+            for i in range(num_samples)
+        ]
+    })
+
+
+def _run_mode(run, mode, dataset, num_rules, loops):
+    if mode == "stages":
+        run.generate_and_evaluate(dataset, run.system_prompt, num_rules)
+        return len(dataset)
+    if mode == "evaluators":
+        dataset = dataset.copy()
+        generated = run.generate_outputs(dataset, run.system_prompt)
+        dataset["output"] = generated["output"]
+        dataset["generation_abort"] = generated["generation_abort"]
+        run.evaluate_output(dataset, num_rules)
+        run.rule_checker(dataset, num_rules)
+        return len(dataset)
+    train_set = dataset.sample(frac=run.TRAIN_SPLIT_FRACTION, random_state=42)
+    test_set = dataset.drop(train_set.index)
+    if mode == "loop":
+        run.optimize_loop(
+            train_set, test_set, run.system_prompt, [run.evaluate_output, run.rule_checker],
+            threshold=1.1, loops=loops, num_rules=num_rules
+        )
+    else:
+        run.run_multi_rule_experiments(
+            train_set, test_set, run.system_prompt, rule_counts=[num_rules], threshold=1.1, loops=loops
+        )
+    # Every loop generates and judges train rows twice and test rows once.
+    return len(test_set) + loops * (2 * len(train_set) + len(test_set))
+
+
+def run_benchmark(mode, samples, rule_counts, concurrency_levels, loops, mock_config, streaming_generation=False):
+    server, base_url = start_mock_server(config=mock_config)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = "mock"
+
+    from . import core as run
+    from .rate_limiter import AdaptiveScheduler
+
+    # Measure the raw pipeline: no response cache, fresh scheduler per configuration.
+    run.llm_cache = None
+    run.STREAMING_GENERATION = streaming_generation
+    # Nothing is written to the working directory, and every row counted below is really generated and judged.
+    run.RESULTS_STORE_PATH = None
+    run.INSTRUMENTATION_PATH = None
+    run.tracer = None
+    run.INCREMENTAL_EVALUATION = False
+    run.SEQUENTIAL_TEST_EVALUATION = False
+    run.TRAIN_MINIBATCH_SIZE = 0
+    run.BEAM_CANDIDATES = 0
+    results = []
+    try:
+        for num_samples in samples:
+            dataset = synthetic_queries(num_samples)
+            for num_rules in rule_counts:
+                for concurrency in concurrency_levels:
+                    run.MAX_CONCURRENCY = concurrency
+                    run.scheduler = AdaptiveScheduler(
+                        rate_limits={},
+                        max_concurrency=concurrency,
+                        initial_concurrency=concurrency,
+                    )
+                    mock_config.reset()
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    rows = _run_mode(run, mode, dataset, num_rules, loops)
+                    elapsed = time.perf_counter() - start
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+
+                    server_stats = mock_config.stats()
+                    result = {
+                        "mode": mode,
+                        "num_samples": num_samples,
+                        "num_rules": num_rules,
+                        "concurrency": concurrency,
+                        "rows": rows,
+                        "seconds": round(elapsed, 3),
+                        "rows_per_sec": round(rows / elapsed, 3) if elapsed else None,
+                        "latency_p50": round(server_stats["latency_p50"], 4),
+                        "latency_p95": round(server_stats["latency_p95"], 4),
+                        "requests": server_stats["requests"],
+                        "requests_by_kind": server_stats["by_kind"],
+                        "peak_traced_mb": round(peak / 2 ** 20, 2),
+                        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+                    }
+                    results.append(result)
+                    print(f"⏱️ {mode} samples={num_samples} rules={num_rules} concurrency={concurrency}: "
+                          f"{result['rows_per_sec']} rows/s, p50 {result['latency_p50']}s, "
+                          f"p95 {result['latency_p95']}s, {result['requests']} requests, "
+                          f"peak {result['peak_traced_mb']} MB")
+    finally:
+        server.shutdown()
+    return results
+
+
+def _config_key(result):
+    return (result["mode"], result["num_samples"], result["num_rules"], result["concurrency"])
+
+
+def check_regressions(results, baseline_path, tolerance):
+    """Return the configurations whose rows/sec fell more than tolerance below the baseline."""
+    with open(baseline_path) as f:
+        baseline = {_config_key(r): r for r in map(json.loads, f) if r.get("rows_per_sec")}
+    regressions = []
+    for result in results:
+        reference = baseline.get(_config_key(result))
+        if reference and result["rows_per_sec"] < reference["rows_per_sec"] * (1 - tolerance):
+            regressions.append((result, reference))
+    return regressions
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Benchmark the prompt-learning pipeline against a local mock endpoint")
+    parser.add_argument("--mode", choices=MODES, default="stages")
+    parser.add_argument("--samples", type=int, nargs="+", default=[50])
+    parser.add_argument("--rule-counts", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--loops", type=int, default=1, help="optimization loops for --mode loop/multi")
+    parser.add_argument("--latency-median", type=float, default=0.2)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--rate-limit-fraction", type=float, default=0.0)
+    parser.add_argument("--runaway-fraction", type=float, default=0.0,
+                        help="share of generations that never close their JSON")
+    parser.add_argument("--streaming-generation", action="store_true",
+                        help="stream generations and abort invalid JSON early (STREAMING_GENERATION)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="append results as JSON lines to this file")
+    parser.add_argument("--baseline", help="JSON lines from a previous run to compare rows/sec against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed rows/sec drop vs. baseline")
+    args = parser.parse_args(argv)
+
+    mock_config = MockConfig(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        rate_limit_fraction=args.rate_limit_fraction,
+        runaway_fraction=args.runaway_fraction,
+        seed=args.seed,
+    )
+    results = run_benchmark(
+        args.mode, args.samples, args.rule_counts, args.concurrency, args.loops, mock_config,
+        streaming_generation=args.streaming_generation
+    )
+
+    if args.output:
+        with open(args.output, "a") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+        print(f"✅ Results saved to {args.output}")
+
+    if args.baseline:
+        regressions = check_regressions(results, args.baseline, args.tolerance)
+        for result, reference in regressions:
+            print(f"❌ Regression: {_config_key(result)} {result['rows_per_sec']} rows/s "
+                  f"vs baseline {reference['rows_per_sec']} rows/s")
+        if regressions:
+            sys.exit(1)
+        print("✅ No throughput regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Per-stage checkpoints for optimize_loop and run_multi_rule_experiments.
+
+Every stage of a run (test evaluation, train generation, each evaluator,
+optimize, post-optimization train evaluation) stores its result in the run
+directory as soon as it finishes. Re-running with the same directory replays
+the run: finished stages are loaded from disk instead of recomputed, so a
+crash in loop 4 only costs the stage that was in flight.
+
+A run directory belongs to one run: start() refuses to replay it with a
+different configuration or different inputs. State that lives outside the
+stages (the verdict memo, the train sampler) is registered with track(); it
+is saved after every computed stage and restored when a replay reaches that
+stage, so a resumed run continues exactly where the crashed one stopped.
+
+Files are written to a temporary name and moved into place with os.replace,
+so a crash mid-write never leaves a truncated checkpoint behind.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from datetime import datetime
+
+
+def _atomic_write(path, data):
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def fingerprint(value):
+    """Content hash of run inputs: DataFrames, strings and numbers, nested in dicts and lists."""
+    digest = hashlib.sha256()
+
+    def feed(item):
+        if hasattr(item, "columns") and hasattr(item, "index"):
+            import pandas as pd
+
+            digest.update(json.dumps([str(col) for col in item.columns]).encode("utf-8"))
+            try:
+                digest.update(pd.util.hash_pandas_object(item, index=True).values.tobytes())
+            except TypeError:  # unhashable cells, e.g. lists
+                digest.update(item.to_json(orient="split", default_handler=str).encode("utf-8"))
+        elif isinstance(item, dict):
+            for key in sorted(item, key=str):
+                digest.update(repr(key).encode("utf-8"))
+                feed(item[key])
+        elif isinstance(item, (list, tuple)):
+            for element in item:
+                feed(element)
+        else:
+            digest.update(repr(item).encode("utf-8"))
+        digest.update(b"\0")
+
+    feed(value)
+    return digest.hexdigest()
+
+
+class RunCheckpoint:
+    """
+    Stage results of one run, stored as pickles in run_dir with a JSON manifest.
+
+    Args:
+        run_dir: directory for this run (created if missing)
+    """
+
+    MANIFEST = "manifest.json"
+    STATE = "state.pkl"
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        self._tracked = {}
+        os.makedirs(run_dir, exist_ok=True)
+
+    def _path(self, stage):
+        return os.path.join(self.run_dir, stage.replace("/", "__") + ".pkl")
+
+    def manifest(self):
+        path = os.path.join(self.run_dir, self.MANIFEST)
+        if not os.path.exists(path):
+            return {"stages": []}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest):
+        _atomic_write(
+            os.path.join(self.run_dir, self.MANIFEST),
+            json.dumps(manifest, indent=2, default=str).encode("utf-8"),
+        )
+
+    def has(self, stage):
+        return os.path.exists(self._path(stage))
+
+    def save(self, stage, value):
+        _atomic_write(self._path(stage), pickle.dumps(value))
+        if self._tracked:
+            state = {name: vars(obj) for name, obj in self._tracked.items()}
+            _atomic_write(os.path.join(self.run_dir, self.STATE), pickle.dumps({"stage": stage, "objects": state}))
+        manifest = self.manifest()
+        manifest["stages"] = [s for s in manifest["stages"] if s["stage"] != stage]
+        manifest["stages"].append({"stage": stage, "completed_at": datetime.now().isoformat()})
+        self._write_manifest(manifest)
+
+    def load(self, stage):
+        with open(self._path(stage), "rb") as f:
+            return pickle.load(f)
+
+    def stage(self, stage, compute):
+        """Return the stored result of stage, or compute and store it."""
+        if self.has(stage):
+            print(f"⏭️ Loaded checkpoint: {stage}")
+            value = self.load(stage)
+            self._restore(stage)
+            return value
+        value = compute()
+        self.save(stage, value)
+        return value
+
+    def wrap_evaluator(self, stage, evaluator):
+        """Checkpoint an evaluator(dataset) -> (dataset, columns) under stage."""
+        def checkpointed(dataset):
+            return self.stage(stage, lambda: evaluator(dataset))
+
+        checkpointed.__name__ = getattr(evaluator, "__name__", "evaluator")
+        return checkpointed
+
+    def track(self, **objects):
+        """
+        Register objects whose attributes are saved after every computed stage.
+
+        When a replay loads the stage that was computed last, their attributes are restored
+        to what they were right after it. None values are ignored.
+        """
+        self._tracked.update({name: obj for name, obj in objects.items() if obj is not None})
+
+    def _restore(self, stage):
+        path = os.path.join(self.run_dir, self.STATE)
+        if not self._tracked or not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state["stage"] != stage:
+            return
+        for name, attributes in state["objects"].items():
+            if name in self._tracked:
+                vars(self._tracked[name]).update(attributes)
+
+    def start(self, inputs, **info):
+        """
+        Record a run's configuration and inputs, or check them against the ones stored in run_dir.
+
+        Raises:
+            ValueError: run_dir already holds a run with a different configuration or inputs
+        """
+        info = json.loads(json.dumps(info, default=str))
+        info["inputs"] = fingerprint(inputs)
+        manifest = self.manifest()
+        if "inputs" not in manifest and self.has("inputs"):
+            manifest["inputs"] = fingerprint(self.load("inputs"))
+        changed = sorted(key for key, value in info.items() if key in manifest and manifest[key] != value)
+        if changed:
+            raise ValueError(
+                f"{self.run_dir} holds a run with different {', '.join(changed)}; "
+                f"use a new run directory, or resume_experiment({self.run_dir!r}) to continue that run"
+            )
+        self.set_info(**info)
+        self.stage("inputs", lambda: inputs)
+
+    def set_info(self, **info):
+        """Record run-level information (configuration, kind of run) in the manifest."""
+        manifest = self.manifest()
+        manifest.update(info)
+        self._write_manifest(manifest)
+
+    def last_stage(self):
+        stages = self.manifest()["stages"]
+        return stages[-1]["stage"] if stages else None
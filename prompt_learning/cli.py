@@ -0,0 +1,140 @@
+"""Command-line entry point.
+
+    prompt-learning run --num-rules 50 --loops 5 --run-dir runs/exp1
+    prompt-learning sweep --rule-counts 10 50 100 --workers 3 --seeds 1 2
+    prompt-learning resume runs/exp1
+    prompt-learning online traces.jsonl
+    prompt-learning evaluate --prompt-file prompt.txt --part test --set QUERIES_SOURCE=traces.parquet
+    prompt-learning bench --samples 50 --rule-counts 10 100
+
+Flags override the UPPERCASE configuration constants at the top of core.py
+for this run; --set NAME=VALUE overrides any constant that has no dedicated
+flag (VALUE is parsed as a Python literal, e.g. --set LLM_CACHE_PATH=None).
+"""
+
+import argparse
+import ast
+import sys
+
+# flag destination -> configuration constant it overrides
+CONFIG_FLAGS = {
+    "num_samples": "NUM_SAMPLES",
+    "train_split": "TRAIN_SPLIT_FRACTION",
+    "num_rules": "NUM_RULES",
+    "loops": "NUM_OPTIMIZATION_LOOPS",
+    "run_dir": "RUN_DIR",
+    "rule_counts": "RULE_COUNTS_TO_TEST",
+    "workers": "PARALLEL_WORKERS",
+    "seeds": "SEEDS_TO_TEST",
+    "scorers": "SCORERS_TO_TEST",
+    "max_concurrency": "MAX_CONCURRENCY",
+    "dataset_seed": "DATASET_SEED",
+}
+
+
+def parse_override(text):
+    """Split a NAME=VALUE override into (NAME, value), parsing VALUE as a Python literal if possible."""
+    name, sep, raw = text.partition("=")
+    if not sep or not name.isupper() or name.startswith("_"):
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE with an UPPERCASE name, got {text!r}")
+    try:
+        value = ast.literal_eval(raw)
+    except (ValueError, SyntaxError):
+        value = raw  # bare strings, e.g. --set RUN_DIR=runs/exp1
+    return name, value
+
+
+def apply_config(run, args):
+    """Set the configuration constants on core given by the flags and --set overrides."""
+    overrides = {constant: getattr(args, dest) for dest, constant in CONFIG_FLAGS.items()
+                 if getattr(args, dest, None) is not None}
+    if getattr(args, "no_cache", False):
+        overrides["LLM_CACHE_PATH"] = None
+    overrides.update(dict(args.set or []))
+    for name, value in overrides.items():
+        if not hasattr(run, name):
+            raise SystemExit(f"❌ Unknown configuration constant: {name}")
+        setattr(run, name, value)
+    return overrides
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="prompt-learning", description="Optimize a system prompt with prompt learning")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--num-samples", type=int, help="rows sampled from the dataset, 0 for all")
+    common.add_argument("--train-split", type=float, help="fraction of the sample used for training")
+    common.add_argument("--loops", type=int, help="optimization loops per experiment")
+    common.add_argument("--run-dir", help="checkpoint directory; re-running with the same directory resumes")
+    common.add_argument("--max-concurrency", type=int, help="in-flight request cap per model")
+    common.add_argument("--no-cache", action="store_true", help="disable the on-disk LLM response cache")
+    common.add_argument("--dataset-seed", type=int, help="seed of the corpus sample and train/test split")
+    common.add_argument("--refresh-corpus", action="store_true",
+                        help="fetch QUERIES_SOURCE again instead of using its cached copy")
+    common.add_argument("--set", type=parse_override, action="append", metavar="NAME=VALUE",
+                        help="override any configuration constant in core.py (repeatable)")
+
+    run_parser = commands.add_parser("run", parents=[common], help="optimize the prompt for one rule count")
+    run_parser.add_argument("--num-rules", type=int)
+    run_parser.add_argument("--threshold", type=float, default=1)
+    run_parser.add_argument("--scorer", choices=["accuracy", "f1", "precision", "recall"], default="accuracy")
+
+    sweep_parser = commands.add_parser("sweep", parents=[common], help="run the multi-rule experiments")
+    sweep_parser.add_argument("--rule-counts", type=int, nargs="+")
+    sweep_parser.add_argument("--workers", type=int, help="worker processes, 1 to run experiments one after another")
+    sweep_parser.add_argument("--seeds", type=int, nargs="+", help="split seeds swept by the parallel runner")
+    sweep_parser.add_argument("--scorers", nargs="+", help="metrics swept by the parallel runner")
+
+    resume_parser = commands.add_parser("resume", parents=[common], help="continue a checkpointed run")
+    resume_parser.add_argument("resume_dir", metavar="RUN_DIR")
+
+    online_parser = commands.add_parser("online", parents=[common], help="learn continually from a JSONL trace feed")
+    online_parser.add_argument("trace_path", metavar="TRACES")
+    online_parser.add_argument("--num-rules", type=int)
+
+    evaluate_parser = commands.add_parser("evaluate", parents=[common],
+                                          help="judge a prompt on a whole split of the query corpus, chunk by chunk")
+    evaluate_parser.add_argument("--prompt-file", help="system prompt to evaluate, default the initial prompt")
+    evaluate_parser.add_argument("--part", choices=["train", "test"], default="test")
+    evaluate_parser.add_argument("--num-rules", type=int)
+    evaluate_parser.add_argument("--scorer", choices=["accuracy", "f1", "precision", "recall"], default="accuracy")
+    evaluate_parser.add_argument("--max-rows", type=int, help="stop after this many rows")
+
+    commands.add_parser("bench", add_help=False, help="throughput benchmark (see prompt-learning bench --help)")
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["bench"]:
+        # The benchmark has its own flags
+        from .benchmark import main as bench_main
+        return bench_main(argv[1:], prog="prompt-learning bench")
+
+    args = build_parser().parse_args(argv)
+    from . import core as run
+
+    apply_config(run, args)
+    if args.refresh_corpus:
+        run.get_query_corpus().fetch(refresh=True)
+    if args.command == "run":
+        run.run_single_experiment(threshold=args.threshold, scorer=args.scorer, run_dir=run.RUN_DIR)
+    elif args.command == "sweep":
+        run.run_rule_sweep(run_dir=run.RUN_DIR)
+    elif args.command == "resume":
+        run.resume_experiment(args.resume_dir)
+    elif args.command == "evaluate":
+        prompt = run.system_prompt
+        if args.prompt_file:
+            with open(args.prompt_file, "r") as f:
+                prompt = f.read()
+        run.evaluate_corpus(prompt, part=args.part, scorer=args.scorer, max_rows=args.max_rows)
+    elif args.command == "online":
+        run.run_online(args.trace_path)
+        return
+    run.print_run_stats()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1565 @@
+# -*- coding: utf-8 -*-
+"""prompt_learning_cookbook_AX.ipynb
+
+Automatically generated by Colab.
+
+Original file is located at
+    https://colab.research.google.com/drive/1IhN8oZJOxkft9eLY8pJte5nWdFlbl0C4
+
+[![My Image](data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAasAAAB2CAMAAABBGEwaAAAAwFBMVEX///8AAAD/LIt/f3+0tLTv7+8tLS2kpKQ+Pj6rq6v/AIGEhITX19e8vLx6enqbm5v/IIcdHR34+Pj/FYTj4+OVlZVxcXHPz8/b29vq6uq3t7e/v7//+fz/8Pb/7PT/OZFra2tcXFyOjo7/1ubIyMj/lb9LS0v/TZn/dK3/9fpTU1MzMzMoKCj/udRBQUFeXl7/zOD/4Oz/sM//XaH/p8n/h7f/w9oSEhL/S5n/kb3/4+7/q8z/frL/n8X/ban/XKCWcG5xAAAMJUlEQVR4nO2da1saPRCGBUEFKa4geEArKvrWU7Vaq/bk//9XLwfFzcyTZJLsQXrl/tayG7N5NtnJZCZZWoqk2epdbD6u9Gtl1yNio35ReWOj7LpEjGxXUpyVXZuIAUWqSmWt7PpEtHQqhOWyaxTRsU61qmyVXaUIhnWrSqVddp0imAHXqlJ2nSKYY6DVbtmVikDaQKvtsisVgSCtWmVXKgKJY+DiMOJSPZZdp4gGrlWcDH9U+CAY58IfFirVcdkVyoD9/bJrkA87qlSL72g/eThMkuqXH2XXIw9aaamOyq5NKAf3zaQ6JukenpRdlxzoDOdSNcquSyjfkqlSU5rXZdcmD7Y2pmv4e2XXI5jzd6UmYv2LPeuf4a+iVbVadn0iWu66qlTJl7JrFNHwuVklNP9Ja/Bf4CmhWlW752VXKoL402VSVZOXsmsVAXxjI+C0Y/0qu14RziGSavzJ+pnz3+3sDBq99eX28nqvNspuPam+vbcxLrXdHmRWpCedrUFt8oDt9ePVT616BiU+8I/VbBR8yqBwHbu1/hXxp16svju/R+3lFNTT2umnf22nfeaj9ua8wHQs9LFyxyhdWkv5W1LaloXlzmD5kjzg5rAR6N6/hSPgdBQ8DStZS2d1ja8oTbhc7cyuWFX/m9xfV++at1q9p/x/WqtN5ZfVdGmfcF1sfDI9Ye1Cc9dVL2AA2dcpVc3LfbHVNzXB8VQtVSsa0oy16tCIzbRWK8ov+WpV56GjaY68w3Kow0Lh0LdUPXWjUm8N6aFVgxVUjlbsleGc7Xg13bV2BJx+sn57FWpg1foglcrXurtW9TNeTila7Ylubnfcm+4AzKyUUTBb90X9q6wdtmvKP+1ageiXUrTqHElvdx8IX0wj4LRnZem+2LY/wivqp9mqFR//JhSv1Y79tjk9x8ZDDgui1b1jkQZq9gfAWLTa0gyshWvlVtLQqfGww0Kle+dUpAH88kuwaIXCaicUrZXrAzpFfWgcFkSszy5F6vGXyqaVjoK1cn9AB7EerCPgdBT8z0URLfDrL2QhtEKJQzaG0tY7EYyA0471x0kUzJZfg8z4kFqRuA2/B5QaGDKlxjS/OUvDWMF1fTxrH/c2eus3mt9neGrV0/79LLQirr1NfNXKzfr4+Y77usnKaEnCF5u5/k64+2IZ1fOskfKNdQZ6h4ajVpftXm0wJt2aBq1ay+sWjm+sjQwrPxykprw7G9RZPUUyKf4hHAEnJA8iQfS0QCWHzOfc2dA0votWF3tw7cGglQDeyqQENHPcYDKMgMu6b//rNocFGQVvHR+OQFcHxmMDdIl1wAvspNWFztMWpBVvYppmwkfAPuwwYIppd2DcwxGwOwYPjUFx7ryG2rcJTmvFWulXF0O04i8QDbLm5rrOs1tnr611X5RfqFslh9efD25f4E9/nZ6O8EjrZ9gRCZm+Qq0uDSuvAVrxhKAVegm7wuBIZytbFvPiJ9Kj+xoT+Ad9yULCppnr2bh5FXBUy7T6airVXyswxaXDG7vEuPxLVwSM9YYxZqnwze9QyQOH51Oh3d6SU9irUERamccSb62A1cCUoBMOS0+hw4xxNesUiZEyzJE57x+DRp3P1gGaLUVJtHo0G7++Wu3yv8SUoFauLRGPNojp3YUOi/R6PVzX93Zf0PHeGnDA2keilWWp1VOrDvvUgnvJQrA9bZy2iOFS5LJV42BgvIyv+4I8riD9k66CC7SyOWs8tbJb60vMYDcGzcwgZerN9t9ohCMOWujW9XNfUEeZYKJO97qya3VlK9JPqyH7QyAlkjzgpqBcMunXvr7QYcEWPmDf83JfECNpXXIP8djYtbK61by04tY6jX6bQB5QUnbdXuqEczTX5QuKcBnSKwaNtLsomtGyjSbTyr7Ppo9WwMmAZnDkAUVRL2R6rbkKOSzQQj1e3hc9o4raStbBaoajVva8Ug+tgBMTGjBq0Y+1hoChoNylOzgCogCY/4xzMDlqrURDIH3vrFrZC3TXCljr0IUFNpJ0BpojPCmuqgssO5BfaoJ8eYX5AE7xgZJNNp216nB3LL4LaOoMNC5cOgvNS9V3QRPk0yMMvldX/G1aCRbsnLXisaGaN0IeSKcHBV64fYRQ+LRzDBpx7wnvUnujTSvB59xVK752eKG50ifOggIMQUfjbh+ajN/tDZOGWLTCu1Q1LFpJdlt31Ir7JLVGkXfUYwowJ4OTpmd9jbH7wi2FTv3ysNUEHS5aCZZWHbUCvn5t35VE6NvgbimUFGdOiIMuDrcUOnWKbvH/v+OileR8ECetgLWu/87qAg+coIXCXtI19xK769CG+ijiwyFctJLs2uOiFXA3GszXPLTCznPL18fqkreiDhHCqbCbVpKUCxetpNb6jCzGQKqVn1VnW+qyUoBtkbFW3Fo3Lo7KEq6ctIJJcYl9sRfOyBxS6AamSmlxstkl23fLteKZDDprfUYWNrvaLDDGTBJE8RneKHdfkO+0MPtSbYAiteKfH4vtimIfw7RCSXEy7x50X8hT6IgLRngCnzq/KVAr0Ess+1IIA7blWmGHhSzoT+qZ16BWSjIXWqKBWcVpBRITrSOB1wPq+QnNOWEw7Tn0C4pT6EjUvewm9Z7CtHKz1l8htoigMkbQNEkepA5XkpvSFDqSdiDKaSapG4VpZY1bR5DVY1nmh5bQ6AkYgyZ1XxCbdii5h8SmFqUV3+xFcqQZyQIM26QaT2hdopLA/eIYNDquCPa4oeE0BWnlaq2/QhcbQ/ZcyiDaL0htErc1tN9Bg/2L0Yo7IIReFtIdQzoWHMEck4CfA0ZR2gbWLxZbvStEK5DQLNxFjq6KWL9Yo347TX9uakKHhXNyPYyAl1knzLiyLQ0yf1wRWoF8X+muSSziwvaA9Pq3/z+AC4bOWR8ws0Ro9R+Rqlm2CuABlAVoBSJc5FtF0g+dZeWHPuA82gLOZD2yqWDyiGw2zca0oelqcAhcAVrxzEvJqtgrrE8aP1nsu/hmbQU0MQF6qWSis6jwG/216Ly+/LU6Yn/T6QBiNhQYDEi25j98/SFk6CJ4e39RqM+a7rMN89lz14pv+Sey1ufwuLMrneXOIzneulWAScDARooohe6Itz88LGcb7xKRt1Y8dVG8JvoKGA1g5squfnEsxNTm+Bv/yBe9yVzuLSBpEVpxa92SeAdALxnbNGEXbfPxelG4w0IFlCacVON9pfp785GiPjrW7LySu1ae2w+pUR64kKPGu93fWgVbh75bmzCyJWB3Jay97yg4Y/PsZnjErTCFfLWC27nYITHo+rCLrzfDG82+2e9LKLfo6ImgTdeREzgxBBi+A8LD5eSrlWfNaL6Adc9lxPy7iOIBxUsZGLjjoOjOkI3OFkIr4KW3MzeHX8AIGLjLJoqybsrW8wPiEhZDKxAAZeP9a8Y7QfjutSAYQNpV/RMqFkQr556Vcjg+ca3Cd4XmMWgy42LJbZdlhUXRyvGblZ4us2j0LHZb5zFoXfG9deOOjmlUp83CaOUShLuiuG6u6SGMmZxiwEp1yUvVbfmssrmrzscWR6ulHekMgMQ77dMu4NCoBkiwtVty/kjQMm2/s1+MFKWVNBeBLbj8avo3qh41hc55fcX2LGuTpl9grZbq9sED5Qd/SfWspmNCop60+yLx8C6a1FqbLYAvslbj+qGFnXd62Nv40HztBEkzs/MLxmLNz2Nvvnht2DnSGEzrb1asORvSQyvDWWXOKs0wZ30N+Or2jL4+GuPkvjnZGLX5O6PTC2bsnyaTYpuH/jtAtjZulE21roarqenGTi0NfYU7jfSvDUkIy55S4I7+JzHW0LLW6lA1NC6VR0Qc3N7dncje/pO70+fvt8Jrr+9+BB++udUa1BqNvVEr8BzDj8tua7RXa9Q+bbeyOzx03Ff+VLvdJEm63Wz7YCRzbqtzOyRx3RchUijqPk3NzM/+i2QGzdHP7bjaSCh8h5h8jquNhPPMtMr10O5IAGBpPouDlCLZAwMz4hfrQ/I9o5j3SP6gIJo8zlePhBO1WhxOMz0/JJIndFl+qlXouX+RXDgHUX/dDOJoIjkA9qtLyq5TBMPDaUMDdCO5Qbd0jJbFB+avIlZyGHTuaSRfHlLDYNcv4iVSFLeHzUl4UpJ0k/it+vCc/Pn79HT/HHhGd8SD/wFsl9lUXEPejwAAAABJRU5ErkJggg==)](https://arize.com)
+
+# Optimizing JSON Webpage Prompts with the Arize Prompt Learning SDK
+
+In this cookbook, we demonstrate a use case of the Arize Prompt Learning SDK by optimizing a system prompt for GPT-4.1. The goal is to improve the model’s ability to generate accurate JSON representations of webpages in response to user queries. The dataset consists of prompts asking GPT to generate webpages, and we define 10 specific rules that the JSON outputs must satisfy. Using the SDK, we iteratively refine the prompt to achieve high accuracy on the training set, and then evaluate its performance on a separate test set.
+"""
+
+#!pip install arize-phoenix-evals arize-phoenix-client tiktoken openai arize-toolkit
+
+# CONFIG: Number of samples to use for the experiment. Adjust as needed.
+NUM_SAMPLES = 100  # Number of rows to sample from the full dataset, 0 for all
+TRAIN_SPLIT_FRACTION = 0.5  # Fraction of data to use for training (rest for testing)
+NUM_RULES = 50  # Number of rules in the prompt - adjust based on your evaluator prompt (this is NOT working on Config)
+
+# QUERY CORPUS
+QUERIES_SOURCE = "https://storage.googleapis.com/arize-assets/dev-rel/prompt-learning/queries.csv"  # URL or local CSV/Parquet path of the query corpus
+CORPUS_CACHE_DIR = ".cache/corpora"  # Local Parquet copies named by content hash; the source is only fetched when it has no copy yet
+DATASET_SEED = 42  # Seed of the sample and the train/test split
+DATASET_STRATIFY_COLUMN = None  # Column whose value shares are kept in the sample and in both splits, None for a plain random split
+DATASET_CHUNK_ROWS = 10_000  # Rows read from the corpus and sent through generation + judging at a time
+
+# EXPERIMENT CONFIGURATION
+RUN_MULTI_RULE_EXPERIMENTS = False  # Set to True to run experiments with multiple rule counts
+RULE_COUNTS_TO_TEST = [10, 50, 100]  # Rule counts to test in multi-rule experiments
+NUM_OPTIMIZATION_LOOPS = 5  # Number of optimization loops per experiment
+RUN_DIR = None  # Directory for per-stage checkpoints, e.g. "runs/exp1"; re-running with the same directory resumes
+
+# RESULTS STORE
+RESULTS_STORE_PATH = None  # Parquet store for every iteration's evaluated test set, e.g. "results"; None to keep deepcopied DataFrames in memory
+
+# INSTRUMENTATION
+INSTRUMENTATION_PATH = None  # JSONL of every span and request (latency/tokens/429s), e.g. "instrumentation.jsonl"; per-stage and per-model totals are kept in memory either way
+
+# PARALLEL EXPERIMENTS
+PARALLEL_WORKERS = 1  # Worker processes for multi-rule experiments, 1 to run them one after another
+SEEDS_TO_TEST = [42]  # Train/test split seeds swept by the parallel runner
+SCORERS_TO_TEST = ["accuracy"]  # Metrics swept by the parallel runner
+
+# ONLINE PROMPT LEARNING
+ONLINE_TRACE_PATH = None  # JSONL trace feed ({"input", "output", optional "correctness"/"feedback"}) to learn from continually instead of running the batch experiment
+ONLINE_BATCH_SIZE = 20  # Traces judged together
+ONLINE_WINDOW_SIZE = 200  # Most recent failures kept as optimizer evidence
+ONLINE_MIN_NEW_FAILURES = 20  # New failures needed before the next prompt update
+ONLINE_PROMPT_PATH = "online_prompt.txt"  # The latest prompt is written here after every update
+
+# LLM RESPONSE CACHE
+LLM_CACHE_PATH = ".cache/llm_responses.sqlite"  # On-disk cache shared by generation and both evaluators, None to disable
+LLM_CACHE_MAX_ENTRIES = 200_000  # Least recently used responses are evicted above this many entries
+LLM_CACHE_MAX_AGE_DAYS = 30  # Cached responses older than this are ignored and evicted, None to keep forever
+
+# LOCAL RULE ENGINE
+USE_LOCAL_RULE_ENGINE = False  # Check machine-checkable rules in Python; the LLM judge only sees the residual rules (verdicts differ from an all-LLM judge, so metrics aren't comparable with runs without it)
+LOCAL_RULES_ONLY = False  # Skip the LLM judge entirely (residual rules and fit to the user's request go unchecked)
+
+# CONCURRENCY CONTROL
+MODEL_RATE_LIMITS = {  # Per-model API quota shared by generation and both evaluators
+    "gpt-4o": {"rpm": 10_000, "tpm": 2_000_000},
+    "gpt-4.1-2025-04-14": {"rpm": 10_000, "tpm": 2_000_000},
+}
+MAX_CONCURRENCY = 64  # Upper bound on in-flight requests per model; the scheduler adapts below it
+INITIAL_CONCURRENCY = 8  # In-flight requests per model before any 429/latency feedback
+LATENCY_TARGET_SECONDS = None  # Calls slower than this shrink the in-flight limit, None to react to 429s only
+
+# SEQUENTIAL TEST EVALUATION
+SEQUENTIAL_TEST_EVALUATION = False  # Score test rows in random mini-batches and stop once the metric is clearly above/below threshold
+SEQUENTIAL_BATCH_SIZE = 20  # Test rows scored per mini-batch
+SEQUENTIAL_CONFIDENCE = 0.95  # Confidence level of the interval used to stop early
+SEQUENTIAL_METHOD = "wilson"  # "wilson" score interval or "bayes" Beta-posterior interval
+
+# FEEDBACK PACKING
+FEEDBACK_TOKEN_BUDGET = None  # Tokens of train outputs + feedback passed to optimize() (e.g. 32_000; rows are deduped and clustered by violated rules), None to pass every row
+
+# TRAIN MINI-BATCHES
+TRAIN_MINIBATCH_SIZE = 0  # Train rows generated and judged per loop, weighted toward recent failures and unresolved rules; 0 for the full train set every loop
+TRAIN_FULL_PASS_EVERY = 3  # Every n-th loop still runs the full train set to catch regressions
+
+# BEAM SEARCH
+BEAM_CANDIDATES = 0  # Candidate prompts requested from the optimizer per loop (one per feedback subset), 0 or 1 to follow a single chain
+BEAM_WIDTH = 2  # Best prompts kept from one loop to the next
+BEAM_MINIBATCH_SIZE = 20  # Train rows each candidate is scored on
+BEAM_FEEDBACK_FRACTION = 0.7  # Share of train feedback rows each extra candidate is optimized on
+
+# INCREMENTAL EVALUATION
+INCREMENTAL_EVALUATION = False  # Reuse verdicts for rows whose (input, output) was already judged in an earlier loop
+
+# STREAMING PIPELINE
+STREAMING_PIPELINE = False  # Judge each row as soon as its output is generated instead of after the whole generation stage
+PIPELINE_QUEUE_SIZE = 100  # Maximum generated outputs waiting to be judged
+
+# PROMPT PREFIX CACHING
+PREFIX_CACHE_LAYOUT = True  # Send the judge instructions + rule set as a static system message and only the row data per request, so the provider caches the prefix
+
+# BATCH API
+BATCH_API_MODE = False  # Run generation and both evaluators through the Batch API (hours of latency, lower cost) instead of synchronous requests
+BATCH_LOCAL_STANDIN = False  # Answer batches locally with the mock endpoint's canned responses (for testing without an API key)
+BATCH_WORK_DIR = ".cache/batches"  # Where batch request files are written
+BATCH_POLL_SECONDS = 60  # Seconds between batch status checks
+
+# FUSED JUDGE
+FUSED_JUDGE_RULE_COUNTS = []  # Rule counts whose train rows are judged by one fused call (prompts/fused-judge-prompt-N.txt) instead of evaluate_output + rule_checker
+
+# RULE-SHARDED JUDGING
+JUDGE_RULE_SHARD_SIZE = 0  # Rules per judge request: larger rule sets are split into shards judged concurrently and merged per row, 0 to send the whole rule set in one request
+
+# STREAMING GENERATION
+STREAMING_GENERATION = False  # Stream generation responses and stop as soon as the JSON can't become valid or hits a cap below; aborted rows are marked incorrect without judging
+GENERATION_MAX_CHARS = 40_000  # Abort streamed outputs longer than this many characters, None for no cap
+GENERATION_MAX_TOKENS = 8_000  # max_tokens sent with streamed generation requests, None for the model's limit
+
+# JUDGE CASCADE
+JUDGE_CASCADE_MODEL = None  # Cheap judge (e.g. "gpt-4o-mini") asked first for a verdict and a confidence; only unsure rows go to gpt-4o. None to judge every row with gpt-4o
+JUDGE_CASCADE_CONFIDENCE = 0.8  # Cheap verdicts below this confidence escalate to gpt-4o
+JUDGE_CASCADE_AUDIT_FRACTION = 0.1  # Share of confident rows also judged by gpt-4o (whose verdict then counts), to measure agreement
+
+# USAGE EXAMPLES:
+# 1. Single experiment with 50 rules (default):
+#    - Set RUN_MULTI_RULE_EXPERIMENTS = False
+#    - Results saved to "single_experiment_results.json"
+#
+# 2. Multi-rule experiments:
+#    - Set RUN_MULTI_RULE_EXPERIMENTS = True
+#    - Adjust RULE_COUNTS_TO_TEST as needed
+#    - Set PARALLEL_WORKERS > 1 to run them in worker processes (also sweeps SEEDS_TO_TEST x SCORERS_TO_TEST)
+#    - Results saved to "multi_rule_experiments.json"
+#
+# 3. Load previous results:
+#    - Use load_experiment_results("filename.json")
+#
+# 4. Control optimization loops:
+#    - Set NUM_OPTIMIZATION_LOOPS to control how many iterations per experiment
+#
+# 5. Online prompt learning:
+#    - Set ONLINE_TRACE_PATH to a JSONL file your application appends traces to
+#    - The prompt is updated once ONLINE_MIN_NEW_FAILURES new failures were seen and written to ONLINE_PROMPT_PATH
+#
+# 6. Checkpoint and resume:
+#    - Set RUN_DIR to checkpoint every stage of the run
+#    - After a crash, use resume_experiment(RUN_DIR) (or just re-run) to continue from the last completed stage
+#    - A RUN_DIR belongs to one run: re-running it with other samples, seed, rule count or loop settings raises
+#
+# 7. Command line:
+#    - prompt-learning run|sweep|resume|online|evaluate|bench (or python -m prompt_learning ...) overrides
+#      any of the settings above per run, e.g. prompt-learning sweep --rule-counts 10 50 --workers 3
+#    - prompt-learning run --set LLM_CACHE_PATH=None sets a constant that has no dedicated flag
+#
+# 8. Large query corpora:
+#    - Point QUERIES_SOURCE at the corpus; it is cached once under CORPUS_CACHE_DIR and sampled chunk by chunk
+#    - evaluate_corpus(prompt) judges a whole split DATASET_CHUNK_ROWS rows at a time, keeping only the counts
+#    - prompt-learning evaluate --prompt-file prompt.txt runs evaluate_corpus from the command line
+
+import functools
+import os
+from . import phoenix_patches
+
+"""## OpenAI Key
+We will be using OpenAI to generate the webpage jsons. The key is read from `OPENAI_API_KEY` when the first model is built.
+
+Nothing heavy happens at import time: phoenix (and its template patches in `phoenix_patches.py`), pandas, scikit-learn and arize_toolkit are imported on first use, and the response cache, scheduler and tracer below are created by their `get_*` accessors the first time a stage needs them, with the configuration in effect at that point.
+"""
+
+"""## LLM Response Cache
+
+With `temperature: 0` the same (model, prompt) pair always gets the same answer, and the loop asks many of them more than once: the train outputs generated after optimizing in loop N are regenerated at the start of loop N+1, and the evaluators then re-judge identical outputs. Every model below is built through `make_model`, which serves repeated calls from an on-disk cache so repeated and resumed runs only pay for new calls.
+"""
+
+from .llm_cache import LLMResponseCache
+from .llm_client import make_model, trace_client
+from .rate_limiter import AdaptiveScheduler
+from .instrumentation import Tracer
+
+_UNSET = object()
+_RENDERED_PROMPT_COLUMN = "rendered_prompt"  # run_llm passes pre-rendered prompts to llm_generate in this column
+llm_cache = _UNSET  # opened by get_llm_cache(); assign None to disable caching
+
+def get_llm_cache():
+    """The shared response cache (None when LLM_CACHE_PATH is None), opened on first use."""
+    global llm_cache
+    if llm_cache is _UNSET:
+        llm_cache = None
+        if LLM_CACHE_PATH:
+            llm_cache = LLMResponseCache(
+                LLM_CACHE_PATH,
+                max_entries=LLM_CACHE_MAX_ENTRIES,
+                max_age_seconds=LLM_CACHE_MAX_AGE_DAYS * 24 * 3600 if LLM_CACHE_MAX_AGE_DAYS else None
+            )
+    return llm_cache
+
+"""Instead of a fixed concurrency per stage, every model call goes through one shared scheduler: a token bucket per model sized from `MODEL_RATE_LIMITS` (token estimates via tiktoken) and an in-flight limit that grows while calls succeed and halves on 429s."""
+
+scheduler = None  # created by get_scheduler()
+
+def get_scheduler():
+    global scheduler
+    if scheduler is None:
+        scheduler = AdaptiveScheduler(
+            rate_limits=MODEL_RATE_LIMITS,
+            max_concurrency=MAX_CONCURRENCY,
+            initial_concurrency=INITIAL_CONCURRENCY,
+            latency_target=LATENCY_TARGET_SECONDS
+        )
+    return scheduler
+
+"""Every stage of `optimize_loop` is timed as a span, and every request the models send (retries included) is recorded with its latency and token counts, so the saved results show which stage dominates wall-clock time and spend."""
+
+tracer = None  # created by get_tracer()
+
+def get_tracer():
+    global tracer
+    if tracer is None:
+        tracer = Tracer(INSTRUMENTATION_PATH)
+    return tracer
+
+def make_optimizer(prompt):
+    """MetaPromptOptimizer (gpt-4o) for prompt whose OpenAI requests are recorded on the tracer."""
+    from arize_toolkit.extensions.prompt_optimizer import MetaPromptOptimizer
+
+    optimizer = MetaPromptOptimizer(
+        prompt=prompt,
+        model_choice="gpt-4o",
+        openai_api_key=os.getenv("OPENAI_API_KEY")
+    )
+    # The optimizer keeps its own OpenAI client; wrap whichever attribute holds it
+    traced = [trace_client(value, get_tracer()) for value in vars(optimizer).values()]
+    if not any(traced):
+        print("⚠️ Optimizer requests are not traced: no OpenAI client found on MetaPromptOptimizer")
+    return optimizer
+
+"""## Training and Test Datasets
+
+Create training and test datasets, and export to Arize.
+
+The [dataset of queries](https://storage.googleapis.com/arize-assets/dev-rel/prompt-learning/queries.csv) is downloaded once and cached locally as Parquet under its content hash (see `query_corpus.py`); later runs sample the cached copy without touching the network.
+"""
+
+from .query_corpus import QueryCorpus
+
+def get_query_corpus():
+    """The configured query corpus (QUERIES_SOURCE, cached under CORPUS_CACHE_DIR)."""
+    return QueryCorpus(QUERIES_SOURCE, cache_dir=CORPUS_CACHE_DIR, chunk_rows=DATASET_CHUNK_ROWS)
+
+def load_datasets(num_samples=None, train_split_fraction=None, refresh=False):
+    """
+    Sample and split the query corpus and export train.csv/test.csv (defaults from the config).
+
+    The sample and split are seeded with DATASET_SEED (stratified by DATASET_STRATIFY_COLUMN),
+    so the same corpus content always gives the same train and test rows. refresh re-fetches
+    the source instead of using the cached copy.
+    """
+    num_samples = NUM_SAMPLES if num_samples is None else num_samples
+    train_split_fraction = TRAIN_SPLIT_FRACTION if train_split_fraction is None else train_split_fraction
+    corpus = get_query_corpus()
+    corpus.fetch(refresh=refresh)
+
+    train_set, test_set = corpus.split(
+        num_samples, train_split_fraction, seed=DATASET_SEED, stratify=DATASET_STRATIFY_COLUMN
+    )
+    print(f"📚 {len(train_set)} train / {len(test_set)} test rows from corpus {corpus.content_hash[:12]} "
+          f"({corpus.num_rows} rows, seed {DATASET_SEED})")
+
+    train_set.to_csv("train.csv", index=False)
+    test_set.to_csv("test.csv", index=False)
+    return train_set, test_set
+
+"""## Initial System Prompt
+
+Initialize your system prompt. This is the original prompt that will be tested and optimized.
+"""
+
+system_prompt = "You are an expert in JSON webpage creation. This is your task: {input}"
+
+"""## Evaluator
+
+Here we initialize our evaluator. This uses LLM as a Judge, or using an LLM to evaluate our outputs.  
+
+We will pass in a set of 10 rules to this LLM. It will evaluate each generated JSON against these 10 rules, checking if all are satisfied.
+
+Accordingly, it will give a correctness label, either correct or incorrect.
+
+Additionally, it will attach an explanation as to why it chose correct or incorrect. These explanations will be used to optimize the prompt.
+
+Most rules are mechanically checkable (HTTPS URLs, hex/RGB colors, rem font sizes, ISO-8601 `updatedAt`, integer product IDs, ...). With `USE_LOCAL_RULE_ENGINE` those are checked in Python by `rule_engine.py`, rows that already break one are marked incorrect without a judge call, and the LLM judge only sees the residual rules.
+"""
+
+from .rule_engine import engine_for_template
+from .pipeline import run_pipeline, run_pipeline_many
+from .beam_search import beam_step
+from .feedback_packing import pack_feedback
+from .train_sampling import FailureSampler
+from .checkpoint import RunCheckpoint
+from .judge_parsing import (parse_judge_response, parse_stats, EVALUATE_OUTPUT_SCHEMA, RULE_CHECKER_SCHEMA,
+                           FUSED_JUDGE_SCHEMA)
+from .online_learning import OnlinePromptLearner, JsonlTailSource
+from .prefix_cache import split_template
+from .templates import render_column
+from .rule_sharding import shard_template, merge_verdicts, judge_sharded, rule_violation_counts
+from .rule_engine import parse_rule_set
+from .judge_cascade import JudgeCascade, cascade_stats
+from .streaming_generation import streaming_generator, stream_generate, abort_verdict
+from .batch_backend import OpenAIBatchClient, LocalBatchClient, run_batch
+from .results_store import ResultsStore
+from .parallel_runner import run_parallel_experiments
+from .incremental_eval import VerdictMemo
+from .sequential_eval import sequential_evaluate, PROPORTION_SCORERS
+
+def evaluate_output_parser(response: str, row_index: int) -> dict:
+    """Parser function for evaluate_output evaluator"""
+    values, _ = parse_judge_response(response, EVALUATE_OUTPUT_SCHEMA, "evaluate_output")
+
+    return {
+        "correctness": values["correctness"],
+        "explanation": values["explanation"]
+    }
+
+def rule_checker_parser(response: str, row_index: int) -> dict:
+    """Parser function for rule_checker evaluator"""
+    values, _ = parse_judge_response(response, RULE_CHECKER_SCHEMA, "rule_checker")
+
+    return {
+        "rule_violations": values["explanation"]
+    }
+
+def fused_judge_parser(response: str, row_index: int) -> dict:
+    """Parser function for fused_judge evaluator"""
+    values, _ = parse_judge_response(response, FUSED_JUDGE_SCHEMA, "fused_judge")
+    return values
+
+def run_llm(dataframe, template, model, output_parser=None, system_instruction=None):
+    """llm_generate, or the batch backend when BATCH_API_MODE is on."""
+    if not BATCH_API_MODE:
+        import pandas as pd
+        from phoenix.evals import llm_generate
+
+        phoenix_patches.apply()
+        # Render every prompt up front in one pass; llm_generate then only substitutes the finished prompt
+        prompts = pd.DataFrame({_RENDERED_PROMPT_COLUMN: render_column(template, dataframe)}, index=dataframe.index)
+        return llm_generate(
+            dataframe=prompts,
+            template=f"{{{_RENDERED_PROMPT_COLUMN}}}",
+            model=model,
+            system_instruction=system_instruction,
+            output_parser=output_parser,
+            concurrency=MAX_CONCURRENCY,
+            verbose=True
+        )
+    if BATCH_LOCAL_STANDIN:
+        batch_client = LocalBatchClient(BATCH_WORK_DIR)
+    else:
+        import openai
+
+        batch_client = OpenAIBatchClient(openai.Client(api_key=os.getenv("OPENAI_API_KEY")))
+    return run_batch(
+        dataframe, template, model.model, model.model_kwargs,
+        output_parser=output_parser,
+        instruction=system_instruction,
+        client=batch_client,
+        work_dir=BATCH_WORK_DIR,
+        poll_interval=BATCH_POLL_SECONDS,
+        cache=get_llm_cache()
+    )
+
+def judge_shards(template):
+    """The judge template split into rule shards (one shard unless JUDGE_RULE_SHARD_SIZE), each with its static instruction."""
+    # Static instructions + rule set go first so every request shares a cacheable prefix
+    return shard_template(template, JUDGE_RULE_SHARD_SIZE, split_template if PREFIX_CACHE_LAYOUT else None)
+
+def judge_model(model_name="gpt-4o"):
+    return make_model(
+        model_name,
+        model_kwargs={
+            "response_format": {"type": "json_object"},
+            "temperature": 0
+        },
+        cache=get_llm_cache(),
+        scheduler=get_scheduler(),
+        tracer=get_tracer()
+    )
+
+def judge_cascade(shards, output_parser, judge):
+    """The cheap-first JudgeCascade in front of gpt-4o, or None when JUDGE_CASCADE_MODEL is None."""
+    if not JUDGE_CASCADE_MODEL:
+        return None
+    return JudgeCascade(
+        judge_model(JUDGE_CASCADE_MODEL), shards, output_parser, judge,
+        threshold=JUDGE_CASCADE_CONFIDENCE,
+        audit_fraction=JUDGE_CASCADE_AUDIT_FRACTION
+    )
+
+def run_judge(dataframe, template, output_parser, judge="judge"):
+    """
+    Judge every row of dataframe with gpt-4o.
+
+    Rule sets larger than JUDGE_RULE_SHARD_SIZE are judged shard by shard, all (row, shard)
+    pairs concurrently, and each row's shard verdicts are merged (see rule_sharding).
+    With JUDGE_CASCADE_MODEL, the cheap model judges first and only unsure rows reach gpt-4o.
+
+    Returns:
+        DataFrame indexed like dataframe with the parser's columns
+    """
+    shards = judge_shards(template)
+    cascade = judge_cascade(shards, output_parser, judge)
+    if cascade is not None:
+        return cascade.judge_frame(
+            dataframe,
+            _judge_rows,
+            lambda escalated: _judge_rows(escalated, judge_model(), shards, output_parser)
+        )
+    return _judge_rows(dataframe, judge_model(), shards, output_parser)
+
+def _judge_rows(dataframe, eval_model, shards, output_parser):
+    import pandas as pd
+
+    if len(shards) == 1:
+        return run_llm(
+            dataframe,
+            shards[0]["template"],
+            eval_model,
+            output_parser=output_parser,
+            system_instruction=shards[0]["instruction"]
+        )
+
+    print(f"🧩 Judging {len(dataframe)} rows in {len(shards)} rule shards")
+    if BATCH_API_MODE:
+        # One batch per shard; the batches run server-side anyway
+        shard_results = [
+            run_llm(dataframe, shard["template"], eval_model, output_parser=output_parser,
+                    system_instruction=shard["instruction"]).to_dict("records")
+            for shard in shards
+        ]
+        return pd.DataFrame(
+            [merge_verdicts(list(verdicts), shards) for verdicts in zip(*shard_results)],
+            index=dataframe.index
+        )
+    return pd.DataFrame(
+        judge_sharded(dataframe, shards, eval_model, output_parser, workers=MAX_CONCURRENCY),
+        index=dataframe.index
+    )
+
+def skip_aborted_generations(columns):
+    """
+    Evaluator decorator: rows whose streamed generation was aborted (a "generation_abort"
+    reason, see STREAMING_GENERATION) get abort_verdict's columns instead of being judged.
+    """
+    def decorate(evaluator):
+        @functools.wraps(evaluator)
+        def wrapper(dataset, *args, **kwargs):
+            if "generation_abort" not in dataset.columns or dataset["generation_abort"].isna().all():
+                return evaluator(dataset, *args, **kwargs)
+            aborted = dataset["generation_abort"].notna()
+            result = dataset.copy()
+            for col in columns:
+                if col not in result.columns:
+                    result[col] = None
+            if not aborted.all():
+                judged, _ = evaluator(dataset[~aborted], *args, **kwargs)
+                for col in columns:
+                    result[col] = result[col].astype(object)
+                    result.loc[judged.index, col] = judged[col]
+            for index, reason in dataset.loc[aborted, "generation_abort"].items():
+                verdict = abort_verdict(reason)
+                for col in columns:
+                    result.at[index, col] = verdict[col]
+            return result, columns
+        return wrapper
+    return decorate
+
+@skip_aborted_generations(["correctness", "explanation"])
+def evaluate_output(dataset, num_rules=NUM_RULES):
+    """Evaluator that checks JSON web page correctness using llm_generate"""
+
+    # Create the evaluation template
+    with open(f"prompts/evaluator-prompt-{num_rules}.txt", "r") as file:
+        evaluation_template = file.read()
+
+    dataset = dataset.copy()
+
+    # Rows that already break a locally checked rule are incorrect without asking the judge;
+    # the rest are judged only against the rules that can't be checked in code.
+    to_judge = dataset
+    if USE_LOCAL_RULE_ENGINE:
+        engine = engine_for_template(evaluation_template)
+        local = engine.evaluate(dataset["output"])
+        dataset["correctness"] = local["correctness"]
+        dataset["explanation"] = local["explanation"]
+        if LOCAL_RULES_ONLY or not engine.residual_rules:
+            return dataset, ["correctness", "explanation"]
+        to_judge = dataset[dataset["correctness"] == "correct"]
+        evaluation_template = engine.residual_template(evaluation_template)
+        if to_judge.empty:
+            return dataset, ["correctness", "explanation"]
+
+    # Generate evaluations using llm_generate
+    evaluation_results = run_judge(to_judge, evaluation_template, evaluate_output_parser, "evaluate_output")
+
+    # Merge the results back into the original dataset
+    for col in ["correctness", "explanation"]:
+        if col in evaluation_results.columns:
+            dataset.loc[to_judge.index, col] = evaluation_results[col]
+
+    return dataset, ["correctness", "explanation"]
+
+@skip_aborted_generations(["rule_violations"])
+def rule_checker(dataset, num_rules=NUM_RULES):
+    """Evaluator that checks which rules are broken using llm_generate"""
+
+    # Create the rule checking template
+    with open(f"prompts/rule-checker-prompt-{num_rules}.txt", "r") as file:
+        rule_check_template = file.read()
+
+    dataset = dataset.copy()
+
+    # Machine-checkable rules are checked locally; the judge only lists the residual ones.
+    local_violations = None
+    if USE_LOCAL_RULE_ENGINE:
+        engine = engine_for_template(rule_check_template)
+        local_violations = engine.evaluate(dataset["output"])["rule_violations"]
+        dataset["rule_violations"] = local_violations
+        if LOCAL_RULES_ONLY or not engine.residual_rules:
+            return dataset, ["rule_violations"]
+        rule_check_template = engine.residual_template(rule_check_template)
+
+    # Generate rule checks using llm_generate
+    rule_check_results = run_judge(dataset, rule_check_template, rule_checker_parser, "rule_checker")
+
+    # Merge the results back into the original dataset
+    if "rule_violations" in rule_check_results.columns:
+        if local_violations is None:
+            dataset["rule_violations"] = rule_check_results["rule_violations"]
+        else:
+            dataset["rule_violations"] = [
+                "\n".join(v for v in (local, judged) if v)
+                for local, judged in zip(local_violations, rule_check_results["rule_violations"])
+            ]
+
+    return dataset, ["rule_violations"]
+
+@skip_aborted_generations(["correctness", "explanation", "rule_violations"])
+def fused_judge(dataset, num_rules=NUM_RULES):
+    """Evaluator that returns correctness, explanation and rule violations from one llm_generate pass"""
+
+    # Create the fused judge template
+    with open(f"prompts/fused-judge-prompt-{num_rules}.txt", "r") as file:
+        fused_template = file.read()
+
+    dataset = dataset.copy()
+
+    # Every row is still judged once so that residual rule violations are listed,
+    # but rows that break a locally checked rule stay incorrect whatever the judge says.
+    local = None
+    if USE_LOCAL_RULE_ENGINE:
+        engine = engine_for_template(fused_template)
+        local = engine.evaluate(dataset["output"])
+        for col in ["correctness", "explanation", "rule_violations"]:
+            dataset[col] = local[col]
+        if LOCAL_RULES_ONLY or not engine.residual_rules:
+            return dataset, ["correctness", "explanation", "rule_violations"]
+        fused_template = engine.residual_template(fused_template)
+
+    fused_results = run_judge(dataset, fused_template, fused_judge_parser, "fused_judge")
+
+    # Merge the results back into the original dataset
+    if local is None:
+        for col in ["correctness", "explanation", "rule_violations"]:
+            if col in fused_results.columns:
+                dataset[col] = fused_results[col]
+    else:
+        locally_correct = [c == "correct" for c in local["correctness"]]
+        dataset["correctness"] = [
+            judged if ok else "incorrect"
+            for ok, judged in zip(locally_correct, fused_results["correctness"])
+        ]
+        dataset["explanation"] = [
+            judged if ok else explanation
+            for ok, judged, explanation in zip(locally_correct, fused_results["explanation"], local["explanation"])
+        ]
+        dataset["rule_violations"] = [
+            "\n".join(v for v in (local_v, judged) if v)
+            for local_v, judged in zip(local["rule_violations"], fused_results["rule_violations"])
+        ]
+
+    return dataset, ["correctness", "explanation", "rule_violations"]
+
+GENERATION_MODEL_KWARGS = {
+    "response_format": {"type": "json_object"},
+    "temperature": 0
+}
+
+def generate_output(dataset, system_prompt):
+    return generate_outputs(dataset, system_prompt)["output"]
+
+def generate_outputs(dataset, system_prompt):
+    """
+    Generate an output for every row, streamed with early abort when STREAMING_GENERATION is on.
+
+    Returns:
+        DataFrame indexed like dataset with "output" and "generation_abort" (why the streamed
+        output was stopped early, None for complete outputs) columns
+    """
+    import pandas as pd
+
+    if STREAMING_GENERATION and not BATCH_API_MODE:
+        outputs, reasons = stream_generate(dataset, system_prompt, streaming_output_generator(), workers=MAX_CONCURRENCY)
+        return pd.DataFrame({"output": outputs, "generation_abort": reasons}, index=dataset.index)
+
+    output_model = make_model(
+        "gpt-4.1-2025-04-14",
+        model_kwargs=GENERATION_MODEL_KWARGS,
+        cache=get_llm_cache(),
+        scheduler=get_scheduler(),
+        tracer=get_tracer()
+    )
+    outputs = run_llm(dataset, system_prompt, output_model)
+    return pd.DataFrame({"output": outputs["output"], "generation_abort": None}, index=dataset.index)
+
+def streaming_output_generator():
+    """Coroutine function prompt -> (output, abort reason) for the generation model (see streaming_generation)."""
+    import openai
+
+    return streaming_generator(
+        openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY")),
+        "gpt-4.1-2025-04-14",
+        GENERATION_MODEL_KWARGS,
+        cache=get_llm_cache(),
+        max_chars=GENERATION_MAX_CHARS,
+        max_tokens=GENERATION_MAX_TOKENS,
+        scheduler=get_scheduler(),
+        tracer=get_tracer()
+    )
+
+def generate_and_evaluate(dataset, system_prompt, num_rules=NUM_RULES, memo=None):
+    """
+    Generate outputs with system_prompt and judge them with evaluate_output's template.
+
+    With STREAMING_PIPELINE each row is judged as soon as its output arrives instead of
+    waiting for the whole generation stage to finish (not in BATCH_API_MODE, where both
+    stages run as batches). With a VerdictMemo, rows whose
+    (input, output) pair was already judged reuse that verdict. Datasets longer than
+    DATASET_CHUNK_ROWS go through generation and judging one chunk at a time.
+
+    Returns:
+        copy of dataset with "output", "correctness" and "explanation" columns
+    """
+    if DATASET_CHUNK_ROWS and len(dataset) > DATASET_CHUNK_ROWS:
+        import pandas as pd
+
+        return pd.concat([
+            generate_and_evaluate(dataset.iloc[start:start + DATASET_CHUNK_ROWS], system_prompt, num_rules, memo)
+            for start in range(0, len(dataset), DATASET_CHUNK_ROWS)
+        ])
+
+    if not STREAMING_PIPELINE or BATCH_API_MODE:
+        dataset = dataset.copy()
+        generated = generate_outputs(dataset, system_prompt)
+        dataset["output"] = generated["output"]
+        dataset["generation_abort"] = generated["generation_abort"]
+        evaluator = lambda ds: evaluate_output(ds, num_rules)
+        if memo is not None:
+            evaluator = memo.wrap("evaluate_output", evaluator, num_rules)
+        return evaluator(dataset)[0]
+
+    return run_pipeline(dataset, system_prompt, **_pipeline_kwargs(num_rules, memo))
+
+def generate_and_evaluate_many(dataset, system_prompts, num_rules=NUM_RULES, memo=None):
+    """
+    Like generate_and_evaluate for several prompts at once.
+
+    With STREAMING_PIPELINE (and not BATCH_API_MODE) the prompts run concurrently through one
+    streaming pipeline; otherwise each goes through generate_and_evaluate in turn.
+    """
+    if not STREAMING_PIPELINE or BATCH_API_MODE:
+        return [generate_and_evaluate(dataset, prompt, num_rules, memo) for prompt in system_prompts]
+    return run_pipeline_many(dataset, system_prompts, **_pipeline_kwargs(num_rules, memo))
+
+def _pipeline_kwargs(num_rules, memo):
+    """Models, judge template and settings shared by every streaming pipeline run."""
+    phoenix_patches.apply()
+    with open(f"prompts/evaluator-prompt-{num_rules}.txt", "r") as file:
+        evaluation_template = file.read()
+    engine = None
+    if USE_LOCAL_RULE_ENGINE:
+        engine = engine_for_template(evaluation_template)
+        evaluation_template = engine.residual_template(evaluation_template)
+    shards = judge_shards(evaluation_template)
+
+    output_model = make_model(
+        "gpt-4.1-2025-04-14",
+        model_kwargs=GENERATION_MODEL_KWARGS,
+        cache=get_llm_cache(),
+        scheduler=get_scheduler(),
+        tracer=get_tracer()
+    )
+    return dict(
+        generation_model=output_model,
+        judge_model=judge_model(),
+        judge_template=shards[0]["template"],
+        judge_instruction=shards[0]["instruction"],
+        judge_shards=shards if len(shards) > 1 else None,
+        judge_cascade=judge_cascade(shards, evaluate_output_parser, "evaluate_output"),
+        stream_generation=streaming_output_generator() if STREAMING_GENERATION else None,
+        output_parser=evaluate_output_parser,
+        engine=engine,
+        local_only=LOCAL_RULES_ONLY,
+        memo=memo.bind("evaluate_output", num_rules) if memo is not None else None,
+        generation_workers=MAX_CONCURRENCY,
+        judge_workers=MAX_CONCURRENCY,
+        queue_size=PIPELINE_QUEUE_SIZE
+    )
+
+"""## Optimization
+
+There are 3 steps to every loop of optimization.
+
+1. Generate outputs with current prompt on test dataset. Evaluate outputs.
+2. If outputs are not satisfactory, generate outputs on training set. Evaluate training outputs.
+3. Use training outputs and evaluations to generate optimized prompt.
+
+This process repeats until we see good results on the test set. In this case, we measure our results to be satisfactory when all outputs are deemed "correct" by the evaluate_output evaluator we defined above.
+"""
+
+num_rules = NUM_RULES  # Use config value from top of file
+
+def compute_metric(y_true, y_pred, scorer="accuracy"):
+    """
+    Compute the requested metric for binary classification.
+    y_true and y_pred should be lists or arrays of "correct"/"incorrect" labels.
+    scorer: one of "accuracy", "f1", "precision", "recall"
+    """
+    from sklearn.metrics import f1_score, precision_score, recall_score, accuracy_score
+
+    # Map to binary
+    y_true_bin = [1 if y == "correct" else 0 for y in y_true]
+    y_pred_bin = [1 if y == "correct" else 0 for y in y_pred]
+    if scorer == "accuracy":
+        return accuracy_score(y_true_bin, y_pred_bin)
+    elif scorer == "f1":
+        return f1_score(y_true_bin, y_pred_bin, zero_division=0)
+    elif scorer == "precision":
+        return precision_score(y_true_bin, y_pred_bin, zero_division=0)
+    elif scorer == "recall":
+        return recall_score(y_true_bin, y_pred_bin, zero_division=0)
+    else:
+        raise ValueError(f"Unknown scorer: {scorer}")
+
+def metric_from_counts(correct, total, scorer="accuracy"):
+    """compute_metric for total rows whose true label is "correct", correct of them predicted "correct"."""
+    if scorer in ("accuracy", "recall"):
+        return correct / total if total else 0.0
+    if scorer == "precision":
+        return 1.0 if correct else 0.0
+    if scorer == "f1":
+        return 2 * correct / (total + correct) if total else 0.0
+    raise ValueError(f"Unknown scorer: {scorer}")
+
+def evaluate_corpus(system_prompt, part="test", num_rules=None, scorer="accuracy", max_rows=None):
+    """
+    Generate and judge one side of the train/test split of the whole query corpus.
+
+    Rows are read and sent through generate_and_evaluate DATASET_CHUNK_ROWS at a time and only
+    the counts are kept, so memory does not grow with the corpus. The split is by per-row hash
+    (QueryCorpus.iter_split) with TRAIN_SPLIT_FRACTION and DATASET_SEED.
+
+    Returns:
+        dict with "metric", "rows", "correct" and the corpus "content_hash"
+    """
+    num_rules = NUM_RULES if num_rules is None else num_rules
+    corpus = get_query_corpus()
+    rows = correct = 0
+    for chunk in corpus.iter_split(part, TRAIN_SPLIT_FRACTION, seed=DATASET_SEED):
+        if max_rows is not None:
+            chunk = chunk.iloc[:max_rows - rows]
+            if chunk.empty:
+                break
+        evaluated = generate_and_evaluate(chunk, system_prompt, num_rules)
+        rows += len(evaluated)
+        correct += int((evaluated["correctness"] == "correct").sum())
+        print(f"🧮 {rows} {part} rows judged: {correct / rows:.3f} correct")
+    metric = metric_from_counts(correct, rows, scorer)
+    print(f"✅ {scorer} on {rows} {part} rows of corpus {corpus.content_hash[:12]}: {metric:.3f}")
+    return {"metric": metric, "rows": rows, "correct": correct, "content_hash": corpus.content_hash}
+
+def evaluate_test_set(test_set, system_prompt, num_rules, scorer, threshold, memo=None):
+    """
+    Generate and judge the test set, returning (evaluated DataFrame, metric value, sequential info).
+
+    With SEQUENTIAL_TEST_EVALUATION only as many random mini-batches are scored as needed for
+    the confidence interval on the metric to settle above or below threshold; the info dict
+    then reports the estimate, the interval and how many rows were used (None otherwise).
+    """
+    if not SEQUENTIAL_TEST_EVALUATION:
+        test_evals_all = generate_and_evaluate(test_set, system_prompt, num_rules, memo=memo)
+        y_true = ["correct"] * len(test_evals_all)
+        return test_evals_all, compute_metric(y_true, test_evals_all["correctness"], scorer=scorer), None
+
+    test_evals_all, info = sequential_evaluate(
+        test_set,
+        lambda batch: generate_and_evaluate(batch, system_prompt, num_rules, memo=memo),
+        threshold,
+        scorer=scorer,
+        batch_size=SEQUENTIAL_BATCH_SIZE,
+        confidence=SEQUENTIAL_CONFIDENCE,
+        min_rows=SEQUENTIAL_BATCH_SIZE,
+        method=SEQUENTIAL_METHOD
+    )
+    if scorer in PROPORTION_SCORERS:
+        metric_value = info["estimate"]
+    else:
+        metric_value = compute_metric(["correct"] * len(test_evals_all), test_evals_all["correctness"], scorer=scorer)
+    low, high = info["interval"]
+    print(f"📐 Scored {info['rows_used']}/{info['rows_total']} test rows: "
+          f"{scorer} ≈ {metric_value:.3f} [{low:.3f}, {high:.3f}]")
+    return test_evals_all, metric_value, info
+
+def optimize_loop(
+    train_set,
+    test_set,
+    system_prompt,
+    evaluators,
+    threshold=1,
+    loops=5,
+    scorer="accuracy",
+    num_rules=NUM_RULES,
+    run_dir=None,
+    experiment=None
+):
+    """
+    scorer: one of "accuracy", "f1", "precision", "recall"
+    threshold: float, threshold for the selected metric
+    num_rules: int, number of rules to use for evaluation (determines which prompt files to load)
+    run_dir: optional directory for per-stage checkpoints; calling again with the same
+        directory resumes after the last completed stage (see resume_experiment)
+    experiment: name of this run in the results store, default "{num_rules}_rules_{timestamp}"
+
+    Returns:
+        dict with keys:
+            "train": list of train set scores per run
+            "test": list of test set scores per run
+            "prompt": list of system prompts used for each test run
+            "raw": test set DataFrame (output, correctness, explanation) of each test run; with
+                RESULTS_STORE_PATH a lazy IterationFrames view reading them from the Parquet store,
+                otherwise a list of deepcopies
+            "num_rules": number of rules used for this experiment
+            "test_sequential": per test run, the sequential evaluation info (estimate, interval,
+                rows used) when SEQUENTIAL_TEST_EVALUATION is on, else None
+            "instrumentation": seconds per stage and per-model requests, 429s, tokens,
+                latency histogram and estimated cost of this run (see Tracer.summary)
+            "judge_parsing": per judge, how many responses parsed cleanly, needed repair or failed
+            "rule_violation_counts": per loop, how many train rows violate each rule (most violated first)
+            "judge_cascade": per judge, rows judged, escalated to gpt-4o, audited and agreed on
+                (empty unless JUDGE_CASCADE_MODEL is set)
+    """
+    import copy
+    from datetime import datetime
+
+    curr_loop = 1
+    train_metrics = []
+    test_metrics = []
+    prompts = []
+    raw_dfs = []
+    test_sequential = []
+    violation_counts = []
+    memo = VerdictMemo() if INCREMENTAL_EVALUATION else None
+    beam = [system_prompt]
+    tracer = get_tracer()
+    since = tracer.mark()
+    parse_snapshot = parse_stats.snapshot()
+    cascade_snapshot = cascade_stats.snapshot()
+    loop_cascade_snapshot = cascade_snapshot
+    sampler = FailureSampler(TRAIN_MINIBATCH_SIZE, TRAIN_FULL_PASS_EVERY) if TRAIN_MINIBATCH_SIZE else None
+
+    # Each stage's result is checkpointed so a crashed run can pick up where it stopped
+    checkpoint = RunCheckpoint(run_dir) if run_dir else None
+    if checkpoint is not None:
+        # Refuse to mix this run with stages of a run with other inputs or settings
+        checkpoint.start(
+            {"train_set": train_set, "test_set": test_set, "system_prompt": system_prompt},
+            kind="optimize_loop",
+            num_rules=num_rules,
+            threshold=threshold,
+            loops=loops,
+            scorer=scorer,
+            evaluators=[getattr(evaluator, "__name__", None) for evaluator in evaluators],
+            incremental_evaluation=INCREMENTAL_EVALUATION,
+            train_minibatch_size=TRAIN_MINIBATCH_SIZE
+        )
+        # The memo and sampler are not stage results; restore them with the stage they were saved after
+        checkpoint.track(memo=memo, sampler=sampler)
+
+    def stage(name, compute):
+        with tracer.span(name, num_rules=num_rules):
+            return checkpoint.stage(name, compute) if checkpoint is not None else compute()
+
+    # Evaluated test sets go to the columnar store instead of piling up in memory
+    store = ResultsStore(RESULTS_STORE_PATH) if RESULTS_STORE_PATH else None
+    if store is not None:
+        if experiment is None:
+            experiment = f"{num_rules}_rules_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # A resumed run keeps appending to the experiment it started
+        if checkpoint is not None:
+            experiment = checkpoint.stage("experiment", lambda name=experiment: name)
+        raw_dfs = store.frames(experiment)
+
+    def record_test_run(test_evals, prompt, metric_value):
+        # A sequential evaluation that stopped early leaves rows unscored; they have no output or verdict
+        if "scored" in test_evals.columns:
+            test_evals = test_evals[test_evals["scored"]].drop(columns="scored")
+        if "output" in test_set.columns:
+            test_set.loc[test_evals.index, "output"] = test_evals["output"]
+        else:
+            test_set["output"] = test_evals["output"]
+        prompts.append(prompt)
+        if store is not None:
+            store.append_iteration(experiment, len(prompts) - 1, test_evals, prompt, metric_value)
+        else:
+            raw_dfs.append(copy.deepcopy(test_evals))
+
+    print(f"🚀 Starting prompt optimization with {loops} iterations (scorer: {scorer}, threshold: {threshold})")
+    print()
+    
+    # Initial test evaluation before optimization
+    print(f"📊 Initial evaluation:")
+    test_evals_all, initial_metric_value, sequential_info = stage(
+        "initial/test",
+        lambda: evaluate_test_set(test_set, system_prompt, num_rules, scorer, threshold, memo=memo)
+    )
+    test_metrics.append(initial_metric_value)
+    test_sequential.append(sequential_info)
+    record_test_run(test_evals_all, system_prompt, initial_metric_value)
+    
+    print(f"✅ Initial test {scorer}: {initial_metric_value}")
+    print('\n')
+    
+    if initial_metric_value >= threshold:
+        print(f"🎉 Initial prompt already meets threshold!")
+        result = {
+            "train": train_metrics,
+            "test": test_metrics,
+            "prompt": prompts,
+            "raw": raw_dfs,
+            "num_rules": num_rules,
+            "test_sequential": test_sequential,
+            "instrumentation": tracer.write_summary(since, experiment=experiment, num_rules=num_rules),
+            "judge_parsing": parse_stats.since(parse_snapshot),
+            "rule_violation_counts": violation_counts,
+            "judge_cascade": cascade_stats.since(cascade_snapshot)
+        }
+        return result
+    
+    while loops > 0:
+        print(f"📊 Loop {curr_loop}: Optimizing prompt...")
+
+        # Work on a failure-weighted mini-batch of the train set, with a periodic full pass
+        train_batch = train_set
+        if sampler is not None:
+            batch_index = stage(f"loop{curr_loop}/sample", lambda: sampler.sample(train_set, curr_loop))
+            train_batch = train_set.loc[batch_index].copy()
+            print(f"🎯 Train {'full pass' if len(train_batch) == len(train_set) else 'mini-batch'}: "
+                  f"{len(train_batch)}/{len(train_set)} rows")
+        
+        # 1. Train set evaluation and optimization
+        train_outputs = stage(
+            f"loop{curr_loop}/generation",
+            lambda: generate_outputs(train_batch, system_prompt)
+        )
+        train_batch["output"] = train_outputs["output"]
+        train_batch["generation_abort"] = train_outputs["generation_abort"]
+
+        train_batch["correctness"] = [None] * len(train_batch)
+        train_batch["explanation"] = [None] * len(train_batch)
+        train_batch["rule_violations"] = [None] * len(train_batch)
+
+        optimizer = make_optimizer(system_prompt)
+
+        # Create evaluators with the correct num_rules parameter
+        # this is necessary because the evaluators are defined with a default value of NUM_RULES.
+        # Your evaluators might be defined differently.
+        evaluators_with_rules = []
+        evaluator_names = [getattr(evaluator, "__name__", None) for evaluator in evaluators]
+        use_fused = (
+            num_rules in FUSED_JUDGE_RULE_COUNTS
+            and "evaluate_output" in evaluator_names
+            and "rule_checker" in evaluator_names
+        )
+        if use_fused:
+            # One judge call per row produces all three feedback columns
+            evaluators_with_rules.append(lambda ds, nr=num_rules: fused_judge(ds, nr))
+        for evaluator in evaluators:
+            if use_fused and evaluator.__name__ in ('evaluate_output', 'rule_checker'):
+                continue
+            elif evaluator.__name__ == 'evaluate_output':
+                evaluators_with_rules.append(lambda ds, nr=num_rules: evaluate_output(ds, nr))
+            elif evaluator.__name__ == 'rule_checker':
+                evaluators_with_rules.append(lambda ds, nr=num_rules: rule_checker(ds, nr))
+            elif evaluator.__name__ == 'fused_judge':
+                evaluators_with_rules.append(lambda ds, nr=num_rules: fused_judge(ds, nr))
+            else:
+                evaluators_with_rules.append(evaluator)
+
+        # Rows whose output didn't change since they were last judged reuse that verdict
+        if memo is not None:
+            names = (['fused_judge'] if use_fused else []) + [
+                evaluator.__name__ for evaluator in evaluators
+                if not (use_fused and evaluator.__name__ in ('evaluate_output', 'rule_checker'))
+            ]
+            evaluators_with_rules = [
+                memo.wrap(name, evaluator, num_rules)
+                if name in ('evaluate_output', 'rule_checker', 'fused_judge') else evaluator
+                for name, evaluator in zip(names, evaluators_with_rules)
+            ]
+        if checkpoint is not None:
+            evaluators_with_rules = [
+                checkpoint.wrap_evaluator(f"loop{curr_loop}/evaluator{i}", evaluator)
+                for i, evaluator in enumerate(evaluators_with_rules)
+            ]
+        evaluators_with_rules = [
+            tracer.wrap(f"loop{curr_loop}/evaluator{i}", evaluator)
+            for i, evaluator in enumerate(evaluators_with_rules)
+        ]
+        
+        with tracer.span(f"loop{curr_loop}/run_evaluators", num_rules=num_rules):
+            train_batch, _ = optimizer.run_evaluators(
+                train_batch,
+                evaluators_with_rules,
+                feedback_columns=["correctness", "explanation", "rule_violations"]
+            )
+        if sampler is not None:
+            sampler.update(train_batch)
+        if "rule_violations" in train_batch.columns:
+            # Row x rule matrix of the train feedback, kept as per-rule counts
+            with open(f"prompts/rule-checker-prompt-{num_rules}.txt", "r") as file:
+                rules = parse_rule_set(file.read())
+            violation_counts.append(rule_violation_counts(train_batch["rule_violations"], rules))
+            if violation_counts[-1]:
+                top_rule, top_count = next(iter(violation_counts[-1].items()))
+                print(f"📋 {len(violation_counts[-1])} rules violated; most often ({top_count} rows): {top_rule[:80]}")
+
+        def optimize_prompt():
+            # Dedupe repeated rule violations and keep the most informative rows within the token budget
+            feedback_df = train_batch
+            if FEEDBACK_TOKEN_BUDGET:
+                feedback_df, packing_stats = pack_feedback(
+                    train_batch,
+                    ["correctness", "explanation", "rule_violations"],
+                    FEEDBACK_TOKEN_BUDGET
+                )
+                print(f"🗜️ Feedback packed: {packing_stats['rows_out']}/{packing_stats['rows_in']} rows, "
+                      f"{packing_stats['clusters']} violation clusters, {packing_stats['tokens']} tokens")
+
+            if BEAM_CANDIDATES > 1:
+                # Several candidates from different feedback subsets, scored concurrently on a train mini-batch
+                minibatch = train_batch.sample(n=min(BEAM_MINIBATCH_SIZE, len(train_batch)), random_state=curr_loop)
+                beam_scores = beam_step(
+                    beam,
+                    make_optimizer,
+                    feedback_df,
+                    ["correctness", "explanation", "rule_violations"],
+                    lambda candidates: [
+                        compute_metric(["correct"] * len(evals), evals["correctness"], scorer=scorer)
+                        for evals in generate_and_evaluate_many(minibatch, candidates, num_rules, memo=memo)
+                    ],
+                    k=BEAM_CANDIDATES,
+                    width=BEAM_WIDTH,
+                    fraction=BEAM_FEEDBACK_FRACTION,
+                    seed=curr_loop
+                )
+                print(f"🔦 Beam: " + ", ".join(f"{score:.3f}" for _, score in beam_scores))
+                return beam_scores[0][0], [prompt for prompt, _ in beam_scores]
+            else:
+                return optimizer.optimize(
+                    feedback_df,
+                    "output",
+                    feedback_columns=["correctness", "explanation", "rule_violations"],
+                    context_size_k=128000
+                ), beam
+
+        system_prompt, beam = stage(f"loop{curr_loop}/optimize", optimize_prompt)
+
+        # Evaluate train set after optimization
+        train_evals_post_all = stage(
+            f"loop{curr_loop}/train_post",
+            lambda: generate_and_evaluate(train_batch, system_prompt, num_rules, memo=memo)
+        )
+        if sampler is not None:
+            sampler.update(train_evals_post_all)
+        train_evals_post = train_evals_post_all["correctness"]
+        y_true_train_post = ["correct"] * len(train_evals_post)
+        y_pred_train_post = train_evals_post
+        train_metric_post_value = compute_metric(y_true_train_post, y_pred_train_post, scorer=scorer)
+        train_metrics.append(train_metric_post_value)
+        print(f"✅ Train {scorer}: {train_metric_post_value}")
+
+        # 2. Test set evaluation with optimized prompt
+        test_evals_all, metric_value, sequential_info = stage(
+            f"loop{curr_loop}/test",
+            lambda: evaluate_test_set(test_set, system_prompt, num_rules, scorer, threshold, memo=memo)
+        )
+        test_metrics.append(metric_value)
+        test_sequential.append(sequential_info)
+        record_test_run(test_evals_all, system_prompt, metric_value)
+        
+        print(f"✅ Test {scorer}: {metric_value}")
+        for judge_name, counts in parse_stats.since(parse_snapshot).items():
+            if counts["repaired"] or counts["failed"]:
+                print(f"🧩 {judge_name}: {counts['repaired']} judge responses repaired, "
+                      f"{counts['failed']} unparseable so far")
+        for judge_name, counts in cascade_stats.since(loop_cascade_snapshot).items():
+            agreement = f"{counts['agreed'] / counts['audited']:.0%}" if counts["audited"] else "n/a"
+            print(f"🪜 {judge_name}: {counts['escalated']}/{counts['judged']} rows escalated to gpt-4o, "
+                  f"audit agreement {agreement} ({counts['audited']} rows)")
+        loop_cascade_snapshot = cascade_stats.snapshot()
+        if memo is not None:
+            memo_stats = memo.stats()
+            print(f"♻️ Reused {memo_stats['reused']} verdicts, judged {memo_stats['judged']} rows so far")
+        print("\n")
+        
+        # 3. Check threshold
+        if metric_value >= threshold:
+            print(f"🎉 Threshold reached! Stopping optimization.")
+            result = {
+                "train": train_metrics,
+                "test": test_metrics,
+                "prompt": prompts,
+                "raw": raw_dfs,
+                "num_rules": num_rules,
+                "test_sequential": test_sequential,
+                "instrumentation": tracer.write_summary(since, experiment=experiment, num_rules=num_rules),
+                "judge_parsing": parse_stats.since(parse_snapshot),
+                "rule_violation_counts": violation_counts,
+                "judge_cascade": cascade_stats.since(cascade_snapshot)
+            }
+            return result
+
+        loops -= 1
+        curr_loop += 1
+
+    print(f"🔄 All {curr_loop-1} optimization loops completed.")
+    result = {
+        "train": train_metrics,
+        "test": test_metrics,
+        "prompt": prompts,
+        "raw": raw_dfs,
+        "num_rules": num_rules,
+        "test_sequential": test_sequential,
+        "instrumentation": tracer.write_summary(since, experiment=experiment, num_rules=num_rules),
+        "judge_parsing": parse_stats.since(parse_snapshot),
+        "rule_violation_counts": violation_counts,
+        "judge_cascade": cascade_stats.since(cascade_snapshot)
+    }
+    return result
+
+def validate_prompt_files(rule_counts):
+    """Validate that all required prompt files exist for the given rule counts."""
+    import os
+    
+    missing_files = []
+    for num_rules in rule_counts:
+        required_files = [
+            f"prompts/evaluator-prompt-{num_rules}.txt",
+            f"prompts/rule-checker-prompt-{num_rules}.txt"
+        ]
+        if num_rules in FUSED_JUDGE_RULE_COUNTS:
+            required_files.append(f"prompts/fused-judge-prompt-{num_rules}.txt")
+        
+        for file_path in required_files:
+            if not os.path.exists(file_path):
+                missing_files.append(file_path)
+    
+    if missing_files:
+        print("❌ Missing prompt files:")
+        for file_path in missing_files:
+            print(f"   - {file_path}")
+        print("\nAvailable prompt files:")
+        for file_path in os.listdir("prompts"):
+            print(f"   - prompts/{file_path}")
+        raise FileNotFoundError(f"Missing {len(missing_files)} required prompt files")
+    
+    print("✅ All required prompt files found")
+
+def _json_default(value):
+    """JSON fallback for result values: store references for lazy frames, records for DataFrames."""
+    import pandas as pd
+
+    if hasattr(value, "to_json_ref"):
+        return value.to_json_ref()
+    if isinstance(value, pd.DataFrame):
+        return value.to_dict(orient="records")
+    return str(value)
+
+def save_experiment_results(results, filename="experiment_results.json"):
+    """Save experiment results to a JSON file."""
+    import json
+    from datetime import datetime
+    
+    # Add timestamp to results
+    results_with_timestamp = {
+        "timestamp": datetime.now().isoformat(),
+        "results": results
+    }
+    
+    with open(filename, 'w') as f:
+        json.dump(results_with_timestamp, f, indent=2, default=_json_default)
+    
+    print(f"✅ Results saved to {filename}")
+
+def save_single_experiment_csv(results, filename):
+    """
+    Save a single experiment's results to CSV format.
+    
+    Args:
+        results: Results from a single optimize_loop run
+        filename: Output CSV filename
+    """
+    import pandas as pd
+    from datetime import datetime
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    # Extract data
+    num_rules = results['num_rules']
+    train_metrics = results.get('train', [])
+    test_metrics = results['test']
+    prompts = results['prompt']
+    
+    # Create DataFrame
+    data = []
+    for i, (test_metric, prompt) in enumerate(zip(test_metrics, prompts)):
+        row = {
+            'iteration': i,
+            'num_rules': num_rules,
+            'test_accuracy': test_metric,
+            'prompt': prompt
+        }
+        
+        # Add train metric if available
+        if i < len(train_metrics):
+            row['train_accuracy'] = train_metrics[i]
+        
+        data.append(row)
+    
+    df = pd.DataFrame(data)
+    
+    # Save to CSV with timestamp
+    filename_with_timestamp = f"{filename}_{timestamp}.csv"
+    df.to_csv(filename_with_timestamp, index=False)
+    print(f"✅ Results saved to {filename_with_timestamp}")
+    print(f"   📊 {len(df)} iterations, {num_rules} rules")
+    print(f"   📈 Final accuracy: {df['test_accuracy'].iloc[-1]:.3f}")
+
+def save_multi_experiment_csv(results, base_filename="experiment_results"):
+    """
+    Save multiple experiments' results to separate CSV files.
+    
+    Args:
+        results: Results from run_multi_rule_experiments
+        base_filename: Base name for the CSV files
+    """
+    from datetime import datetime
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    for experiment_name, experiment_results in results.items():
+        csv_filename = f"{base_filename}_{experiment_name}_{timestamp}.csv"
+        save_single_experiment_csv(experiment_results, csv_filename)
+
+
+
+def run_multi_rule_experiments(
+    train_set,
+    test_set,
+    system_prompt,
+    rule_counts=[10, 50, 100],
+    threshold=0.7,
+    loops=5,
+    scorer="accuracy",
+    run_dir=None
+):
+    """
+    Run optimization experiments with different numbers of rules.
+    
+    Args:
+        train_set: Training dataset
+        test_set: Test dataset
+        system_prompt: Initial system prompt
+        rule_counts: List of rule counts to test
+        threshold: Threshold for stopping optimization
+        loops: Number of optimization loops
+        scorer: Metric to use for evaluation
+        run_dir: Optional checkpoint directory; each experiment checkpoints into its own
+            subdirectory, and calling again with the same directory resumes the sweep
+        
+    Returns:
+        dict: Results for each rule count experiment
+    """
+    all_results = {}
+    
+    print(f"🚀 Starting multi-rule experiments with rule counts: {rule_counts}")
+    print("=" * 80)
+    
+    # Validate that all required prompt files exist
+    validate_prompt_files(rule_counts)
+
+    if run_dir:
+        checkpoint = RunCheckpoint(run_dir)
+        checkpoint.start(
+            {"train_set": train_set, "test_set": test_set, "system_prompt": system_prompt},
+            kind="multi_rule",
+            rule_counts=list(rule_counts),
+            threshold=threshold,
+            loops=loops,
+            scorer=scorer
+        )
+    
+    for num_rules in rule_counts:
+        print(f"\n📊 Running experiment with {num_rules} rules...")
+        print("-" * 60)
+        
+        # Run optimization for this rule count; optimize_loop adds columns to the
+        # datasets it is given, so every experiment gets its own copies
+        evaluators = [evaluate_output, rule_checker]
+        results = optimize_loop(
+            train_set.copy(), test_set.copy(), system_prompt, evaluators,
+            threshold=threshold,
+            loops=loops,
+            scorer=scorer,
+            num_rules=num_rules,
+            run_dir=os.path.join(run_dir, f"{num_rules}_rules") if run_dir else None
+        )
+        
+        all_results[f"{num_rules}_rules"] = results
+        
+        print(f"✅ Completed experiment with {num_rules} rules")
+        print(f"   Final test {scorer}: {results['test'][-1]:.3f}")
+    
+    print("\n" + "=" * 80)
+    print("🎉 All experiments completed!")
+    
+    # Print summary
+    print("\n📈 Summary of Results:")
+    for rule_count, results in all_results.items():
+        num_rules = results['num_rules']
+        final_test_score = results['test'][-1]
+        print(f"   {rule_count}: Test {scorer} = {final_test_score:.3f}")
+    
+    return all_results
+
+def resume_experiment(run_dir):
+    """
+    Resume a checkpointed optimize_loop or run_multi_rule_experiments run.
+
+    Completed stages are loaded from run_dir and the run continues from the first stage
+    that has no checkpoint, with the configuration and datasets the run started with.
+    """
+    checkpoint = RunCheckpoint(run_dir)
+    info = checkpoint.manifest()
+    if not checkpoint.has("inputs"):
+        raise FileNotFoundError(f"No checkpointed run found in {run_dir}")
+    inputs = checkpoint.load("inputs")
+    print(f"🔁 Resuming {info['kind']} run from {run_dir} (last completed stage: {checkpoint.last_stage()})")
+
+    if info["kind"] == "multi_rule":
+        return run_multi_rule_experiments(
+            inputs["train_set"], inputs["test_set"], inputs["system_prompt"],
+            rule_counts=info["rule_counts"],
+            threshold=info["threshold"],
+            loops=info["loops"],
+            scorer=info["scorer"],
+            run_dir=run_dir
+        )
+
+    known_evaluators = {
+        "evaluate_output": evaluate_output,
+        "rule_checker": rule_checker,
+        "fused_judge": fused_judge
+    }
+    evaluators = [known_evaluators[name] for name in info["evaluators"]]
+    return optimize_loop(
+        inputs["train_set"], inputs["test_set"], inputs["system_prompt"], evaluators,
+        threshold=info["threshold"],
+        loops=info["loops"],
+        scorer=info["scorer"],
+        num_rules=info["num_rules"],
+        run_dir=run_dir
+    )
+
+def online_prompt_learning(source, system_prompt, num_rules=NUM_RULES, prompt_path=ONLINE_PROMPT_PATH,
+                           max_traces=None):
+    """
+    Continually learn a prompt from a live feed of traces.
+
+    Args:
+        source: iterable of trace dicts, e.g. JsonlTailSource or online_learning.QueueSource
+        system_prompt: starting prompt
+        num_rules: rule set the traces are judged against
+        prompt_path: file the latest prompt is written to after every update, None to skip
+        max_traces: stop after this many traces, None to run until the source ends
+
+    Returns:
+        OnlinePromptLearner with the latest prompt and its stats
+    """
+    # The tracer only keeps counters, and the stage names are fixed, so a long-running
+    # feed does not grow memory; per-update summaries go to INSTRUMENTATION_PATH
+    tracer = get_tracer()
+    since = tracer.mark()
+
+    def judge(batch):
+        batch, _ = evaluate_output(batch, num_rules)
+        batch, _ = rule_checker(batch, num_rules)
+        return batch
+
+    def optimizer_factory(prompt):
+        optimizer = make_optimizer(prompt)
+        optimizer.optimize = tracer.wrap("online/optimize", optimizer.optimize)
+        return optimizer
+
+    def on_update(prompt, version, stats):
+        nonlocal since
+        if prompt_path:
+            with open(prompt_path, "w") as f:
+                f.write(prompt)
+        tracer.write_summary(since, online_version=version)
+        since = tracer.mark()
+        print(f"✅ Prompt v{version} saved ({stats['traces']} traces, {stats['failures']} failures, "
+              f"{stats['human_labeled']} human labels so far)")
+
+    learner = OnlinePromptLearner(
+        system_prompt,
+        tracer.wrap("online/judge", judge),
+        optimizer_factory,
+        batch_size=ONLINE_BATCH_SIZE,
+        window_size=ONLINE_WINDOW_SIZE,
+        min_new_failures=ONLINE_MIN_NEW_FAILURES,
+        on_update=on_update
+    )
+    print(f"🚀 Learning online from {getattr(source, 'path', source)}...")
+    learner.run(source, max_traces=max_traces)
+    return learner
+
+def config_snapshot():
+    """The current value of every UPPERCASE configuration constant in this module."""
+    return {name: value for name, value in globals().items() if name.isupper() and not name.startswith("_")}
+
+def run_single_experiment(num_rules=None, loops=None, threshold=1, scorer="accuracy", run_dir=None):
+    """Load the datasets, optimize the prompt for one rule count and save the results."""
+    num_rules = NUM_RULES if num_rules is None else num_rules
+    loops = NUM_OPTIMIZATION_LOOPS if loops is None else loops
+    print("🚀 Running single experiment...")
+
+    # Validate that required prompt files exist
+    validate_prompt_files([num_rules])
+    train_set, test_set = load_datasets()
+
+    evaluators = [evaluate_output, rule_checker]
+    results = optimize_loop(
+        train_set, test_set, system_prompt, evaluators,
+        threshold=threshold,
+        loops=loops,
+        scorer=scorer,
+        num_rules=num_rules,
+        run_dir=run_dir
+    )
+
+    # Save results
+    save_experiment_results(results, "single_experiment_results.json")
+
+    # Save CSV results
+    save_single_experiment_csv(results, "single_experiment")
+
+    print("\n📊 Single experiment results:")
+    print(results)
+    return results
+
+def run_rule_sweep(rule_counts=None, loops=None, workers=None, run_dir=None):
+    """Run the multi-rule experiments (in worker processes when workers > 1) and save the results."""
+    rule_counts = RULE_COUNTS_TO_TEST if rule_counts is None else rule_counts
+    loops = NUM_OPTIMIZATION_LOOPS if loops is None else loops
+    workers = PARALLEL_WORKERS if workers is None else workers
+    validate_prompt_files(rule_counts)
+    train_set, test_set = load_datasets()
+
+    if workers > 1:
+        import pandas as pd
+
+        print("🚀 Running multi-rule experiments in parallel...")
+        multi_results = run_parallel_experiments(
+            pd.concat([train_set, test_set]), system_prompt,
+            rule_counts=rule_counts,
+            seeds=SEEDS_TO_TEST,
+            scorers=SCORERS_TO_TEST,
+            loops=loops,
+            max_workers=workers,
+            rate_limits=MODEL_RATE_LIMITS,
+            max_concurrency=MAX_CONCURRENCY,
+            run_dir=run_dir,
+            config=config_snapshot()
+        )
+    else:
+        print("🚀 Running multi-rule experiments...")
+        multi_results = run_multi_rule_experiments(
+            train_set, test_set, system_prompt,
+            rule_counts=rule_counts,
+            loops=loops,
+            run_dir=run_dir
+        )
+
+    # Save results
+    save_experiment_results(multi_results, "multi_rule_experiments.json")
+
+    # Save CSV results
+    save_multi_experiment_csv(multi_results, "multi_rule_experiments")
+
+    print("\n📊 Multi-rule experiment results:")
+    print(multi_results)
+    return multi_results
+
+def run_online(trace_path=None, num_rules=None):
+    """Learn online from the JSONL trace feed at trace_path until interrupted."""
+    trace_path = ONLINE_TRACE_PATH if trace_path is None else trace_path
+    num_rules = NUM_RULES if num_rules is None else num_rules
+    validate_prompt_files([num_rules])
+    try:
+        return online_prompt_learning(
+            JsonlTailSource(trace_path), system_prompt, num_rules=num_rules, prompt_path=ONLINE_PROMPT_PATH
+        )
+    except KeyboardInterrupt:
+        print("🛑 Stopped online prompt learning")
+
+def print_run_stats():
+    """Print cache, stage timing, cost and scheduler statistics, and close the response cache."""
+    if llm_cache is not _UNSET and llm_cache is not None:
+        cache_stats = llm_cache.stats()
+        print(f"\n💾 LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({cache_stats['hit_rate']:.0%} hit rate, {cache_stats['entries']} entries)")
+        llm_cache.close()
+
+    run_summary = get_tracer().summary()
+    for stage_name, stage_stats in run_summary["stages"].items():
+        print(f"⏱️ {stage_name}: {stage_stats['seconds']:.1f}s, {stage_stats['requests']} requests, "
+              f"${stage_stats['estimated_cost_usd']:.2f}")
+    print(f"💰 Estimated cost: ${run_summary['estimated_cost_usd']:.2f}")
+
+    for model_name, model_stats in get_scheduler().stats().items():
+        print(f"🚦 {model_name}: {model_stats['completed']} calls, {model_stats['rate_limited']} rate limited, "
+              f"final concurrency limit {model_stats['concurrency_limit']}, "
+              f"{model_stats['cached_tokens']}/{model_stats['prompt_tokens']} prompt tokens served from the provider cache")
+
+def main():
+    """Run what the configuration at the top of this file asks for."""
+    if ONLINE_TRACE_PATH:
+        run_online()
+        return
+    if RUN_MULTI_RULE_EXPERIMENTS:
+        run_rule_sweep(run_dir=RUN_DIR)
+    else:
+        run_single_experiment(run_dir=RUN_DIR)
+    print_run_stats()
+
+# Run experiments based on configuration
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Token-budgeted compaction of train feedback before optimize().
+
+optimize() receives every train row's output together with its correctness,
+explanation and rule violations, and at 100 rules the same rule texts repeat
+across most rows. pack_feedback dedupes the violations of each row, groups rows
+by the set of rules they break, and fills a token budget with the most
+informative rows: one representative per violation cluster first (failures
+before passes, most common clusters first), then further failures
+round-robin across clusters while the budget lasts.
+"""
+
+from collections import defaultdict
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _encoding(model_name):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text, model_name="gpt-4o"):
+    """Token count with tiktoken, or about 4 characters per token without it."""
+    encoding = _encoding(model_name)
+    text = "" if text is None else str(text)
+    return len(encoding.encode(text, disallowed_special=())) if encoding else len(text) // 4
+
+
+def violation_set(value):
+    """The distinct broken rules listed in a rule_violations cell."""
+    if not isinstance(value, str):
+        return frozenset()
+    return frozenset(line.strip(" -*\t") for line in value.splitlines() if line.strip(" -*\t"))
+
+
+def _dedupe_lines(value):
+    if not isinstance(value, str):
+        return value
+    return "\n".join(dict.fromkeys(line.strip() for line in value.splitlines() if line.strip()))
+
+
+def pack_feedback(dataset, feedback_columns, token_budget, output_column="output",
+                  violations_column="rule_violations", model_name="gpt-4o"):
+    """
+    Select the train rows to show the meta-prompt optimizer within a token budget.
+
+    Args:
+        dataset: train DataFrame with the output and feedback columns
+        feedback_columns: columns passed to optimize() alongside the output
+        token_budget: maximum tokens of output + feedback across the selected rows; when no row
+            fits, the cheapest failing row is still returned so optimize() gets an example
+        output_column: column with the generated output
+        violations_column: feedback column listing broken rules, one per line
+
+    Returns:
+        (packed, stats): packed is the selected rows in their original order with duplicate
+        violation lines removed; stats has "rows_in", "rows_out", "clusters" and "tokens"
+    """
+    dataset = dataset.copy()
+    if violations_column in dataset.columns:
+        dataset[violations_column] = [_dedupe_lines(v) for v in dataset[violations_column]]
+
+    columns = [output_column] + [c for c in feedback_columns if c in dataset.columns]
+    costs = {
+        index: sum(count_tokens(row[c], model_name) for c in columns)
+        for index, row in dataset[columns].iterrows()
+    }
+
+    clusters = defaultdict(list)
+    for index, row in dataset.iterrows():
+        failed = row.get("correctness") != "correct"
+        violations = violation_set(row.get(violations_column))
+        clusters[(failed, violations)].append(index)
+    # Failures first, then the clusters that most rows fall into; cheapest row first within a cluster.
+    ordered = sorted(clusters.items(), key=lambda item: (not item[0][0], -len(item[1])))
+    queues = [(failed, sorted(indices, key=costs.get)) for (failed, _), indices in ordered]
+
+    selected = []
+    used = 0
+
+    def take(index):
+        nonlocal used
+        if used + costs[index] > token_budget:
+            return False
+        selected.append(index)
+        used += costs[index]
+        return True
+
+    # One representative per cluster, then more failures round-robin across clusters.
+    for _, indices in queues:
+        take(indices[0])
+    if not selected and queues:
+        # optimize() needs at least one example: keep the cheapest failing row (or row), even over budget
+        failing = [index for failed, indices in queues if failed for index in indices]
+        cheapest = min(failing or costs, key=costs.get)
+        selected.append(cheapest)
+        used += costs[cheapest]
+    remaining = [indices[1:] for failed, indices in queues if failed]
+    while any(remaining):
+        for indices in remaining:
+            if indices:
+                take(indices.pop(0))
+
+    chosen = set(selected)
+    packed = dataset[[index in chosen for index in dataset.index]]
+    stats = {
+        "rows_in": len(dataset),
+        "rows_out": len(packed),
+        "clusters": len(clusters),
+        "tokens": used,
+    }
+    return packed, stats
@@ -0,0 +1,94 @@
+"""Reuse judge verdicts for rows whose output did not change.
+
+Once the prompt starts to converge, most rows come back byte-identical from
+one loop to the next. VerdictMemo keeps the verdict of every (evaluator,
+rule count, input, output) it has seen, so only rows with a new output are
+sent to the evaluators again.
+"""
+
+import hashlib
+import json
+
+
+class VerdictMemo:
+    """Per-row verdicts of one optimize_loop run, keyed on a hash of the judged row."""
+
+    def __init__(self):
+        self._verdicts = {}
+        self._columns = {}
+        self.reused = 0
+        self.judged = 0
+
+    @staticmethod
+    def key(evaluator_name, num_rules, row_input, output):
+        payload = json.dumps([evaluator_name, num_rules, str(row_input), str(output)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, evaluator_name, num_rules, row_input, output):
+        verdict = self._verdicts.get(self.key(evaluator_name, num_rules, row_input, output))
+        if verdict is not None:
+            self.reused += 1
+        return verdict
+
+    def put(self, evaluator_name, num_rules, row_input, output, verdict):
+        self.judged += 1
+        self._columns.setdefault(evaluator_name, list(verdict))
+        # A row the judge failed to answer is retried next time rather than remembered.
+        if output is None or all(value is None for value in verdict.values()):
+            return
+        self._verdicts[self.key(evaluator_name, num_rules, row_input, output)] = dict(verdict)
+
+    def bind(self, evaluator_name, num_rules):
+        """A get(row) / put(row, verdict) view for one evaluator, as used by pipeline.run_pipeline."""
+        return _BoundMemo(self, evaluator_name, num_rules)
+
+    def wrap(self, evaluator_name, evaluator, num_rules):
+        """
+        Wrap an evaluator(dataset) -> (dataset, columns) so unchanged rows reuse their verdicts.
+
+        Only rows whose (input, output) pair has not been judged before are passed to evaluator.
+        """
+        def memoized(dataset):
+            inputs = dataset["input"].tolist() if "input" in dataset.columns else [None] * len(dataset)
+            outputs = dataset["output"].tolist()
+            cached = [self.get(evaluator_name, num_rules, i, o) for i, o in zip(inputs, outputs)]
+            todo = [verdict is None for verdict in cached]
+
+            dataset = dataset.copy()
+            if any(todo):
+                judged, columns = evaluator(dataset[todo])
+                self._columns[evaluator_name] = list(columns)
+                judged_rows = iter(judged[columns].to_dict("records"))
+                for position, missing in enumerate(todo):
+                    if missing:
+                        cached[position] = next(judged_rows)
+                        self.put(evaluator_name, num_rules, inputs[position], outputs[position], cached[position])
+            # A memo filled only through bind().put() never saw the evaluator's column list
+            columns = self._columns.get(evaluator_name) or (list(cached[0]) if cached else [])
+            for col in columns:
+                dataset[col] = [verdict.get(col) for verdict in cached]
+            return dataset, columns
+
+        memoized.__name__ = evaluator_name
+        return memoized
+
+    def stats(self):
+        total = self.reused + self.judged
+        return {
+            "reused": self.reused,
+            "judged": self.judged,
+            "reuse_rate": self.reused / total if total else 0.0,
+        }
+
+
+class _BoundMemo:
+    def __init__(self, memo, evaluator_name, num_rules):
+        self.memo = memo
+        self.evaluator_name = evaluator_name
+        self.num_rules = num_rules
+
+    def get(self, row):
+        return self.memo.get(self.evaluator_name, self.num_rules, row.get("input"), row["output"])
+
+    def put(self, row, verdict):
+        self.memo.put(self.evaluator_name, self.num_rules, row.get("input"), row["output"], verdict)
@@ -0,0 +1,242 @@
+"""Per-stage timing, token and cost instrumentation.
+
+Tracer records two kinds of events:
+
+- spans: wall-clock time of a named stage (test evaluation, train generation,
+  each evaluator, run_evaluators, optimize, ...), nested by context;
+- requests: every raw chat-completions attempt a model built by make_model
+  sends (retries included), with its latency, prompt/completion/cached tokens
+  and whether it failed or was rate limited.
+
+Events are appended to a JSONL file as they happen and folded into running
+per-stage totals and per-model counters and latency histograms; raw events are
+only kept in the file, so memory stays flat however long a run lasts.
+summary() turns the counters into per-stage totals, per-model latency
+percentiles, token counts and an estimated cost, which optimize_loop stores
+with its results.
+"""
+
+import contextvars
+import copy
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1-2025-04-14": (2.00, 0.50, 8.00),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+}
+
+UNSTAGED = "(outside stages)"  # stage name requests made outside any span are counted under
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)  # upper bounds in seconds; slower calls go to "inf"
+# Finer buckets the percentiles are read from: 10 ms to ~11 min, each ~19% wider than the last
+_PERCENTILE_BUCKETS = tuple(0.01 * 2 ** (i / 4) for i in range(81))
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def _bucket(bounds, value):
+    """Index of the first bound >= value (len(bounds) for values above every bound)."""
+    return next((i for i, bound in enumerate(bounds) if value <= bound), len(bounds))
+
+
+def _percentile(counts, q):
+    """Upper bound of the fine latency bucket holding the q-th percentile, None without latencies."""
+    total = sum(counts)
+    if not total:
+        return None
+    rank = min(total - 1, int(q / 100 * total))
+    seen = 0
+    for i, count in enumerate(counts):
+        seen += count
+        if seen > rank:
+            return _PERCENTILE_BUCKETS[i] if i < len(_PERCENTILE_BUCKETS) else float("inf")
+
+
+def _new_stage():
+    return {"count": 0, "seconds": 0.0, "requests": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "cached_tokens": 0, "estimated_cost_usd": 0.0}
+
+
+def _new_model():
+    return {
+        "requests": 0, "rate_limited": 0, "errors": 0,
+        "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0,
+        "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+        "latency_fine": [0] * (len(_PERCENTILE_BUCKETS) + 1),
+    }
+
+
+def _minus(current, before):
+    """current - before for (nested) counters; keys missing from before count as zero."""
+    if isinstance(current, dict):
+        return {key: _minus(value, (before or {}).get(key)) for key, value in current.items()}
+    if isinstance(current, list):
+        return [a - b for a, b in zip(current, before or [0] * len(current))]
+    return current - (before or 0)
+
+
+def estimate_cost(model_name, prompt_tokens, completion_tokens, cached_tokens=0):
+    """Estimated USD cost of a model's tokens, None for models without a known price."""
+    prices = MODEL_PRICES.get(model_name)
+    if prices is None:
+        return None
+    input_price, cached_price, output_price = prices
+    return ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+            + completion_tokens * output_price) / 1_000_000
+
+
+class Tracer:
+    """
+    Aggregates spans and request events, optionally appending the raw events to a JSONL file.
+
+    Args:
+        path: JSONL file to append events to, None to keep only the aggregates
+        log_requests: also write one line per request (not only spans and summaries)
+    """
+
+    def __init__(self, path=None, log_requests=True):
+        self.path = path
+        self.log_requests = log_requests
+        self._stages = {}
+        self._models = {}
+        self._lock = threading.Lock()
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def _emit(self, event):
+        if not self.path:
+            return
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(event, default=str) + "\n")
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the block as a span named name, nested under the enclosing span."""
+        parent = _current_span.get()
+        token = _current_span.set(name)
+        start = time.time()
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            span = {
+                "type": "span",
+                "name": name,
+                "parent": parent,
+                "start": start,
+                "seconds": time.perf_counter() - started,
+                "error": error,
+                **attributes,
+            }
+            with self._lock:
+                stage = self._stages.get(name)
+                if stage is None:
+                    stage = self._stages[name] = _new_stage()
+                stage["count"] += 1
+                stage["seconds"] += span["seconds"]
+            self._emit(span)
+
+    def wrap(self, name, function):
+        """function wrapped in a span named name."""
+        @functools.wraps(function)
+        def traced(*args, **kwargs):
+            with self.span(name):
+                return function(*args, **kwargs)
+
+        return traced
+
+    def record_request(self, model_name, seconds, prompt_tokens=None, completion_tokens=None,
+                       cached_tokens=None, rate_limited=False, error=None):
+        request = {
+            "type": "request",
+            "model": model_name,
+            "span": _current_span.get(),
+            "seconds": seconds,
+            "prompt_tokens": prompt_tokens or 0,
+            "completion_tokens": completion_tokens or 0,
+            "cached_tokens": cached_tokens or 0,
+            "rate_limited": rate_limited,
+            "error": error,
+        }
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._models[model_name] = _new_model()
+            model["requests"] += 1
+            model["rate_limited"] += rate_limited
+            model["errors"] += error is not None and not rate_limited
+            for key in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+                model[key] += request[key]
+            stage_name = request["span"] or UNSTAGED
+            stage = self._stages.get(stage_name)
+            if stage is None:
+                stage = self._stages[stage_name] = _new_stage()
+            stage["requests"] += 1
+            for key in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+                stage[key] += request[key]
+            stage["estimated_cost_usd"] += estimate_cost(
+                model_name, request["prompt_tokens"], request["completion_tokens"], request["cached_tokens"]
+            ) or 0.0
+            if error is None:
+                model["latency_buckets"][_bucket(LATENCY_BUCKETS, seconds)] += 1
+                model["latency_fine"][_bucket(_PERCENTILE_BUCKETS, seconds)] += 1
+        if self.log_requests:
+            self._emit(request)
+
+    def mark(self):
+        """Snapshot of the counters to pass to summary(since=...) to summarize only later events."""
+        with self._lock:
+            return {"stages": copy.deepcopy(self._stages), "models": copy.deepcopy(self._models)}
+
+    def summary(self, since=None):
+        """
+        Per-stage and per-model totals of the events recorded after since (a mark()).
+
+        Returns:
+            dict with "stages" ({name: {"count", "seconds", "requests", tokens, "estimated_cost_usd"}},
+            requests counted under their innermost stage, or UNSTAGED), "models" ({model: requests,
+            rate_limited, errors, tokens, estimated_cost_usd, latency p50/p95 and histogram})
+            and the overall "estimated_cost_usd"; the percentiles are the upper bounds of
+            ~19%-wide latency buckets
+        """
+        since = since or {"stages": {}, "models": {}}
+        with self._lock:
+            stages = _minus(self._stages, since["stages"])
+            models = _minus(self._models, since["models"])
+        stages = {name: stage for name, stage in stages.items() if stage["count"] or stage["requests"]}
+        models = {name: model for name, model in models.items() if model["requests"]}
+
+        total_cost = 0.0
+        for model_name, model in models.items():
+            buckets = model.pop("latency_buckets")
+            fine = model.pop("latency_fine")
+            histogram = {f"<={bound}s": count for bound, count in zip(LATENCY_BUCKETS, buckets)}
+            histogram["inf"] = buckets[-1]
+            model["latency_p50"] = _percentile(fine, 50)
+            model["latency_p95"] = _percentile(fine, 95)
+            model["latency_histogram"] = histogram
+            model["estimated_cost_usd"] = estimate_cost(
+                model_name, model["prompt_tokens"], model["completion_tokens"], model["cached_tokens"]
+            )
+            total_cost += model["estimated_cost_usd"] or 0.0
+
+        return {"stages": stages, "models": models, "estimated_cost_usd": round(total_cost, 6)}
+
+    def write_summary(self, since=None, **attributes):
+        """Append the summary of events after since to the JSONL file and return it."""
+        summary = self.summary(since)
+        self._emit({"type": "summary", "time": time.time(), **attributes, **summary})
+        return summary
@@ -0,0 +1,178 @@
+"""Cheap-first judge cascade.
+
+Every row that passes the local rule engine used to be judged by gpt-4o,
+even when the verdict is obvious. JudgeCascade asks a cheap model first, with
+the same template plus a request for a confidence, and only rows whose cheap
+verdict is unsure (low confidence, unparseable, or failed) escalate to the
+expensive judge. A stable sample of confident rows is also sent to the
+expensive judge, which then decides for them, so cascade_stats can report how
+often the two judges agree.
+"""
+
+import hashlib
+import threading
+
+from .judge_parsing import parse_judge_response
+from .rule_sharding import ajudge_shards, merge_verdicts
+
+CONFIDENCE_SCHEMA = {"confidence": "number"}
+CONFIDENCE_INSTRUCTION = (
+    '\n\nAlso include a "confidence" field in your JSON response: a number from 0 to 1 for how '
+    "certain you are of your answer. Use a low value if the page is ambiguous or you could not check every rule."
+)
+
+
+class CascadeStats:
+    """Thread-safe judged / escalated / audited / agreed counts per judge."""
+
+    def __init__(self):
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, judge, escalated, audited, agreed):
+        with self._lock:
+            counts = self.counts.setdefault(judge, {"judged": 0, "escalated": 0, "audited": 0, "agreed": 0})
+            counts["judged"] += 1
+            counts["escalated"] += escalated
+            counts["audited"] += audited
+            counts["agreed"] += bool(agreed)
+
+    def snapshot(self):
+        with self._lock:
+            return {judge: dict(counts) for judge, counts in self.counts.items()}
+
+    def since(self, snapshot):
+        """Counts recorded after snapshot was taken."""
+        current = self.snapshot()
+        return {
+            judge: {name: n - snapshot.get(judge, {}).get(name, 0) for name, n in counts.items()}
+            for judge, counts in current.items()
+        }
+
+
+cascade_stats = CascadeStats()
+
+
+def with_confidence(shards):
+    """Copies of the judge shards that also ask for a confidence (in the static instruction when there is one)."""
+    asked = []
+    for shard in shards:
+        shard = dict(shard)
+        if shard["instruction"] is not None:
+            shard["instruction"] += CONFIDENCE_INSTRUCTION
+        else:
+            shard["template"] += CONFIDENCE_INSTRUCTION
+        asked.append(shard)
+    return asked
+
+
+def agree(cheap, expensive):
+    """Whether two verdicts for a row reach the same conclusion."""
+    if "correctness" in expensive:
+        return cheap.get("correctness") == expensive.get("correctness")
+    return bool(cheap.get("rule_violations")) == bool(expensive.get("rule_violations"))
+
+
+def _missing(value):
+    return value is None or value != value  # NaN for rows llm_generate failed on
+
+
+def _row_key(row):
+    return f"{row.get('input')}\x1f{row.get('output')}"
+
+
+class JudgeCascade:
+    """
+    Judge with a cheap model first and escalate unsure rows to the expensive judge.
+
+    Args:
+        model: cheap judge model from make_model
+        shards: the expensive judge's shards (see rule_sharding.shard_template)
+        output_parser: parser for one judge response, as passed to llm_generate
+        judge: name the outcomes are counted under in cascade_stats
+        threshold: cheap verdicts with a lower confidence escalate
+        audit_fraction: share of confident rows also judged by the expensive judge
+    """
+
+    def __init__(self, model, shards, output_parser, judge, threshold=0.8, audit_fraction=0.0):
+        self.model = model
+        self.shards = with_confidence(shards)
+        self.judge = judge
+        self.threshold = threshold
+        self.audit_fraction = audit_fraction
+        self._output_parser = output_parser
+
+    def output_parser(self, response, row_index):
+        """The judge's parser, plus the "confidence" field."""
+        verdict = self._output_parser(response, row_index)
+        values, _ = parse_judge_response(response, CONFIDENCE_SCHEMA, f"{self.judge}/confidence")
+        verdict["confidence"] = values["confidence"]
+        return verdict
+
+    def route(self, cheap, row):
+        """(escalate, audit) for one row's cheap verdict."""
+        confidence = cheap.get("confidence")
+        escalate = (
+            not cheap or _missing(confidence) or confidence < self.threshold
+            or any(_missing(cheap.get(col)) for col in ("correctness", "rule_violations") if col in cheap)
+        )
+        if escalate or not self.audit_fraction:
+            return escalate, False
+        # Hash of the row, so the same rows are audited in every loop
+        digest = hashlib.sha1(_row_key(row).encode("utf-8")).digest()
+        return False, int.from_bytes(digest[:8], "big") / 2 ** 64 < self.audit_fraction
+
+    def finish(self, cheap, expensive, escalated, audited):
+        """The row's final verdict (the expensive one when there is one); records the outcome."""
+        cheap = {key: value for key, value in cheap.items() if key != "confidence"}
+        agreed = audited and expensive is not None and agree(cheap, expensive)
+        cascade_stats.record(self.judge, escalated, audited, agreed)
+        return expensive if expensive is not None else cheap
+
+    async def ajudge(self, row, index, expensive):
+        """
+        Judge one row; expensive is a coroutine function returning the expensive judge's verdict.
+        """
+        try:
+            cheap = merge_verdicts(
+                await ajudge_shards(self.model, self.shards, row, index, self.output_parser), self.shards
+            )
+        except Exception as error:
+            print(f"⚠️ Cheap judging failed for row {index}: {error}")
+            cheap = {}
+        escalate, audit = self.route(cheap, row)
+        verdict = await expensive() if escalate or audit else None
+        return self.finish(cheap, verdict, escalate, audit)
+
+    def judge_frame(self, dataframe, judge_rows, expensive):
+        """
+        Judge a DataFrame: the cheap pass over every row, then the expensive judge on the
+        escalated and audited rows.
+
+        Args:
+            dataframe: rows to judge
+            judge_rows: fn(dataframe, model, shards, output_parser) -> DataFrame of verdicts
+            expensive: fn(dataframe) -> DataFrame of the expensive judge's verdicts
+
+        Returns:
+            DataFrame indexed like dataframe with the parser's columns
+        """
+        import pandas as pd
+
+        cheap = judge_rows(dataframe, self.model, self.shards, self.output_parser)
+        cheap_verdicts = cheap.reindex(dataframe.index).to_dict("records")
+        routes = [self.route(verdict, row) for verdict, row in zip(cheap_verdicts, dataframe.to_dict("records"))]
+        selected = [escalate or audit for escalate, audit in routes]
+
+        expensive_verdicts = {}
+        if any(selected):
+            escalated = dataframe[selected]
+            print(f"🪜 {self.judge}: {len(escalated)}/{len(dataframe)} rows escalated or audited by the expensive judge")
+            expensive_verdicts = expensive(escalated).to_dict("index")
+        return pd.DataFrame(
+            [
+                self.finish(verdict, expensive_verdicts.get(index), escalate, audit)
+                for index, verdict, (escalate, audit) in zip(dataframe.index, cheap_verdicts, routes)
+            ],
+            index=dataframe.index
+        )
@@ -0,0 +1,209 @@
+"""Structured parsing of judge responses.
+
+The judges are called with response_format json_object, yet their responses
+used to be picked apart with regexes: r'"explanation":\\s*"([^"]*)"' stops at
+the first escaped quote and finds nothing when the field is a JSON list, and
+every parse failure ends up counted as "incorrect". parse_judge_response
+decodes the response once (with orjson when it is installed), validates it
+against the parser's declared schema, falls back to a tolerant repair pass
+(code fences, surrounding prose, trailing commas, single quotes, per-field
+extraction) and records ok / repaired / failed counts per judge in
+parse_stats.
+"""
+
+import json
+import re
+import threading
+
+try:
+    import orjson
+
+    def _loads(text):
+        return orjson.loads(text)
+except ImportError:  # pragma: no cover - orjson is optional
+    _loads = json.loads
+
+# Schema fields: ("enum", allowed values), "text" (a string; lists are joined one item per line),
+# "number" (a float)
+EVALUATE_OUTPUT_SCHEMA = {
+    "correctness": ("enum", ("correct", "incorrect")),
+    "explanation": "text",
+}
+RULE_CHECKER_SCHEMA = {
+    "explanation": "text",
+}
+FUSED_JUDGE_SCHEMA = {
+    "correctness": ("enum", ("correct", "incorrect")),
+    "explanation": "text",
+    "rule_violations": "text",
+}
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+class ParseStats:
+    """Thread-safe ok / repaired / failed counts per judge."""
+
+    def __init__(self):
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, judge, status):
+        with self._lock:
+            counts = self.counts.setdefault(judge, {"ok": 0, "repaired": 0, "failed": 0})
+            counts[status] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {judge: dict(counts) for judge, counts in self.counts.items()}
+
+    def since(self, snapshot):
+        """Counts recorded after snapshot was taken."""
+        current = self.snapshot()
+        return {
+            judge: {status: n - snapshot.get(judge, {}).get(status, 0) for status, n in counts.items()}
+            for judge, counts in current.items()
+        }
+
+
+parse_stats = ParseStats()
+
+
+def _text(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return "\n".join(str(item) for item in value if item is not None and str(item).strip())
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return str(value)
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(str(value).strip().strip('"'))
+    except ValueError:
+        return None
+
+
+def _validate(data, schema):
+    """Coerce data to the schema; return (values, fields that are missing or invalid)."""
+    values, invalid = {}, []
+    for field, spec in schema.items():
+        value = data.get(field)
+        if spec == "text":
+            values[field] = _text(value)
+            if value is None:
+                invalid.append(field)
+        elif spec == "number":
+            values[field] = _number(value)
+            if values[field] is None:
+                invalid.append(field)
+        else:
+            normalized = str(value).strip().strip('"').lower() if value is not None else None
+            values[field] = normalized if normalized in spec[1] else None
+            if values[field] is None:
+                invalid.append(field)
+    return values, invalid
+
+
+def _as_object(data, schema):
+    """Accept a top-level list: of objects (first one) or of strings (the single text field)."""
+    if isinstance(data, dict):
+        return data
+    if isinstance(data, list):
+        objects = [item for item in data if isinstance(item, dict)]
+        if objects:
+            return objects[0]
+        text_fields = [field for field, spec in schema.items() if spec == "text"]
+        if len(schema) == 1 and text_fields:
+            return {text_fields[0]: data}
+    return None
+
+
+def _outermost_object(text):
+    start = text.find("{")
+    end = text.rfind("}")
+    return text[start:end + 1] if start != -1 and end > start else None
+
+
+def _repair_decode(text):
+    candidates = []
+    unfenced = _FENCE_RE.sub("", text)
+    candidates.append(unfenced)
+    inner = _outermost_object(unfenced)
+    if inner:
+        candidates.append(inner)
+        candidates.append(_TRAILING_COMMA_RE.sub(r"\1", inner))
+        candidates.append(_TRAILING_COMMA_RE.sub(r"\1", inner.replace("'", '"')))
+    for candidate in candidates:
+        try:
+            return _loads(candidate)
+        except ValueError:
+            continue
+    return None
+
+
+def _extract_field(text, field, spec):
+    """Last resort: find one field in text that isn't valid JSON."""
+    if spec == "text":
+        match = re.search(rf'"{field}"\s*:\s*"((?:[^"\\]|\\.)*)"', text, re.DOTALL)
+        if match:
+            try:
+                return json.loads(f'"{match.group(1)}"')
+            except ValueError:
+                return match.group(1)
+        match = re.search(rf'"{field}"\s*:\s*(\[.*?\])', text, re.DOTALL)
+        if match:
+            try:
+                return _text(json.loads(match.group(1)))
+            except ValueError:
+                return None
+        return None
+    if spec == "number":
+        match = re.search(rf'"{field}"\s*:\s*"?(-?\d+(?:\.\d+)?)', text)
+        return float(match.group(1)) if match else None
+    match = re.search(rf'"{field}"\s*:\s*"?({"|".join(spec[1])})"?', text, re.IGNORECASE)
+    return match.group(1).lower() if match else None
+
+
+def parse_judge_response(text, schema, judge="judge"):
+    """
+    Parse one judge response against schema.
+
+    Args:
+        text: raw response text
+        schema: {field: "text" | "number" | ("enum", allowed values)}
+        judge: name the outcome is counted under in parse_stats
+
+    Returns:
+        (values, status): values has every schema field (None when it couldn't be recovered);
+        status is "ok", "repaired" or "failed" (some field could not be recovered)
+    """
+    if not isinstance(text, str) or not text.strip():
+        parse_stats.record(judge, "failed")
+        return {field: None for field in schema}, "failed"
+
+    status = "ok"
+    try:
+        data = _loads(text)
+    except ValueError:
+        data = _repair_decode(text)
+        status = "repaired"
+    if not isinstance(data, dict):
+        status = "repaired"
+    data = _as_object(data, schema) or {}
+
+    values, invalid = _validate(data, schema)
+    for field in invalid:
+        recovered = _extract_field(text, field, schema[field])
+        if recovered is not None:
+            values[field] = recovered
+            status = "repaired"
+    if any(values[field] is None for field in invalid):
+        status = "failed"
+    parse_stats.record(judge, status)
+    return values, status
@@ -0,0 +1,161 @@
+"""Persistent, content-addressed cache for LLM responses.
+
+Responses are keyed by a hash of (model, model kwargs, system instruction,
+rendered prompt), so any call that was already answered - in an earlier loop,
+by another evaluator, or in a previous run - is served from disk instead of the
+API. Entries are evicted by age and by total entry count (least recently used
+first) while the cache is used, every few inserts, so a long or crashed run
+stays within its limits. Access times of hits are written in batches rather
+than one transaction per hit.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_BUSY_TIMEOUT_MS = 30_000
+_EVICT_EVERY = 1000  # inserts between eviction passes (fewer when max_entries is small)
+_TOUCH_BATCH = 256  # cache hits whose access time is written in one transaction
+
+
+def prompt_text(prompt):
+    """Flatten a phoenix MultimodalPrompt (or plain string) to the text sent to the model."""
+    if isinstance(prompt, str):
+        return prompt
+    parts = getattr(prompt, "parts", None)
+    if parts is None:
+        return str(prompt)
+    return "\n".join(str(part.content) for part in parts)
+
+
+def cache_key(model_name, model_kwargs, prompt, instruction=None):
+    """Return the sha256 key for a (model, kwargs, instruction, prompt) request."""
+    payload = json.dumps(
+        {
+            "model": model_name,
+            "kwargs": model_kwargs or {},
+            "instruction": instruction,
+            "prompt": prompt_text(prompt),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """SQLite-backed response cache with size and age based eviction.
+
+    Args:
+        path: SQLite file to store responses in (created if missing)
+        max_entries: maximum number of cached responses, None for unbounded
+        max_age_seconds: responses older than this are treated as misses, None to keep forever
+    """
+
+    def __init__(self, path, max_entries=200_000, max_age_seconds=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched = {}  # key -> access time not yet written
+        self._inserts = 0
+        self._evict_every = max(1, min(_EVICT_EVERY, max_entries // 10)) if max_entries else _EVICT_EVERY
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Parallel sweep workers share the file; wait for another process's write instead of failing
+        self._conn.execute(f"PRAGMA busy_timeout = {_BUSY_TIMEOUT_MS}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT,"
+            " response TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        self._conn.commit()
+        self.evict()
+
+    def get(self, key):
+        """Return the cached response for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.max_age_seconds is not None and now - row[1] > self.max_age_seconds):
+                self.misses += 1
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= _TOUCH_BATCH:
+                self._flush_touched()
+                self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, response, model=None):
+        """Store a response under key; every few inserts, evict down to the limits."""
+        now = time.time()
+        with self._lock:
+            self._touched.pop(key, None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now),
+            )
+            self._conn.commit()
+            self._inserts += 1
+            due = self._inserts % self._evict_every == 0
+        if due:
+            self.evict()
+
+    def _flush_touched(self):
+        """Write the pending access times (caller holds the lock and commits)."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones above max_entries."""
+        with self._lock:
+            self._flush_touched()
+            if self.max_age_seconds is not None:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE created < ?", (time.time() - self.max_age_seconds,)
+                )
+            if self.max_entries is not None:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self):
+        """Return hit/miss counters for this process."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self):
+        self.evict()
+        self._conn.close()
@@ -0,0 +1,213 @@
+"""Shared factory for the phoenix models used by generation and judging.
+
+Every stage builds its model through make_model() so that cross-cutting
+behaviour (response caching, shared rate-limit-aware scheduling, request
+instrumentation) is attached
+in one place. The hooks are installed by wrapping methods on the model
+instance, the same way phoenix_patches.py patches PromptTemplate.
+"""
+
+import functools
+import inspect
+import time
+
+from .llm_cache import cache_key
+from .rate_limiter import is_rate_limit_error
+
+_ASYNC_METHODS = ("_async_generate_with_extra", "_async_generate")
+_SYNC_METHODS = ("_generate_with_extra", "_generate")
+
+
+def _response_text(result):
+    """The *_with_extra methods return (text, extra); the plain ones return text."""
+    return result[0] if isinstance(result, tuple) else result
+
+
+def _from_text(method_name, text):
+    return (text, {}) if method_name.endswith("_with_extra") else text
+
+
+def _wrap_with_cache(model, cache):
+    for name in _ASYNC_METHODS:
+        if hasattr(model, name):
+            original = getattr(model, name)
+
+            @functools.wraps(original)
+            async def cached_async(prompt, *args, _original=original, _name=name, **kwargs):
+                key = cache_key(model.model, model.model_kwargs, prompt, kwargs.get("instruction"))
+                text = cache.get(key)
+                if text is not None:
+                    return _from_text(_name, text)
+                result = await _original(prompt, *args, **kwargs)
+                if _response_text(result):
+                    cache.set(key, _response_text(result), model=model.model)
+                return result
+
+            setattr(model, name, cached_async)
+            break
+
+    for name in _SYNC_METHODS:
+        if hasattr(model, name):
+            original = getattr(model, name)
+
+            @functools.wraps(original)
+            def cached_sync(prompt, *args, _original=original, _name=name, **kwargs):
+                key = cache_key(model.model, model.model_kwargs, prompt, kwargs.get("instruction"))
+                text = cache.get(key)
+                if text is not None:
+                    return _from_text(_name, text)
+                result = _original(prompt, *args, **kwargs)
+                if _response_text(result):
+                    cache.set(key, _response_text(result), model=model.model)
+                return result
+
+            setattr(model, name, cached_sync)
+            break
+    return model
+
+
+def _messages_text(messages):
+    texts = []
+    for message in messages or []:
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, list):
+            texts.extend(str(part.get("text", "")) for part in content if isinstance(part, dict))
+    return "\n".join(texts)
+
+
+def _wrap_with_scheduler(model, scheduler):
+    """
+    Route every raw chat-completions request of the model through the scheduler.
+
+    The hook sits on the OpenAI client rather than on the phoenix generate
+    methods so that each retry phoenix makes after a 429 is seen (and counted)
+    by the scheduler too.
+    """
+    completions = getattr(getattr(getattr(model, "_async_client", None), "chat", None), "completions", None)
+    if completions is None:
+        return model
+    original = completions.create
+
+    @functools.wraps(original)
+    async def scheduled_create(*args, **kwargs):
+        text = _messages_text(kwargs.get("messages"))
+        max_tokens = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens")
+        async with scheduler.slot(model.model, text, max_tokens) as usage:
+            response = await original(*args, **kwargs)
+            response_usage = getattr(response, "usage", None)
+            total = getattr(response_usage, "total_tokens", None)
+            if total is not None:
+                usage["total_tokens"] = total
+            usage["prompt_tokens"] = getattr(response_usage, "prompt_tokens", None)
+            usage["cached_tokens"] = getattr(getattr(response_usage, "prompt_tokens_details", None), "cached_tokens", None)
+            return response
+
+    completions.create = scheduled_create
+    return model
+
+
+def trace_client(client, tracer, model_name=None):
+    """
+    Record latency, tokens and failures of every chat-completions request of an OpenAI client.
+
+    Works for sync and async clients (the create call returns a response or an awaitable).
+    model_name defaults to the "model" of each request.
+
+    Returns:
+        whether client had chat completions to wrap
+    """
+    completions = getattr(getattr(client, "chat", None), "completions", None)
+    if completions is None:
+        return False
+    original = completions.create
+
+    def record(kwargs, start, response=None, error=None):
+        name = model_name or kwargs.get("model")
+        if error is not None:
+            tracer.record_request(
+                name, time.perf_counter() - start,
+                rate_limited=is_rate_limit_error(error), error=type(error).__name__
+            )
+            return
+        usage = getattr(response, "usage", None)
+        tracer.record_request(
+            name, time.perf_counter() - start,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            cached_tokens=getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+        )
+
+    async def finish(pending, kwargs, start):
+        try:
+            response = await pending
+        except Exception as error:
+            record(kwargs, start, error=error)
+            raise
+        record(kwargs, start, response)
+        return response
+
+    @functools.wraps(original)
+    def traced_create(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = original(*args, **kwargs)
+        except Exception as error:
+            record(kwargs, start, error=error)
+            raise
+        if inspect.isawaitable(result):
+            return finish(result, kwargs, start)
+        record(kwargs, start, result)
+        return result
+
+    completions.create = traced_create
+    return True
+
+
+def _wrap_with_tracer(model, tracer):
+    """Record latency, tokens and failures of every raw request (retries included) on the tracer."""
+    trace_client(getattr(model, "_async_client", None), tracer, model.model)
+    return model
+
+
+def make_model(model_name, model_kwargs=None, cache=None, scheduler=None, tracer=None):
+    """
+    Build an OpenAIModel for generation or judging.
+
+    Args:
+        model_name: OpenAI model name, e.g. "gpt-4o"
+        model_kwargs: extra request parameters (response_format, temperature, ...)
+        cache: optional LLMResponseCache shared between all stages
+        scheduler: optional AdaptiveScheduler shared between all stages
+        tracer: optional instrumentation.Tracer recording every request
+
+    Returns:
+        phoenix OpenAIModel with the requested hooks installed
+    """
+    from phoenix.evals import OpenAIModel
+
+    model = OpenAIModel(model=model_name, model_kwargs=dict(model_kwargs or {}))
+    # The tracer sits inside the scheduler so its latencies exclude time spent waiting for a slot.
+    if tracer is not None:
+        _wrap_with_tracer(model, tracer)
+    # Cache hits never reach the scheduler, so they don't consume quota.
+    if scheduler is not None:
+        _wrap_with_scheduler(model, scheduler)
+    if cache is not None:
+        _wrap_with_cache(model, cache)
+    return model
+
+
+async def agenerate(model, prompt, instruction=None):
+    """
+    Await one completion from a model built by make_model, outside llm_generate.
+
+    Goes through the same (possibly wrapped) generate method llm_generate uses,
+    so cache and scheduler hooks still apply. Returns the response text.
+    """
+    kwargs = {"instruction": instruction} if instruction is not None else {}
+    for name in _ASYNC_METHODS:
+        if hasattr(model, name):
+            return _response_text(await getattr(model, name)(prompt, **kwargs))
+    raise AttributeError(f"{type(model).__name__} has no async generate method")
@@ -0,0 +1,330 @@
+"""Local stand-in for the OpenAI chat-completions endpoint.
+
+Serves JSON-valid canned responses for the three kinds of calls the pipeline
+makes - webpage generation, judging and the meta-prompt optimizer - with a
+configurable lognormal latency and random 429 injection, so throughput can be
+measured offline without spending API money. Like the real endpoint, a system
+message seen before is reported as cached prompt tokens (in 128-token steps,
+from 1024 tokens up). Requests with "stream": true are answered as server-sent
+events, one chunk per STREAM_CHUNK_CHARS characters; a share of generations
+can be made runaway (never-closing JSON) to exercise early aborts.
+
+Run it standalone:
+
+    python -m prompt_learning.mock_openai_server --port 8000 --latency-median 0.8 --rate-limit-fraction 0.02
+    export OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=mock
+
+or in-process with start_mock_server(). GET /stats returns request counts and
+latency percentiles.
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STREAM_CHUNK_CHARS = 64
+
+MOCK_PAGE = {
+    "page": {
+        "title": "Mock Page",
+        "layout": "vertical",
+        "lang": "en",
+        "updatedAt": "2025-01-01T00:00:00Z",
+        "sections": [
+            {"type": "header", "content": "Welcome", "fontSize": "1rem", "color": "#000000"},
+            {"type": "image", "src": "https://images.example.com/hero.png", "alt": "Hero image", "loading": "lazy"},
+            {"type": "productGrid", "columns": 2, "products": [
+                {"id": 1, "name": "Widget", "price": 19.99, "rating": 4.5},
+                {"id": 2, "name": "Gadget", "price": 29.99, "rating": 4.0},
+            ]},
+            {"type": "button", "label": "Shop now", "action": "navigate", "href": "/shop"},
+            {"type": "footer", "links": [{"label": "Privacy", "href": "/privacy"}], "legal": []},
+        ],
+    }
+}
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+class MockConfig:
+    """
+    Behaviour of the mock endpoint.
+
+    Args:
+        latency_median: median seconds per response
+        latency_sigma: sigma of the lognormal latency distribution (0 for constant latency)
+        rate_limit_fraction: share of requests answered with HTTP 429
+        correct_fraction: share of judge responses that say "correct"
+        runaway_fraction: share of generation responses that repeat sections without ever closing the JSON
+        seed: random seed
+    """
+
+    def __init__(self, latency_median=0.5, latency_sigma=0.5, rate_limit_fraction=0.0,
+                 correct_fraction=0.5, runaway_fraction=0.0, seed=0):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.rate_limit_fraction = rate_limit_fraction
+        self.correct_fraction = correct_fraction
+        self.runaway_fraction = runaway_fraction
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = {}
+            self.latencies = []
+            self.cached_prefixes = set()
+
+    def sample_latency(self):
+        with self.lock:
+            if self.latency_sigma <= 0:
+                return self.latency_median
+            return self.random.lognormvariate(math.log(max(self.latency_median, 1e-6)), self.latency_sigma)
+
+    def roll(self, fraction):
+        with self.lock:
+            return self.random.random() < fraction
+
+    def record(self, kind, latency):
+        with self.lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            if kind != "rate_limited":
+                self.latencies.append(latency)
+
+    def cached_tokens(self, body):
+        """Prompt tokens served from the simulated prefix cache for this request."""
+        messages = body.get("messages") or []
+        if not messages or messages[0].get("role") != "system":
+            return 0
+        prefix = str(messages[0].get("content"))
+        tokens = len(prefix) // 4
+        if tokens < 1024:
+            return 0
+        with self.lock:
+            if prefix not in self.cached_prefixes:
+                self.cached_prefixes.add(prefix)
+                return 0
+        return tokens - tokens % 128
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": sum(self.counts.values()),
+                "by_kind": dict(self.counts),
+                "latency_p50": percentile(self.latencies, 50),
+                "latency_p95": percentile(self.latencies, 95),
+            }
+
+
+def _prompt_text(body):
+    texts = []
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, list):
+            texts.extend(str(part.get("text", "")) for part in content if isinstance(part, dict))
+    return "\n".join(texts)
+
+
+def mock_completion(body, config):
+    """Return (kind, content) for a chat-completions request body."""
+    prompt = _prompt_text(body)
+    wants_json = (body.get("response_format") or {}).get("type") == "json_object"
+    # Cascade judges are asked for a confidence; most mock verdicts are confident
+    confidence = {"confidence": 0.95 if config.roll(0.8) else 0.5} if '"confidence"' in prompt else {}
+    if "compliance judge" in prompt:
+        correct = config.roll(config.correct_fraction)
+        return "judge", json.dumps({
+            "correctness": "correct" if correct else "incorrect",
+            "explanation": "Mock verdict." if correct else "Mock verdict: a rule is broken.",
+            "rule_violations": [] if correct else ["Add \"updatedAt\" ISO-8601 timestamp to every generated JSON."],
+            **confidence,
+        })
+    if "rule checker" in prompt:
+        return "rule_checker", json.dumps({"explanation": [], **confidence})
+    if wants_json:
+        if config.roll(config.runaway_fraction):
+            return "generation", '{"page": {"title": "Mock Page", "sections": [' + '{"type": "text", "content": "More."}, ' * 5000
+        return "generation", json.dumps(MOCK_PAGE)
+    return "optimizer", "You are an expert in JSON webpage creation. Follow every rule of the page schema. This is your task: {input}"
+
+
+def _completion_body(body, content, cached_tokens=0):
+    prompt_tokens = len(_prompt_text(body)) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        },
+    }
+
+
+def _chunk_body(body, completion_id, content=None, finish_reason=None, usage=None):
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [] if usage else [{
+            "index": 0,
+            "delta": {"content": content} if content is not None else {},
+            "finish_reason": finish_reason,
+        }],
+        "usage": usage,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.config.stats())
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unsupported path {self.path}"}})
+            return
+
+        if self.config.roll(self.config.rate_limit_fraction):
+            self.config.record("rate_limited", 0.0)
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_exceeded"}},
+                headers={"Retry-After": "1"},
+            )
+            return
+
+        kind, content = mock_completion(body, self.config)
+        # Longer completions take proportionally longer, like real token generation
+        latency = self.config.sample_latency() * max(1.0, len(content) / len(json.dumps(MOCK_PAGE)))
+        finish_reason = "stop"
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+        if max_tokens and len(content) // 4 > max_tokens:
+            content, finish_reason = content[:max_tokens * 4], "length"
+        completion = _completion_body(body, content, self.config.cached_tokens(body))
+        completion["choices"][0]["finish_reason"] = finish_reason
+        if body.get("stream"):
+            self._stream(kind, body, completion, latency)
+            return
+        time.sleep(latency)
+        self.config.record(kind, latency)
+        self._send_json(200, completion)
+
+    def _stream(self, kind, body, completion, latency):
+        content = completion["choices"][0]["message"]["content"]
+        chunks = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)] or [""]
+        events = [_chunk_body(body, completion["id"], chunk) for chunk in chunks]
+        events.append(_chunk_body(body, completion["id"], finish_reason=completion["choices"][0]["finish_reason"]))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            events.append(_chunk_body(body, completion["id"], usage=completion["usage"]))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        start = time.perf_counter()
+        try:
+            for event in events:
+                time.sleep(latency / len(events))
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early
+            self.config.record("stream_aborted", time.perf_counter() - start)
+            self.close_connection = True
+            return
+        self.config.record(kind, time.perf_counter() - start)
+        self.close_connection = True
+
+
+def start_mock_server(port=0, config=None):
+    """
+    Start the mock endpoint on a background thread.
+
+    Returns:
+        (server, base_url): call server.shutdown() to stop; base_url ends in /v1
+    """
+    config = config or MockConfig()
+    handler = type("MockHandler", (_Handler,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAI chat-completions endpoint")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-median", type=float, default=0.5)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--rate-limit-fraction", type=float, default=0.0)
+    parser.add_argument("--correct-fraction", type=float, default=0.5)
+    parser.add_argument("--runaway-fraction", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        rate_limit_fraction=args.rate_limit_fraction,
+        correct_fraction=args.correct_fraction,
+        runaway_fraction=args.runaway_fraction,
+        seed=args.seed,
+    )
+    server, base_url = start_mock_server(args.port, config)
+    print(f"🧪 Mock OpenAI endpoint listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
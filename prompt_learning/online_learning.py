@@ -0,0 +1,207 @@
+"""Online prompt learning over a live feed of traces.
+
+optimize_loop works in batch mode over a fixed train set. OnlinePromptLearner
+instead consumes traces (input, output and optional human feedback) from a
+source as they arrive, judges them in small micro-batches, keeps a bounded
+sliding window of recent failures, and calls the meta-prompt optimizer only
+once enough new failure evidence has accumulated since the last update.
+Memory is bounded by the window size whatever the length of the feed.
+
+Sources are plain iterators of trace dicts; they yield None when no trace is
+available for a while so that a partial micro-batch gets flushed:
+
+- JsonlTailSource follows a JSONL file as it is appended to (like tail -f);
+- QueueSource drains a queue.Queue, the in-process stand-in for a message bus.
+"""
+
+import json
+import os
+import queue
+import time
+from collections import deque
+
+STOP = object()  # put on a QueueSource's queue to end the feed
+
+
+class JsonlTailSource:
+    """
+    Yield traces appended to a JSONL file, one dict per line.
+
+    Args:
+        path: JSONL file to follow (may not exist yet)
+        poll_interval: seconds to wait before checking for new lines
+        from_start: also yield the lines already in the file
+        follow: keep waiting for new lines; False stops at the end of the file
+    """
+
+    def __init__(self, path, poll_interval=1.0, from_start=False, follow=True):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.from_start = from_start
+        self.follow = follow
+
+    def __iter__(self):
+        offset = 0
+        if not self.from_start and os.path.exists(self.path):
+            offset = os.path.getsize(self.path)
+        partial = ""
+        while True:
+            lines = []
+            if os.path.exists(self.path):
+                if os.path.getsize(self.path) < offset:
+                    offset = 0  # truncated or rotated
+                with open(self.path) as f:
+                    f.seek(offset)
+                    chunk = f.read()
+                    offset = f.tell()
+                lines = (partial + chunk).split("\n")
+                partial = lines.pop()  # an incomplete last line waits for the rest
+            for line in lines:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        print(f"⚠️ Skipping malformed trace line: {line[:80]}")
+            if not lines:
+                if not self.follow:
+                    return
+                yield None
+                time.sleep(self.poll_interval)
+
+
+class QueueSource:
+    """
+    Yield traces put on a queue.Queue until STOP is received.
+
+    Args:
+        trace_queue: queue the producer puts trace dicts on
+        idle_timeout: seconds without a trace after which None is yielded
+    """
+
+    def __init__(self, trace_queue, idle_timeout=1.0):
+        self.trace_queue = trace_queue
+        self.idle_timeout = idle_timeout
+
+    def __iter__(self):
+        while True:
+            try:
+                trace = self.trace_queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                yield None
+                continue
+            if trace is STOP:
+                return
+            yield trace
+
+
+class OnlinePromptLearner:
+    """
+    Judge a stream of traces and update the prompt when enough new failures accumulate.
+
+    Args:
+        system_prompt: current system prompt
+        judge: judge(batch DataFrame) -> DataFrame with "correctness", "explanation",
+            "rule_violations"; only called on traces without a human "correctness" label
+        optimizer_factory: optimizer_factory(prompt) -> object with optimize(dataset, output_column,
+            feedback_columns=..., context_size_k=...) returning the new prompt
+        feedback_columns: feedback columns passed to optimize()
+        batch_size: traces judged together
+        window_size: most recent failures kept as optimizer evidence
+        min_new_failures: failures seen since the last update that trigger the next one
+        min_seconds_between_updates: cooldown between two prompt updates
+        on_update: optional callback(prompt, version, stats) after every update
+    """
+
+    def __init__(self, system_prompt, judge, optimizer_factory,
+                 feedback_columns=("correctness", "explanation", "rule_violations"),
+                 batch_size=20, window_size=200, min_new_failures=20, min_seconds_between_updates=0,
+                 on_update=None):
+        self.prompt = system_prompt
+        self.version = 0
+        self.judge = judge
+        self.optimizer_factory = optimizer_factory
+        self.feedback_columns = list(feedback_columns)
+        self.batch_size = batch_size
+        self.failures = deque(maxlen=window_size)
+        self.min_new_failures = min_new_failures
+        self.min_seconds_between_updates = min_seconds_between_updates
+        self.on_update = on_update
+        self.new_failures = 0
+        self.last_update = 0.0
+        self.counts = {"traces": 0, "judged": 0, "human_labeled": 0, "failures": 0, "updates": 0}
+
+    def process_batch(self, traces):
+        """Judge one micro-batch of trace dicts and update the prompt if warranted."""
+        import pandas as pd
+
+        batch = pd.DataFrame(traces)
+        self.counts["traces"] += len(batch)
+        if "correctness" not in batch.columns:
+            batch["correctness"] = None
+        unlabeled = batch[batch["correctness"].isna()]
+        self.counts["human_labeled"] += len(batch) - len(unlabeled)
+        if not unlabeled.empty:
+            judged = self.judge(unlabeled.drop(columns=["correctness"]))
+            for col in ["correctness", "explanation", "rule_violations"]:
+                if col in judged.columns:
+                    batch.loc[unlabeled.index, col] = judged[col]
+            self.counts["judged"] += len(unlabeled)
+
+        failed = batch[batch["correctness"] != "correct"]
+        columns = ["input", "output"] + [c for c in self.feedback_columns + ["feedback"] if c in batch.columns]
+        for record in failed[[c for c in columns if c in failed.columns]].to_dict("records"):
+            self.failures.append(record)
+        self.new_failures += len(failed)
+        self.counts["failures"] += len(failed)
+        self.maybe_update()
+
+    def maybe_update(self):
+        if self.new_failures < self.min_new_failures:
+            return False
+        if time.monotonic() - self.last_update < self.min_seconds_between_updates:
+            return False
+        import pandas as pd
+
+        evidence = pd.DataFrame(list(self.failures))
+        feedback_columns = [c for c in self.feedback_columns + ["feedback"] if c in evidence.columns]
+        print(f"🧠 Optimizing prompt v{self.version} on {len(evidence)} recent failures "
+              f"({self.new_failures} new)")
+        self.prompt = self.optimizer_factory(self.prompt).optimize(
+            evidence,
+            "output",
+            feedback_columns=feedback_columns,
+            context_size_k=128000
+        )
+        self.version += 1
+        self.new_failures = 0
+        self.last_update = time.monotonic()
+        self.counts["updates"] += 1
+        if self.on_update is not None:
+            self.on_update(self.prompt, self.version, self.stats())
+        return True
+
+    def run(self, source, max_traces=None):
+        """
+        Consume traces from source until it ends (or max_traces were processed).
+
+        Returns:
+            the latest prompt
+        """
+        batch = []
+        seen = 0
+        for trace in source:
+            if trace is not None:
+                batch.append(trace)
+                seen += 1
+            if batch and (trace is None or len(batch) >= self.batch_size):
+                self.process_batch(batch)
+                batch = []
+            if max_traces is not None and seen >= max_traces:
+                break
+        if batch:
+            self.process_batch(batch)
+        return self.prompt
+
+    def stats(self):
+        return {**self.counts, "version": self.version, "window": len(self.failures),
+                "new_failures": self.new_failures}
@@ -0,0 +1,145 @@
+"""Process-parallel runner for multi-rule experiment sweeps.
+
+run_multi_rule_experiments runs one rule count after another. This runner
+shards the sweep (rule counts x seeds x scorers) across a process pool. Each
+experiment gets its own state - rule count, scorer, train/test split and
+scheduler - passed as arguments rather than through module globals, and its
+own checkpoint directory, results store and instrumentation file so workers
+never write to the same files. All workers share the SQLite response cache, so
+a call answered in one experiment is not paid for again in another. Every
+worker's scheduler is given an equal share of the global API quota so the
+workers together stay within it. Results are merged into the same
+all_results structure run_multi_rule_experiments returns.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+
+def experiment_grid(rule_counts, seeds=(42,), scorers=("accuracy",)):
+    """One experiment spec per (rule count, seed, scorer), keyed like all_results."""
+    single = len(seeds) == 1 and len(scorers) == 1
+    return [
+        {
+            "key": f"{num_rules}_rules" if single else f"{num_rules}_rules_seed{seed}_{scorer}",
+            "num_rules": num_rules,
+            "seed": seed,
+            "scorer": scorer,
+        }
+        for num_rules in rule_counts
+        for seed in seeds
+        for scorer in scorers
+    ]
+
+
+def split_quota(rate_limits, workers):
+    """Each worker's share of the per-model RPM/TPM quota."""
+    return {
+        model: {name: max(1, int(limit / workers)) for name, limit in limits.items()}
+        for model, limits in (rate_limits or {}).items()
+    }
+
+
+# A worker process may run several experiments; their paths are derived from the configured ones
+_CONFIGURED_PATHS = {}
+
+
+def _experiment_path(run, name, key, directory=False):
+    """Per-experiment variant of a configured path: a subdirectory, or the file name suffixed with key."""
+    path = _CONFIGURED_PATHS.setdefault(name, getattr(run, name))
+    if not path:
+        return path
+    if directory:
+        return os.path.join(path, key)
+    root, ext = os.path.splitext(path)
+    return f"{root}-{key}{ext}"
+
+
+def _run_experiment(spec, dataset, system_prompt, threshold, loops, quota, max_concurrency, run_dir, stamp,
+                    config=None):
+    from . import core as run
+    from .instrumentation import Tracer
+    from .rate_limiter import AdaptiveScheduler
+
+    # Spawned workers re-import core, so overrides made in the parent (CLI flags) are re-applied here.
+    for name, value in (config or {}).items():
+        setattr(run, name, value)
+
+    # The worker's scheduler only gets its share of the quota.
+    run.scheduler = AdaptiveScheduler(
+        rate_limits=quota,
+        max_concurrency=max_concurrency,
+        initial_concurrency=min(run.INITIAL_CONCURRENCY, max_concurrency),
+        latency_target=run.LATENCY_TARGET_SECONDS,
+    )
+    # Own instrumentation file and results store per experiment instead of workers interleaving writes;
+    # the response cache stays shared so repeated calls across experiments are answered from disk
+    run.INSTRUMENTATION_PATH = _experiment_path(run, "INSTRUMENTATION_PATH", spec["key"])
+    run.tracer = Tracer(run.INSTRUMENTATION_PATH)
+    run.RESULTS_STORE_PATH = _experiment_path(run, "RESULTS_STORE_PATH", spec["key"], directory=True)
+    train_set = dataset.sample(frac=run.TRAIN_SPLIT_FRACTION, random_state=spec["seed"])
+    test_set = dataset.drop(train_set.index)
+
+    print(f"📊 [{os.getpid()}] Running {spec['key']}...")
+    results = run.optimize_loop(
+        train_set, test_set, system_prompt, [run.evaluate_output, run.rule_checker],
+        threshold=threshold,
+        loops=loops,
+        scorer=spec["scorer"],
+        num_rules=spec["num_rules"],
+        run_dir=os.path.join(run_dir, spec["key"]) if run_dir else None,
+        experiment=f"{spec['key']}_{stamp}",
+    )
+    results["seed"] = spec["seed"]
+    results["scorer"] = spec["scorer"]
+    return spec["key"], results
+
+
+def run_parallel_experiments(dataset, system_prompt, rule_counts, seeds=(42,), scorers=("accuracy",),
+                             threshold=0.7, loops=5, max_workers=3, rate_limits=None, max_concurrency=64,
+                             run_dir=None, config=None):
+    """
+    Run every (rule count, seed, scorer) experiment of a sweep in a process pool.
+
+    Args:
+        dataset: full sampled dataset; each seed gets its own train/test split of it
+        system_prompt: initial system prompt
+        rule_counts: rule counts to test
+        seeds: split seeds
+        scorers: metrics to optimize for
+        threshold: threshold for stopping optimization
+        loops: number of optimization loops
+        max_workers: number of worker processes
+        rate_limits: global {model: {"rpm", "tpm"}} quota shared by all workers
+        max_concurrency: in-flight request cap per model and worker
+        run_dir: optional checkpoint directory, one subdirectory per experiment
+        config: optional {NAME: value} configuration overrides applied to core in each worker
+
+    Returns:
+        dict: results for each experiment, keyed like run_multi_rule_experiments
+            ("{n}_rules", or "{n}_rules_seed{seed}_{scorer}" for multi-seed/scorer sweeps)
+    """
+    grid = experiment_grid(rule_counts, seeds, scorers)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    workers = max(1, min(max_workers, len(grid)))
+    quota = split_quota(rate_limits, workers)
+
+    print(f"🚀 Running {len(grid)} experiments on {workers} worker processes")
+    all_results = {}
+    # spawn: workers must not inherit the parent's event loop, SQLite handle or client threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [
+            pool.submit(_run_experiment, spec, dataset, system_prompt, threshold, loops, quota,
+                        max_concurrency, run_dir, stamp, config)
+            for spec in grid
+        ]
+        for future in as_completed(futures):
+            key, results = future.result()
+            all_results[key] = results
+            print(f"✅ Completed {key}: final test {results['scorer']} = {results['test'][-1]:.3f}")
+
+    # Same order as the sequential runner
+    return {spec["key"]: all_results[spec["key"]] for spec in grid}
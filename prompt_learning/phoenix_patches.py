@@ -0,0 +1,43 @@
+"""Patches phoenix's PromptTemplate so JSON braces in templates are left alone.
+
+phoenix treats every {...} in a template as a variable, which breaks the
+judge templates (their rule sets quote JSON). The patches only accept
+identifier-shaped variables and substitute them literally, using the
+precompiled templates from templates.py. They are applied
+on first use by apply() rather than at import time, so importing the package
+doesn't import phoenix.
+"""
+
+from .templates import compile_template
+
+_applied = False
+
+
+def apply():
+    """Patch PromptTemplate and allow nested event loops (idempotent)."""
+    global _applied
+    if _applied:
+        return
+    import nest_asyncio
+    from phoenix.evals.templates import MultimodalPrompt, PromptPart, PromptPartTemplate, PromptTemplate
+
+    nest_asyncio.apply()
+
+    # 1️⃣  stricter variable detector
+    def _parse_variables_strict(self, tmpl: list[PromptPartTemplate]):  # [...]
+        vars = set()
+        for p in tmpl:
+            vars.update(compile_template(p.template).variables)
+        return list(vars)
+    PromptTemplate._parse_variables = _parse_variables_strict
+
+    # 2️⃣  literal‑brace formatter
+    def _format_literal(self, variable_values, options=None):  # [...]
+        prompt_msgs = []
+        for part in self.prompt(options):
+            msg = compile_template(part.template).render(variable_values, strict=True)
+            prompt_msgs.append(PromptPart(content_type=part.content_type, content=msg))
+        return MultimodalPrompt(parts=prompt_msgs)
+    PromptTemplate.format = _format_literal
+
+    _applied = True
@@ -0,0 +1,195 @@
+"""Streaming generate -> judge pipeline.
+
+generate_output and evaluate_output each run llm_generate over the whole
+DataFrame, so every stage waits for the slowest request of the previous one.
+run_pipeline instead lets each row flow from generation to judging as soon as
+its output arrives: generation workers feed a bounded queue that judge
+workers drain, and the results are assembled into the usual DataFrame
+columns at the end. Wall-clock time per pass approaches max(stage) instead of
+sum(stages).
+"""
+
+import asyncio
+
+from .llm_client import agenerate
+from .rule_sharding import ajudge_shards, merge_verdicts
+from .streaming_generation import abort_verdict
+from .templates import render_template
+
+_DONE = object()
+
+
+async def _generate_worker(rows, judge_queue, generation_model, system_prompt, stream_generation, outputs):
+    while True:
+        try:
+            index, row = rows.pop()
+        except IndexError:
+            return
+        reason = None
+        try:
+            prompt = render_template(system_prompt, row)
+            if stream_generation is not None:
+                output, reason = await stream_generation(prompt)
+            else:
+                output = await agenerate(generation_model, prompt)
+        except Exception as error:
+            print(f"⚠️ Generation failed for row {index}: {error}")
+            output = None
+        outputs[index] = output
+        await judge_queue.put((index, dict(row, output=output, generation_abort=reason)))
+
+
+async def _judge_row(row, index, judge_model, judge_template, judge_instruction, judge_shards, judge_cascade,
+                     output_parser, engine, local_only, memo):
+    if row["generation_abort"] is not None:
+        # Invalid JSON already: no judge needed
+        return dict(abort_verdict(row["generation_abort"]), generation_abort=row["generation_abort"])
+    verdict = memo.get(row) if memo is not None and row["output"] is not None else None
+    if verdict is not None:
+        return verdict
+    if row["output"] is None:
+        verdict = {"correctness": None, "explanation": None}
+    elif engine is not None:
+        local = engine.verdict(row["output"])
+        if local_only or local["correctness"] == "incorrect" or not engine.residual_rules:
+            verdict = local
+    if verdict is None:
+        async def judge():
+            if judge_shards:
+                shard_verdicts = await ajudge_shards(judge_model, judge_shards, row, index, output_parser)
+                return merge_verdicts(shard_verdicts, judge_shards)
+            response = await agenerate(judge_model, render_template(judge_template, row), judge_instruction)
+            return output_parser(response, index)
+
+        if judge_cascade is not None:
+            verdict = await judge_cascade.ajudge(row, index, judge)
+        else:
+            verdict = await judge()
+    if memo is not None:
+        memo.put(row, verdict)
+    return verdict
+
+
+async def _judge_worker(judge_queue, judge_model, judge_template, judge_instruction, judge_shards, judge_cascade,
+                        output_parser, engine, local_only, memo, verdicts):
+    while True:
+        item = await judge_queue.get()
+        if item is _DONE:
+            return
+        index, row = item
+        # Any failure only loses this row's verdict; a dead worker would stall the whole pass
+        try:
+            verdicts[index] = await _judge_row(
+                row, index, judge_model, judge_template, judge_instruction, judge_shards, judge_cascade,
+                output_parser, engine, local_only, memo
+            )
+        except Exception as error:
+            print(f"⚠️ Judging failed for row {index}: {error}")
+            verdicts[index] = {"correctness": None, "explanation": None}
+
+
+async def _run(dataset, system_prompt, generation_model, judge_model, judge_template, judge_instruction,
+               judge_shards, judge_cascade, output_parser, engine, local_only, memo, generation_workers, judge_workers,
+               queue_size, stream_generation=None):
+    # Keyed by position, so any index (even with duplicate labels) works
+    rows = list(reversed(list(enumerate(dataset.to_dict("records")))))
+    judge_queue = asyncio.Queue(maxsize=queue_size)
+    outputs, verdicts = {}, {}
+
+    judges = [
+        asyncio.ensure_future(
+            _judge_worker(
+                judge_queue, judge_model, judge_template, judge_instruction, judge_shards, judge_cascade,
+                output_parser, engine, local_only, memo, verdicts
+            )
+        )
+        for _ in range(judge_workers)
+    ]
+    await asyncio.gather(*[
+        _generate_worker(rows, judge_queue, generation_model, system_prompt, stream_generation, outputs)
+        for _ in range(generation_workers)
+    ])
+    for _ in judges:
+        await judge_queue.put(_DONE)
+    await asyncio.gather(*judges)
+    return outputs, verdicts
+
+
+def run_pipeline(dataset, system_prompt, generation_model, judge_model, judge_template,
+                 output_parser, engine=None, local_only=False, memo=None, generation_workers=40,
+                 judge_workers=40, queue_size=100, judge_instruction=None, judge_shards=None,
+                 judge_cascade=None, stream_generation=None):
+    """
+    Generate an output for every row and judge it as soon as it arrives.
+
+    Args:
+        dataset: DataFrame with the columns used by system_prompt (e.g. "input")
+        system_prompt: generation template
+        generation_model: model from make_model used for generation
+        judge_model: model from make_model used for judging
+        judge_template: evaluator template (restricted to residual rules when engine is given)
+        output_parser: parser returning {"correctness", "explanation"} for a judge response
+        engine: optional RuleEngine; rows breaking a local rule skip the judge
+        local_only: with an engine, never call the judge (residual rules go unchecked)
+        memo: optional object with get(row) / put(row, verdict), used to skip rows judged before
+        generation_workers: concurrent generation requests
+        judge_workers: concurrent judge requests
+        queue_size: bound on outputs waiting to be judged
+        judge_instruction: optional static system instruction sent with every judge request
+            (see prefix_cache.split_template)
+        judge_shards: optional rule shards (see rule_sharding.shard_template); each row is then
+            judged against every shard concurrently instead of with judge_template
+        judge_cascade: optional JudgeCascade; its cheap model judges first and only unsure
+            rows reach judge_model
+        stream_generation: optional coroutine function prompt -> (output, abort reason) used
+            instead of generation_model (see streaming_generation.streaming_generator); aborted
+            rows are marked incorrect without judging
+
+    Returns:
+        copy of dataset with "output", "correctness" and "explanation" columns, plus
+        "generation_abort" when a streamed generation was aborted
+    """
+    outputs, verdicts = asyncio.run(_run(
+        dataset, system_prompt, generation_model, judge_model, judge_template, judge_instruction,
+        judge_shards, judge_cascade, output_parser, engine, local_only, memo, generation_workers, judge_workers,
+        queue_size, stream_generation,
+    ))
+    return _assemble(dataset, outputs, verdicts)
+
+
+def run_pipeline_many(dataset, system_prompts, generation_model, judge_model, judge_template,
+                      output_parser, engine=None, local_only=False, memo=None, generation_workers=40,
+                      judge_workers=40, queue_size=100, judge_instruction=None, judge_shards=None,
+                      judge_cascade=None, stream_generation=None):
+    """
+    Run one pipeline per system prompt over the same dataset, all concurrently.
+
+    Arguments are those of run_pipeline; the worker counts are shared between the prompts.
+
+    Returns:
+        list of DataFrames, one per system prompt, as returned by run_pipeline
+    """
+    share = max(1, len(system_prompts))
+
+    async def run_all():
+        return await asyncio.gather(*[
+            _run(
+                dataset, system_prompt, generation_model, judge_model, judge_template, judge_instruction,
+                judge_shards, judge_cascade, output_parser, engine, local_only, memo,
+                max(1, generation_workers // share), max(1, judge_workers // share), queue_size, stream_generation,
+            )
+            for system_prompt in system_prompts
+        ])
+
+    return [_assemble(dataset, outputs, verdicts) for outputs, verdicts in asyncio.run(run_all())]
+
+
+def _assemble(dataset, outputs, verdicts):
+    dataset = dataset.copy()
+    positions = range(len(dataset))
+    dataset["output"] = [outputs.get(position) for position in positions]
+    for col in ["correctness", "explanation"]:
+        dataset[col] = [verdicts.get(position, {}).get(col) for position in positions]
+    if any(verdict.get("generation_abort") for verdict in verdicts.values()):
+        dataset["generation_abort"] = [verdicts.get(position, {}).get("generation_abort") for position in positions]
+    return dataset
@@ -0,0 +1,33 @@
+"""Judge prompt layout that lets the provider cache the static prefix.
+
+The judge templates in prompts/ put the per-row data block ({input}, {output})
+before the large rule set, so every judge request starts differently and the
+provider's prompt cache (which matches on the longest common prefix) is never
+hit. split_template moves everything static - instructions, rule set, answer
+format - into a system instruction that is byte-identical for every row, and
+leaves only the data block as the per-row user message.
+"""
+
+import re
+
+from .templates import template_variables
+
+_DATA_BLOCK_RE = re.compile(r"(?:Here is the data:\s*)?\[BEGIN DATA\].*?\[END DATA\]", re.DOTALL)
+
+DATA_REFERENCE = "The data to evaluate is given in the user message."
+
+
+def split_template(template):
+    """
+    Split a judge template into (static system instruction, per-row template).
+
+    Returns (None, template) when the template has no [BEGIN DATA] ... [END DATA]
+    block or variables outside it, i.e. when there is no static part to cache.
+    """
+    match = _DATA_BLOCK_RE.search(template)
+    if match is None:
+        return None, template
+    instruction = (template[:match.start()] + DATA_REFERENCE + template[match.end():]).strip()
+    if template_variables(instruction):
+        return None, template
+    return instruction, match.group(0).strip()
@@ -0,0 +1,277 @@
+"""Local, content-hashed query corpus with seeded splits and chunked reads.
+
+load_datasets used to download queries.csv on every run, sample it without a
+seed and keep the whole corpus in one DataFrame. QueryCorpus instead keeps a
+Parquet copy of the source under a cache directory, named by the SHA-256 of
+the source bytes, so the network is only needed the first time a source is
+seen. Rows are read back in chunks (row groups), and samples / train-test
+splits are drawn from a per-row hash of (seed, row number): the same seed and
+content hash always give the same rows, and only the sampled rows (plus one
+chunk) are ever held in memory.
+
+Layout under the cache directory:
+
+    sources.json             source -> content_hash, rows, columns
+    {content_hash}.parquet   the corpus, one row group per chunk
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import urllib.request
+
+from .checkpoint import _atomic_write
+
+_COPY_BLOCK_BYTES = 1 << 20
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+def _uniform(row_numbers, seed, stream):
+    """Uniform [0, 1) value per row number (splitmix64 of seed, stream and row number)."""
+    import numpy as np
+
+    offset = np.uint64(((seed * 2 + stream + 1) * _GOLDEN) & _MASK64)
+    with np.errstate(over="ignore"):
+        z = row_numbers.astype(np.uint64) * np.uint64(_GOLDEN) + offset
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def _allocate(sizes, total):
+    """Split total sample rows across strata in proportion to their sizes (largest remainder)."""
+    population = sum(sizes.values())
+    if total <= 0 or total >= population:
+        return dict(sizes)
+    exact = {key: total * size / population for key, size in sizes.items()}
+    counts = {key: int(value) for key, value in exact.items()}
+    for key in sorted(exact, key=lambda key: (counts[key] - exact[key], str(key)))[:total - sum(counts.values())]:
+        counts[key] += 1
+    return counts
+
+
+class QueryCorpus:
+    """
+    A query corpus cached locally as Parquet.
+
+    Args:
+        source: URL or local path of a CSV (or Parquet) file
+        cache_dir: directory of the cached copies
+        chunk_rows: rows per row group / chunk read back
+    """
+
+    def __init__(self, source, cache_dir=".cache/corpora", chunk_rows=10_000):
+        self.source = source if "://" in source else os.path.abspath(source)
+        self.cache_dir = cache_dir
+        self.chunk_rows = chunk_rows
+        self._entry = None
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, "sources.json")
+
+    def _read_index(self):
+        try:
+            with open(self._index_path(), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    @property
+    def path(self):
+        return os.path.join(self.cache_dir, f"{self.fetch()['content_hash']}.parquet")
+
+    @property
+    def content_hash(self):
+        return self.fetch()["content_hash"]
+
+    @property
+    def num_rows(self):
+        return self.fetch()["rows"]
+
+    def fetch(self, refresh=False):
+        """
+        Make sure the local Parquet copy exists, downloading and converting the source if needed.
+
+        Returns:
+            dict with "content_hash", "rows" and "columns"
+        """
+        if self._entry is not None and not refresh:
+            return self._entry
+        entry = self._read_index().get(self.source)
+        if not refresh and entry and os.path.exists(os.path.join(self.cache_dir, f"{entry['content_hash']}.parquet")):
+            self._entry = entry
+            return entry
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, raw_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".download-")
+        try:
+            print(f"⬇️ Fetching query corpus from {self.source}...")
+            digest = hashlib.sha256()
+            is_url = "://" in self.source
+            with (urllib.request.urlopen(self.source) if is_url else open(self.source, "rb")) as src, \
+                    os.fdopen(fd, "wb") as dst:
+                while True:
+                    block = src.read(_COPY_BLOCK_BYTES)
+                    if not block:
+                        break
+                    digest.update(block)
+                    dst.write(block)
+            content_hash = digest.hexdigest()
+            parquet_path = os.path.join(self.cache_dir, f"{content_hash}.parquet")
+            if not os.path.exists(parquet_path):
+                rows, columns = self._convert(raw_path, parquet_path)
+            else:
+                import pyarrow.parquet as pq
+
+                metadata = pq.ParquetFile(parquet_path).metadata
+                rows, columns = metadata.num_rows, metadata.schema.to_arrow_schema().names
+        finally:
+            os.remove(raw_path)
+
+        entry = {"content_hash": content_hash, "rows": rows, "columns": columns}
+        index = self._read_index()
+        index[self.source] = entry
+        _atomic_write(self._index_path(), json.dumps(index, indent=2).encode("utf-8"))
+        print(f"📦 Cached {rows} rows as {content_hash[:12]} in {self.cache_dir}")
+        self._entry = entry
+        return entry
+
+    def _convert(self, raw_path, parquet_path):
+        """Stream the downloaded file into a Parquet file with chunk_rows row groups."""
+        import pyarrow as pa
+        import pyarrow.csv as pv
+        import pyarrow.parquet as pq
+
+        if self.source.endswith(".parquet"):
+            batches = pq.ParquetFile(raw_path).iter_batches(batch_size=self.chunk_rows)
+        else:
+            batches = pv.open_csv(raw_path)
+        tmp_path = f"{parquet_path}.tmp"
+        rows, writer = 0, None
+        try:
+            for batch in batches:
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, batch.schema)
+                writer.write_table(pa.Table.from_batches([batch]), row_group_size=self.chunk_rows)
+                rows += batch.num_rows
+            if writer is None:
+                raise ValueError(f"Query corpus {self.source} is empty")
+            writer.close()
+            writer = None
+            os.replace(tmp_path, parquet_path)
+        finally:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return rows, pq.ParquetFile(parquet_path).schema_arrow.names
+
+    def iter_chunks(self, columns=None, chunk_rows=None):
+        """
+        Read the corpus chunk by chunk.
+
+        Yields:
+            DataFrames of at most chunk_rows rows, indexed by row number in the corpus
+        """
+        import pyarrow.parquet as pq
+
+        start = 0
+        for batch in pq.ParquetFile(self.path).iter_batches(batch_size=chunk_rows or self.chunk_rows, columns=columns):
+            chunk = batch.to_pandas()
+            chunk.index = range(start, start + len(chunk))
+            start += len(chunk)
+            yield chunk
+
+    def sample_rows(self, num_samples, seed=42, stratify=None):
+        """
+        Row numbers of a seeded sample, drawn chunk by chunk.
+
+        Each row gets a uniform hash of (seed, row number); the sample is the num_samples rows
+        with the lowest hash (per stratum, in proportion to the stratum sizes, with stratify).
+        num_samples 0 (or more than the corpus) selects every row.
+
+        Returns:
+            dict stratum -> sorted numpy array of row numbers (a single None stratum without stratify)
+        """
+        import numpy as np
+
+        columns = [stratify] if stratify else []
+        if stratify:
+            sizes = {}
+            for chunk in self.iter_chunks(columns=columns):
+                for key, count in chunk[stratify].astype(str).value_counts().items():
+                    sizes[key] = sizes.get(key, 0) + int(count)
+        else:
+            sizes = {None: self.num_rows}
+        quota = _allocate(sizes, num_samples)
+
+        kept = {key: (np.empty(0), np.empty(0, dtype=np.int64)) for key in quota}
+        for chunk in self.iter_chunks(columns=columns or [self.fetch()["columns"][0]]):
+            row_numbers = chunk.index.to_numpy(dtype=np.int64)
+            hashes = _uniform(row_numbers, seed, 0)
+            groups = chunk.groupby(chunk[stratify].astype(str)).indices if stratify else {None: slice(None)}
+            for key, positions in groups.items():
+                best_hashes, best_rows = kept[key]
+                best_hashes = np.concatenate([best_hashes, hashes[positions]])
+                best_rows = np.concatenate([best_rows, row_numbers[positions]])
+                if len(best_hashes) > quota[key]:
+                    keep = np.argpartition(best_hashes, quota[key])[:quota[key]]
+                    best_hashes, best_rows = best_hashes[keep], best_rows[keep]
+                kept[key] = (best_hashes, best_rows)
+        return {key: np.sort(rows) for key, (_, rows) in kept.items()}
+
+    def split_rows(self, num_samples, train_fraction, seed=42, stratify=None):
+        """
+        (train, test) row numbers of a seeded sample; with stratify, every stratum is split
+        train_fraction / rest on its own so both sides keep the stratum shares.
+        """
+        import numpy as np
+
+        train, test = [], []
+        for rows in self.sample_rows(num_samples, seed=seed, stratify=stratify).values():
+            order = rows[np.argsort(_uniform(rows, seed, 1), kind="stable")]
+            cut = int(round(train_fraction * len(order)))
+            train.append(order[:cut])
+            test.append(order[cut:])
+        return np.sort(np.concatenate(train)), np.sort(np.concatenate(test))
+
+    def take(self, row_numbers, columns=None):
+        """The given rows as a DataFrame indexed by row number, reading one chunk at a time."""
+        import numpy as np
+        import pandas as pd
+
+        row_numbers = np.sort(np.asarray(row_numbers, dtype=np.int64))
+        parts = []
+        for chunk in self.iter_chunks(columns=columns):
+            lo, hi = np.searchsorted(row_numbers, [chunk.index.start, chunk.index.stop])
+            if hi > lo:
+                parts.append(chunk.loc[row_numbers[lo:hi]])
+        if not parts:
+            return next(self.iter_chunks(columns=columns)).iloc[:0]
+        return pd.concat(parts)
+
+    def split(self, num_samples, train_fraction, seed=42, stratify=None):
+        """(train_set, test_set) DataFrames of a seeded, optionally stratified sample (see split_rows)."""
+        train_rows, test_rows = self.split_rows(num_samples, train_fraction, seed=seed, stratify=stratify)
+        return self.take(train_rows), self.take(test_rows)
+
+    def iter_split(self, part, train_fraction, seed=42, columns=None, chunk_rows=None):
+        """
+        Stream one side of a split of the whole corpus without sampling it first.
+
+        A row is in "train" when its split hash is below train_fraction, so the train share is
+        train_fraction on average (exactly so only in split / split_rows).
+
+        Yields:
+            DataFrames of the chunk's rows in that part
+        """
+        if part not in ("train", "test"):
+            raise ValueError(f"Unknown split part: {part}")
+        for chunk in self.iter_chunks(columns=columns, chunk_rows=chunk_rows):
+            in_train = _uniform(chunk.index.to_numpy(), seed, 1) < train_fraction
+            rows = chunk[in_train if part == "train" else ~in_train]
+            if len(rows):
+                yield rows
@@ -0,0 +1,243 @@
+"""Shared, rate-limit-aware concurrency control for every llm_generate stage.
+
+Each model gets a token bucket for requests per minute and one for tokens per
+minute, sized from its configured quota, plus an AIMD limit on in-flight
+requests: the limit grows by one request per window of successful calls, is
+halved whenever the API answers 429, and shrinks slightly when a call runs
+past the latency target or fails with a timeout or 5xx. Other failures leave
+it unchanged.
+All generation and judging calls for a model draw from the same limiter, so
+the stages together stay at the quota ceiling instead of each using a fixed
+concurrency.
+
+The scheduler only uses asyncio.sleep for waiting so it works across the
+separate event loops that consecutive llm_generate calls may run in.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+
+_POLL_INTERVAL = 0.01
+
+
+def _encoding(model_name):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at capacity per minute."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, amount):
+        """Take amount tokens if available; return seconds to wait otherwise (0 on success)."""
+        self._refill()
+        # A single request larger than the whole bucket is let through once the bucket is full.
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def give_back(self, amount):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ModelLimiter:
+    """RPM/TPM buckets and the AIMD in-flight limit for one model."""
+
+    def __init__(self, rpm=None, tpm=None, min_concurrency=1, max_concurrency=64,
+                 initial_concurrency=8, latency_target=None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = float(min(max(initial_concurrency, min_concurrency), max_concurrency))
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.completed = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.ewma_latency = None
+        self._lock = threading.Lock()
+
+    def _try_start(self, estimated_tokens):
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                return _POLL_INTERVAL
+            for bucket, amount in ((self.requests, 1), (self.tokens, estimated_tokens)):
+                if bucket is not None:
+                    wait = bucket.try_take(amount)
+                    if wait:
+                        if bucket is self.tokens and self.requests is not None:
+                            self.requests.give_back(1)
+                        return wait
+            self.in_flight += 1
+            return 0.0
+
+    async def acquire(self, estimated_tokens):
+        while True:
+            wait = self._try_start(estimated_tokens)
+            if not wait:
+                return
+            await asyncio.sleep(min(wait, 1.0))
+
+    def release(self, latency, rate_limited=False, estimated_tokens=0, actual_tokens=None,
+                prompt_tokens=None, cached_tokens=None, error=None):
+        """
+        Return a slot and adapt the in-flight limit.
+
+        error is None for a successful call, "overload" for timeouts and 5xx (the limit shrinks
+        like after a slow call) and "other" for any other failure (the limit is left alone).
+        Failed calls are neither counted as completed nor fed into the latency average.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            self.prompt_tokens += prompt_tokens or 0
+            self.cached_tokens += cached_tokens or 0
+            if actual_tokens is not None and self.tokens is not None and actual_tokens < estimated_tokens:
+                self.tokens.give_back(estimated_tokens - actual_tokens)
+            if rate_limited:
+                self.rate_limited += 1
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                return
+            if error is not None:
+                self.errors += 1
+                if error == "overload":
+                    self.limit = max(self.min_concurrency, self.limit * 0.9)
+                return
+            self.completed += 1
+            self.ewma_latency = latency if self.ewma_latency is None else 0.8 * self.ewma_latency + 0.2 * latency
+            if self.latency_target is not None and latency > self.latency_target:
+                self.limit = max(self.min_concurrency, self.limit * 0.9)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+
+    def stats(self):
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "completed": self.completed,
+            "rate_limited": self.rate_limited,
+            "errors": self.errors,
+            "ewma_latency": self.ewma_latency,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+        }
+
+
+def is_rate_limit_error(error):
+    """True for openai.RateLimitError or any error carrying HTTP status 429."""
+    return type(error).__name__ == "RateLimitError" or getattr(error, "status_code", None) == 429
+
+
+def is_overload_error(error):
+    """True for timeouts, dropped connections and HTTP 5xx answers: signs the endpoint is overloaded."""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in ("APITimeoutError", "APIConnectionError", "InternalServerError"):
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+
+class AdaptiveScheduler:
+    """
+    Per-model limiters shared by generation and both evaluators.
+
+    Args:
+        rate_limits: {model_name: {"rpm": int, "tpm": int}}; models not listed only get AIMD control
+        max_concurrency: upper bound on in-flight requests per model
+        initial_concurrency: in-flight limit before any feedback has been observed
+        latency_target: seconds; slower calls shrink the limit slightly, None to ignore latency
+        default_completion_tokens: completion size assumed when a request sets no max_tokens
+    """
+
+    def __init__(self, rate_limits=None, max_concurrency=64, initial_concurrency=8,
+                 latency_target=None, default_completion_tokens=1000):
+        self.rate_limits = rate_limits or {}
+        self.max_concurrency = max_concurrency
+        self.initial_concurrency = initial_concurrency
+        self.latency_target = latency_target
+        self.default_completion_tokens = default_completion_tokens
+        self._limiters = {}
+        self._encodings = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, model_name):
+        with self._lock:
+            if model_name not in self._limiters:
+                limits = self.rate_limits.get(model_name, {})
+                self._limiters[model_name] = ModelLimiter(
+                    rpm=limits.get("rpm"),
+                    tpm=limits.get("tpm"),
+                    max_concurrency=self.max_concurrency,
+                    initial_concurrency=self.initial_concurrency,
+                    latency_target=self.latency_target,
+                )
+            return self._limiters[model_name]
+
+    def estimate_tokens(self, model_name, text, max_tokens=None):
+        """Prompt tokens (tiktoken, or ~4 characters per token without it) plus the expected completion."""
+        if model_name not in self._encodings:
+            self._encodings[model_name] = _encoding(model_name)
+        encoding = self._encodings[model_name]
+        prompt_tokens = len(encoding.encode(text, disallowed_special=())) if encoding else len(text) // 4
+        return prompt_tokens + (max_tokens or self.default_completion_tokens)
+
+    @asynccontextmanager
+    async def slot(self, model_name, text, max_tokens=None):
+        """
+        Hold one request slot for model_name while the block runs.
+
+        The block may set usage["total_tokens"] on the yielded dict to refund the
+        difference between the estimate and the real token count, and
+        usage["prompt_tokens"] / usage["cached_tokens"] to record how much of the
+        prompt the provider served from its prefix cache.
+        """
+        limiter = self.limiter(model_name)
+        estimated = self.estimate_tokens(model_name, text, max_tokens)
+        await limiter.acquire(estimated)
+        usage = {}
+        start = time.monotonic()
+        rate_limited, error_kind = False, None
+        try:
+            yield usage
+        except Exception as error:
+            rate_limited = is_rate_limit_error(error)
+            if not rate_limited:
+                error_kind = "overload" if is_overload_error(error) else "other"
+            raise
+        finally:
+            limiter.release(
+                time.monotonic() - start,
+                rate_limited=rate_limited,
+                error=error_kind,
+                estimated_tokens=estimated,
+                actual_tokens=usage.get("total_tokens"),
+                prompt_tokens=usage.get("prompt_tokens"),
+                cached_tokens=usage.get("cached_tokens"),
+            )
+
+    def stats(self):
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
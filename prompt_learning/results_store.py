@@ -0,0 +1,182 @@
+"""Append-only columnar store for per-iteration experiment results.
+
+optimize_loop used to keep a deepcopy of the test set for every iteration and
+save_experiment_results dumped those DataFrames as str() blobs. ResultsStore
+instead writes one small Parquet file per (experiment, iteration) holding only
+the columns that change between iterations (output, correctness, explanation)
+keyed by row_id, the inputs once per experiment, and the prompt text once per
+iteration. IterationFrames reads an iteration back only when it is indexed, so
+memory stays flat across loops.
+
+Layout under the store directory:
+
+    inputs/{experiment}.parquet               row_id, input
+    rows/{experiment}/{iteration:04d}.parquet  row_id, output, correctness, explanation
+    prompts/{experiment}/{iteration:04d}.parquet  iteration, prompt, metric
+"""
+
+import io
+import os
+
+from .checkpoint import _atomic_write
+
+ITERATION_COLUMNS = ["output", "correctness", "explanation"]
+
+
+def _safe_name(experiment):
+    return str(experiment).replace("/", "_").replace(os.sep, "_")
+
+
+class ResultsStore:
+    """
+    Directory of Parquet files with the evaluated test set of every iteration.
+
+    Args:
+        path: store directory (created if missing)
+        input_columns: columns that don't change between iterations, stored once per experiment
+    """
+
+    def __init__(self, path, input_columns=("input",)):
+        self.path = path
+        self.input_columns = list(input_columns)
+        os.makedirs(path, exist_ok=True)
+
+    def _inputs_path(self, experiment):
+        return os.path.join(self.path, "inputs", f"{_safe_name(experiment)}.parquet")
+
+    def _part_path(self, kind, experiment, iteration):
+        return os.path.join(self.path, kind, _safe_name(experiment), f"{iteration:04d}.parquet")
+
+    @staticmethod
+    def _write(path, df):
+        import pandas as pd
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        buffer = io.BytesIO()
+        pd.DataFrame(df).to_parquet(buffer, index=False)
+        _atomic_write(path, buffer.getvalue())
+
+    def append_iteration(self, experiment, iteration, df, prompt, metric=None):
+        """
+        Store one iteration's evaluated test set.
+
+        Inputs are written the first time an experiment is seen; afterwards only the
+        iteration columns present in df are written, keyed by df's index.
+        """
+        row_ids = [str(index) for index in df.index]
+        if not os.path.exists(self._inputs_path(experiment)):
+            inputs = {"row_id": row_ids}
+            for col in self.input_columns:
+                if col in df.columns:
+                    inputs[col] = df[col].astype("string").reset_index(drop=True)
+            self._write(self._inputs_path(experiment), inputs)
+
+        rows = {"row_id": row_ids}
+        for col in ITERATION_COLUMNS:
+            if col in df.columns:
+                rows[col] = df[col].astype("string").reset_index(drop=True)
+        self._write(self._part_path("rows", experiment, iteration), rows)
+        self._write(self._part_path("prompts", experiment, iteration), {
+            "iteration": [iteration],
+            "prompt": [prompt],
+            "metric": [None if metric is None else float(metric)],
+        })
+
+    def experiments(self):
+        rows_dir = os.path.join(self.path, "rows")
+        return sorted(os.listdir(rows_dir)) if os.path.isdir(rows_dir) else []
+
+    def iterations(self, experiment):
+        part_dir = os.path.join(self.path, "rows", _safe_name(experiment))
+        if not os.path.isdir(part_dir):
+            return []
+        return sorted(int(name.split(".")[0]) for name in os.listdir(part_dir) if name.endswith(".parquet"))
+
+    def load_iteration(self, experiment, iteration, columns=None):
+        """
+        Reconstruct one iteration's test set DataFrame (indexed by row_id).
+
+        Args:
+            columns: iteration columns to read, default all stored ones
+        """
+        import pandas as pd
+        import pyarrow.parquet as pq
+
+        path = self._part_path("rows", experiment, iteration)
+        if columns is not None:
+            # Iterations only store the columns the run produced
+            available = set(pq.read_schema(path).names)
+            columns = ["row_id"] + [col for col in columns if col in available]
+        rows = pd.read_parquet(path, columns=columns)
+        inputs = pd.read_parquet(self._inputs_path(experiment))
+        return inputs.merge(rows, on="row_id", how="right").set_index("row_id")
+
+    def prompts(self, experiment):
+        """Prompt text and metric of every iteration, one row per iteration."""
+        import pandas as pd
+
+        frames = [pd.read_parquet(self._part_path("prompts", experiment, i)) for i in self.iterations(experiment)]
+        if not frames:
+            return pd.DataFrame(columns=["iteration", "prompt", "metric"])
+        return pd.concat(frames, ignore_index=True)
+
+    def scan(self, experiment=None, columns=None):
+        """
+        All stored rows as one long DataFrame with experiment and iteration columns.
+
+        Args:
+            experiment: restrict to one experiment, default all
+            columns: iteration columns to read, default all stored ones
+        """
+        import pandas as pd
+
+        experiments = [_safe_name(experiment)] if experiment is not None else self.experiments()
+        frames = []
+        for name in experiments:
+            for iteration in self.iterations(name):
+                df = self.load_iteration(name, iteration, columns).reset_index()
+                df.insert(0, "iteration", iteration)
+                df.insert(0, "experiment", name)
+                frames.append(df)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def frames(self, experiment):
+        return IterationFrames(self.path, experiment, self.input_columns)
+
+
+class IterationFrames:
+    """
+    Lazy, list-like view of an experiment's per-iteration test set DataFrames.
+
+    Stands in for the list of deepcopied DataFrames in optimize_loop's "raw" result:
+    len() and indexing work as before, but each DataFrame is read from the store on access.
+    """
+
+    def __init__(self, path, experiment, input_columns=("input",)):
+        self.path = path
+        self.experiment = experiment
+        self.input_columns = list(input_columns)
+
+    @property
+    def store(self):
+        return ResultsStore(self.path, self.input_columns)
+
+    def __len__(self):
+        return len(self.store.iterations(self.experiment))
+
+    def __getitem__(self, index):
+        iterations = self.store.iterations(self.experiment)
+        if isinstance(index, slice):
+            return [self.store.load_iteration(self.experiment, i) for i in iterations[index]]
+        return self.store.load_iteration(self.experiment, iterations[index])
+
+    def __iter__(self):
+        for iteration in self.store.iterations(self.experiment):
+            yield self.store.load_iteration(self.experiment, iteration)
+
+    def to_json_ref(self):
+        """Reference saved in place of the DataFrames by save_experiment_results."""
+        return {"results_store": self.path, "experiment": self.experiment, "iterations": len(self)}
+
+    def __repr__(self):
+        return f"IterationFrames({self.path!r}, {self.experiment!r}, iterations={len(self)})"
@@ -0,0 +1,406 @@
+"""Deterministic checks for the machine-checkable rules in prompts/*.txt.
+
+Most rules in the evaluator and rule-checker templates can be verified by
+parsing the generated JSON once and walking it (HTTPS URLs, hex/RGB colors,
+rem font sizes, ISO-8601 timestamps, integer product IDs, ...). RuleEngine runs
+those checks locally and reports which rules of the template are left over for
+the LLM judge. Rules are matched to checks by the start of their text, so the
+same check serves the 10, 50 and 100 rule sets even where their wording
+differs slightly.
+"""
+
+import json
+import re
+from datetime import datetime
+from functools import lru_cache
+
+RULE_SET_START = "[BEGIN RULE SET]\n************"
+RULE_SET_END = "************\n[END RULE SET]"
+
+SECTION_TYPES = {"header", "text", "image", "productGrid", "gallery", "form", "button", "footer", "embed"}
+# Section types that other rules of the same rule set explicitly ask for.
+EXTRA_SECTION_TYPES = {
+    "Unknown section types trigger": "unsupported",
+    "Render markdown blocks": "markdown",
+    "Cookies banners appear": "banner",
+    "QR codes generated": "qr",
+}
+
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+_COLOR_RE = re.compile(
+    r"#(?:[0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})"
+    r"|rgba?\(\s*\d{1,3}%?\s*,\s*\d{1,3}%?\s*,\s*\d{1,3}%?\s*(?:,\s*(?:0|1|0?\.\d+)\s*)?\)"
+)
+_REM_RE = re.compile(r"-?\d*\.?\d+rem")
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_NUMERIC_STRING_RE = re.compile(r"[$€£]?\s*-?\d[\d,]*(\.\d+)?")
+_SCHEME_RE = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*:")
+
+NUMERIC_KEYS = {"price", "salePrice", "originalPrice", "discountPercent", "rating", "quantity", "stock"}
+PRICE_KEYS = {"price", "salePrice", "originalPrice"}
+LINK_KEYS = {"href", "link", "url"}
+
+
+def parse_rule_set(template):
+    """Return the rules listed between [BEGIN RULE SET] and [END RULE SET] in a template."""
+    start = template.index(RULE_SET_START) + len(RULE_SET_START)
+    end = template.index(RULE_SET_END, start)
+    return [line.strip() for line in template[start:end].splitlines() if line.strip()]
+
+
+def replace_rule_set(template, rules):
+    """Return the template with its rule set replaced by the given rules."""
+    start = template.index(RULE_SET_START) + len(RULE_SET_START)
+    end = template.index(RULE_SET_END, start)
+    body = "\n\n".join(rules)
+    return f"{template[:start]}\n\n{body}\n\n{template[end:]}"
+
+
+def _walk(node, key=None, parent=None):
+    """Yield (key, value, parent) for every value in a parsed JSON document."""
+    yield key, node, parent
+    if isinstance(node, dict):
+        for k, v in node.items():
+            yield from _walk(v, k, node)
+    elif isinstance(node, list):
+        for v in node:
+            yield from _walk(v, key, node)
+
+
+def _objects(page, type_=None):
+    """Every JSON object in the page, optionally only those with the given "type"."""
+    for _, value, _ in _walk(page):
+        if isinstance(value, dict) and (type_ is None or value.get("type") == type_):
+            yield value
+
+
+def _list_items(page, list_key):
+    """Every object inside a list stored under list_key anywhere in the page."""
+    for key, value, parent in _walk(page):
+        if key == list_key and isinstance(parent, list) and isinstance(value, dict):
+            yield value
+
+
+def _root_object(page):
+    """The page object: the value of a single top-level key, or the document itself."""
+    if isinstance(page, dict) and len(page) == 1:
+        value = next(iter(page.values()))
+        if isinstance(value, dict):
+            return value
+    return page
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# Each check takes the parsed page and the active rules, and returns True when the rule is violated.
+_CHECKS = {}
+
+
+def rule_check(prefix):
+    """Register a check for every rule whose text starts with prefix."""
+    def register(fn):
+        _CHECKS[prefix] = fn
+        return fn
+    return register
+
+
+@rule_check("Always return valid JSON")
+@rule_check("Quotes for strings are double quotes")
+def _valid_json(page, rules):
+    # Reaching a check at all means json.loads succeeded.
+    return False
+
+
+@rule_check("Numeric values stay numeric")
+def _numeric_values(page, rules):
+    return any(
+        key in NUMERIC_KEYS and isinstance(value, str) and _NUMERIC_STRING_RE.fullmatch(value.strip())
+        for key, value, _ in _walk(page)
+    )
+
+
+@rule_check('Images need "src" and "alt"')
+def _image_src_alt(page, rules):
+    images = list(_objects(page, "image")) + list(_list_items(page, "images"))
+    for image in images:
+        if "src" not in image:
+            return True
+        if "alt" not in image and not image.get("decorative"):
+            return True
+    return False
+
+
+@rule_check("Use HTTPS URLs for all external assets")
+def _https_only(page, rules):
+    warnings = " ".join(
+        json.dumps(value) for key, value, _ in _walk(page) if key == "warnings"
+    )
+    return any(
+        isinstance(value, str) and value.startswith("http://") and value not in warnings
+        for key, value, _ in _walk(page)
+        if key != "warnings"
+    )
+
+
+@rule_check('Every section object requires a "type" field')
+def _section_types(page, rules):
+    allowed = set(SECTION_TYPES)
+    for prefix, section_type in EXTRA_SECTION_TYPES.items():
+        if any(rule.startswith(prefix) for rule in rules):
+            allowed.add(section_type)
+    # A list or object "type" is valid JSON but never a valid section type
+    return any(
+        not (isinstance(section.get("type"), str) and section["type"] in allowed)
+        for section in _list_items(page, "sections")
+    )
+
+
+@rule_check("Email fields validate with regex")
+def _email_fields(page, rules):
+    for key, value, parent in _walk(page):
+        if not isinstance(value, str) or not value:
+            continue
+        is_email_key = isinstance(key, str) and "email" in key.lower()
+        is_email_field = key == "value" and isinstance(parent, dict) and parent.get("type") == "email"
+        if (is_email_key or is_email_field) and "@" in value and not _EMAIL_RE.fullmatch(value):
+            return True
+    return False
+
+
+@rule_check("Internal links must start with /")
+def _link_prefixes(page, rules):
+    # Absolute URLs, other schemes (mailto:, tel:) and in-page anchors aren't internal links
+    return any(
+        key in LINK_KEYS and isinstance(value, str) and value
+        and not value.startswith(("/", "#")) and not _SCHEME_RE.match(value)
+        for key, value, _ in _walk(page)
+    )
+
+
+@rule_check('Add "updatedAt" ISO-8601 timestamp')
+def _updated_at(page, rules):
+    stamps = [value for key, value, _ in _walk(page) if key == "updatedAt"]
+    if not stamps:
+        return True
+    for stamp in stamps:
+        if not isinstance(stamp, str):
+            return True
+        try:
+            datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+        except ValueError:
+            return True
+    return False
+
+
+@rule_check("Prices must be positive numbers")
+def _positive_prices(page, rules):
+    return any(
+        key in PRICE_KEYS and _is_number(value) and value <= 0 and "validationError" not in parent
+        for key, value, parent in _walk(page)
+        if isinstance(parent, dict)
+    )
+
+
+@rule_check("Product IDs are integers")
+def _integer_product_ids(page, rules):
+    for product in _list_items(page, "products"):
+        if "id" in product and not (isinstance(product["id"], int) and not isinstance(product["id"], bool)):
+            return True
+    return any(
+        key == "productId" and not (isinstance(value, int) and not isinstance(value, bool))
+        for key, value, _ in _walk(page)
+    )
+
+
+@rule_check("Color values use hex or RGB")
+def _color_values(page, rules):
+    return any(
+        isinstance(key, str) and key.lower().endswith("color") and isinstance(value, str)
+        and not _COLOR_RE.fullmatch(value.strip())
+        for key, value, _ in _walk(page)
+    )
+
+
+@rule_check("Font sizes expressed in rem units")
+def _rem_font_sizes(page, rules):
+    return any(
+        key in ("fontSize", "font-size", "font_size")
+        and not (isinstance(value, str) and _REM_RE.fullmatch(value.strip()))
+        for key, value, _ in _walk(page)
+        if not isinstance(value, (dict, list))
+    )
+
+
+@rule_check("All numeric ratings capped at 5")
+def _ratings(page, rules):
+    return any(
+        key == "rating" and _is_number(value) and (value > 5 or round(value, 1) != value)
+        for key, value, _ in _walk(page)
+    )
+
+
+@rule_check('Use "layout" at the page level')
+def _page_layout(page, rules):
+    root = _root_object(page)
+    if not isinstance(root, dict) or root.get("layout") not in ("vertical", "horizontal", "grid"):
+        return True
+    return False
+
+
+@rule_check('Include a "title" string inside the root object')
+def _root_title(page, rules):
+    root = _root_object(page)
+    return not (isinstance(root, dict) and isinstance(root.get("title"), str))
+
+
+@rule_check('Buttons need an "action" key')
+def _button_actions(page, rules):
+    return any(
+        button.get("action") not in ("navigate", "submitForm", "customEvent")
+        for button in _objects(page, "button")
+    )
+
+
+@rule_check('Forms must include a "method"')
+def _form_method(page, rules):
+    return any(
+        form.get("method") not in ("POST", "GET") or not form.get("target")
+        for form in _objects(page, "form")
+    )
+
+
+@rule_check('Footers always include "links" and "legal" arrays')
+def _footer_arrays(page, rules):
+    return any(
+        not isinstance(footer.get("links"), list) or not isinstance(footer.get("legal"), list)
+        for footer in _objects(page, "footer")
+    )
+
+
+@rule_check("Password fields never pre-populate")
+def _password_values(page, rules):
+    return any(field.get("value") for field in _objects(page, "password"))
+
+
+@rule_check("Blog dates formatted YYYY-MM-DD")
+def _blog_dates(page, rules):
+    return any(
+        "date" in post and not (isinstance(post["date"], str) and _DATE_RE.fullmatch(post["date"]))
+        for post in _list_items(page, "posts")
+    )
+
+
+@rule_check('Checkbox groups list "options"')
+def _checkbox_options(page, rules):
+    for group in list(_objects(page, "checkbox")) + list(_objects(page, "checkboxGroup")):
+        options = group.get("options")
+        if not isinstance(options, list):
+            return True
+        if any(not isinstance(o, dict) or "label" not in o or "value" not in o for o in options):
+            return True
+    return False
+
+
+@rule_check('Progress bars include "value" (0–100)')
+def _progress_bars(page, rules):
+    for bar in list(_objects(page, "progress")) + list(_objects(page, "progressBar")):
+        value = bar.get("value")
+        if not _is_number(value) or not 0 <= value <= 100 or not isinstance(bar.get("showLabel"), bool):
+            return True
+    return False
+
+
+class RuleEngine:
+    """
+    Compiled rule checks for one rule set.
+
+    Args:
+        rules: rule texts, as returned by parse_rule_set
+
+    Attributes:
+        checked_rules: rules verified locally, in rule-set order
+        residual_rules: rules with no local check, left to the LLM judge
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self._compiled = []
+        self.residual_rules = []
+        for rule in self.rules:
+            check = next((fn for prefix, fn in _CHECKS.items() if rule.startswith(prefix)), None)
+            if check is None:
+                self.residual_rules.append(rule)
+            else:
+                self._compiled.append((rule, check))
+        self.checked_rules = [rule for rule, _ in self._compiled]
+        self._json_rule = next(
+            (rule for rule in self.checked_rules if rule.startswith("Always return valid JSON")), None
+        )
+
+    @classmethod
+    def from_template(cls, template):
+        return cls(parse_rule_set(template))
+
+    def check(self, output):
+        """
+        Check one generated output against every compiled rule.
+
+        Args:
+            output: the generated JSON text, or an already parsed page (dict); anything else
+                (e.g. NaN for a failed generation) counts as invalid JSON
+
+        Returns:
+            dict with keys:
+                "valid_json": whether the output parsed as JSON
+                "violations": list of broken rule texts
+        """
+        try:
+            page = json.loads(output) if isinstance(output, str) else output
+        except (TypeError, ValueError):
+            return {"valid_json": False, "violations": [self._json_rule] if self._json_rule else []}
+        if not isinstance(page, dict):
+            return {"valid_json": False, "violations": [self._json_rule] if self._json_rule else []}
+
+        violations = [rule for rule, check in self._compiled if check(page, self.rules)]
+        return {"valid_json": True, "violations": violations}
+
+    def verdict(self, output):
+        """Check one output and return its "correctness", "explanation" and "rule_violations"."""
+        violations = self.check(output)["violations"]
+        if violations:
+            return {
+                "correctness": "incorrect",
+                "explanation": "The JSON web page breaks these rules: " + " ".join(violations),
+                "rule_violations": "\n".join(violations),
+            }
+        return {
+            "correctness": "correct",
+            "explanation": "The JSON web page follows every machine-checkable rule.",
+            "rule_violations": "",
+        }
+
+    def evaluate(self, outputs):
+        """
+        Check a sequence of outputs, producing the evaluator columns.
+
+        Returns:
+            dict of lists: "correctness", "explanation", "rule_violations"
+        """
+        columns = {"correctness": [], "explanation": [], "rule_violations": []}
+        for output in outputs:
+            verdict = self.verdict(output)
+            for col, values in columns.items():
+                values.append(verdict[col])
+        return columns
+
+    def residual_template(self, template):
+        """The judge template restricted to the rules that could not be checked locally."""
+        return replace_rule_set(template, self.residual_rules)
+
+
+@lru_cache(maxsize=None)
+def engine_for_template(template):
+    """Compile (once) the engine for a template's rule set."""
+    return RuleEngine.from_template(template)
@@ -0,0 +1,200 @@
+"""Rule-sharded judging for large rule sets.
+
+With 100 rules every judge request asks one model call to check the whole
+rule set against a long JSON page: slow to complete and less reliable than
+short prompts. shard_template splits a template's rule set into shards of a
+few rules each, every (row, shard) pair is judged concurrently, and
+merge_verdicts combines the shard verdicts into the usual row-level
+"correctness" / "explanation" / "rule_violations" columns. A row's judging
+latency is then bounded by its slowest shard instead of one huge completion.
+
+The judged "rule_violations" are mapped back to the rules they quote, which
+gives a row x rule violation matrix (violation_matrix) and per-rule counts.
+"""
+
+import asyncio
+import math
+import re
+
+from .llm_client import agenerate
+from .rule_engine import parse_rule_set, replace_rule_set
+from .templates import render_template
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_MATCH_PREFIX_CHARS = 50  # normalized rule text long enough to tell the rules of one set apart
+
+
+def shard_template(template, shard_size, split=None):
+    """
+    Split a judge template into templates that each carry a slice of its rule set.
+
+    Args:
+        template: judge template with a [BEGIN RULE SET] ... [END RULE SET] block
+        shard_size: maximum rules per shard; 0/None or a rule set this small gives a single shard
+        split: optional fn(template) -> (instruction, row_template), e.g. prefix_cache.split_template
+
+    Returns:
+        list of dicts with "rules" (None without shard_size), "template" and "instruction" (None without split)
+    """
+    groups = [parse_rule_set(template)] if shard_size else [None]
+    rules = groups[0]
+    if shard_size and len(rules) > shard_size:
+        # Equal-sized shards, so no shard is much slower than the rest
+        count = math.ceil(len(rules) / shard_size)
+        size = math.ceil(len(rules) / count)
+        groups = [rules[i:i + size] for i in range(0, len(rules), size)]
+
+    shards = []
+    for group in groups:
+        shard = replace_rule_set(template, group) if len(groups) > 1 else template
+        instruction = None
+        if split is not None:
+            instruction, shard = split(shard)
+        shards.append({"rules": group, "template": shard, "instruction": instruction})
+    return shards
+
+
+def _normalize(text):
+    return _NON_ALNUM_RE.sub(" ", text.lower()).strip()
+
+
+def match_violations(text, rules):
+    """The rules (in rule-set order) whose text is quoted in a judge's violation list."""
+    if not isinstance(text, str) or not text:
+        return []
+    haystack = _normalize(text)
+    return [rule for rule in rules if _normalize(rule)[:_MATCH_PREFIX_CHARS] in haystack]
+
+
+def merge_verdicts(verdicts, shards=None):
+    """
+    Combine the verdicts of one row's shards into a single verdict.
+
+    A row is incorrect if any shard found it incorrect, unknown (None) if any shard
+    failed and none found it incorrect, otherwise correct. Explanations of the shards
+    that found violations are concatenated. With shards, each shard's rule_violations
+    are replaced by the full text of the rules they quote (kept verbatim if none match).
+    A failed shard is an empty verdict; rule_violations are None if one failed and the
+    others found none.
+    """
+    if len(verdicts) == 1 and shards is None:
+        return verdicts[0]
+    keys = list(dict.fromkeys(key for verdict in verdicts for key in verdict))
+    merged = {}
+    if "correctness" in keys:
+        labels = [verdict.get("correctness") for verdict in verdicts]
+        if "incorrect" in labels:
+            merged["correctness"] = "incorrect"
+        elif None in labels:
+            merged["correctness"] = None
+        else:
+            merged["correctness"] = "correct"
+    if "explanation" in keys:
+        explanations = [verdict.get("explanation") for verdict in verdicts]
+        if merged.get("correctness") == "incorrect":
+            explanations = [
+                explanation for verdict, explanation in zip(verdicts, explanations)
+                if verdict.get("correctness") == "incorrect"
+            ]
+        explanations = [explanation for explanation in explanations if explanation]
+        merged["explanation"] = " ".join(explanations) if explanations else None
+    if "confidence" in keys:
+        # A cascade's cheap judge is only as sure as its least sure shard
+        confidences = [verdict.get("confidence") for verdict in verdicts]
+        merged["confidence"] = None if None in confidences else min(confidences)
+    if "rule_violations" in keys:
+        violations = []
+        for i, verdict in enumerate(verdicts):
+            text = verdict.get("rule_violations")
+            matched = match_violations(text, shards[i]["rules"] or []) if shards is not None else []
+            violations.extend(matched or ([text] if text else []))
+        if violations or all(verdicts):
+            merged["rule_violations"] = "\n".join(violations)
+        else:
+            merged["rule_violations"] = None
+    return merged
+
+
+async def ajudge_shards(model, shards, row, index, output_parser):
+    """Judge one row against every shard concurrently; returns the parsed verdict per shard."""
+    responses = await asyncio.gather(*[
+        agenerate(model, render_template(shard["template"], row), shard["instruction"])
+        for shard in shards
+    ])
+    return [output_parser(response, index) for response in responses]
+
+
+async def _judge_all(rows, labels, shards, model, output_parser, workers):
+    semaphore = asyncio.Semaphore(workers)
+    verdicts = {}
+
+    async def judge(position, row, shard_number, shard):
+        async with semaphore:
+            try:
+                response = await agenerate(model, render_template(shard["template"], row), shard["instruction"])
+                verdict = output_parser(response, position)
+            except Exception as error:
+                print(f"⚠️ Judging failed for row {labels[position]}: {error}")
+                verdict = {}
+        verdicts[(position, shard_number)] = verdict
+
+    await asyncio.gather(*[
+        judge(position, row, shard_number, shard)
+        for position, row in enumerate(rows)
+        for shard_number, shard in enumerate(shards)
+    ])
+    return verdicts
+
+
+def judge_sharded(dataset, shards, model, output_parser, workers=40):
+    """
+    Judge every (row, shard) pair of dataset concurrently and merge each row's verdicts.
+
+    Args:
+        dataset: DataFrame with the columns the shard templates use (its index need not be unique)
+        shards: shards from shard_template
+        model: judge model from make_model
+        output_parser: parser for one judge response, as passed to llm_generate
+        workers: concurrent judge requests
+
+    Returns:
+        dict of lists, one entry per row of dataset in row order, keyed by the merged verdict columns
+    """
+    # Rows are addressed by position: index labels of concatenated batches can repeat
+    rows = dataset.to_dict("records")
+    verdicts = asyncio.run(_judge_all(rows, list(dataset.index), shards, model, output_parser, workers))
+    merged = [
+        merge_verdicts([verdicts[(position, shard_number)] for shard_number in range(len(shards))], shards)
+        for position in range(len(rows))
+    ]
+    columns = list(dict.fromkeys(key for verdict in merged for key in verdict))
+    return {col: [verdict.get(col) for verdict in merged] for col in columns}
+
+
+def violation_matrix(violations, rules):
+    """
+    Row x rule matrix of a "rule_violations" column.
+
+    Args:
+        violations: Series of newline-separated violated rule texts
+        rules: the rule set, e.g. rule_engine.parse_rule_set(template)
+
+    Returns:
+        boolean DataFrame indexed like violations, one column per rule
+    """
+    import pandas as pd
+
+    matched = [set(match_violations(text, rules)) for text in violations]
+    return pd.DataFrame(
+        [[rule in row for rule in rules] for row in matched],
+        index=violations.index,
+        columns=rules,
+        dtype=bool
+    )
+
+
+def rule_violation_counts(violations, rules):
+    """How many rows violate each rule, for the rules violated at least once, most violated first."""
+    counts = violation_matrix(violations, rules).sum()
+    counts = counts[counts > 0].sort_values(ascending=False)
+    return {rule: int(count) for rule, count in counts.items()}
@@ -0,0 +1,152 @@
+"""Sequential test-set evaluation with early stopping.
+
+Scoring the whole test set is wasted work when a partial sample already shows
+that the prompt is clearly above or clearly below the threshold.
+sequential_evaluate scores rows in randomized mini-batches and stops as soon
+as a confidence interval on the metric lies entirely on one side of the
+threshold.
+
+Every test row is expected to be "correct", so accuracy and recall are both the
+fraction of rows judged correct, a binomial proportion that the Wilson or
+Bayesian (Beta posterior) interval applies to. Precision and F1 have no such
+interval here, so those scorers always evaluate every row.
+"""
+
+import math
+import random
+from statistics import NormalDist
+
+PROPORTION_SCORERS = ("accuracy", "recall")
+
+
+def wilson_interval(successes, n, confidence=0.95):
+    """Wilson score interval for a binomial proportion."""
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / n
+    denominator = 1 + z ** 2 / n
+    center = (p + z ** 2 / (2 * n)) / denominator
+    margin = z * ((p * (1 - p) / n + z ** 2 / (4 * n ** 2)) ** 0.5) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def _beta_cf(x, a, b, max_iter=300, eps=1e-14):
+    """Continued fraction of the regularized incomplete beta function (modified Lentz)."""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, max_iter + 1):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1.0) < eps:
+            break
+    return result
+
+
+def beta_cdf(x, a, b):
+    """Regularized incomplete beta function I_x(a, b), the CDF of Beta(a, b)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    log_front = math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x)
+    # The continued fraction converges fast only below the mean; use the symmetry I_x(a, b) = 1 - I_1-x(b, a)
+    if x < (a + 1) / (a + b + 2):
+        return math.exp(log_front) * _beta_cf(x, a, b) / a
+    return 1.0 - math.exp(log_front) * _beta_cf(1.0 - x, b, a) / b
+
+
+def beta_ppf(q, a, b, tol=1e-12):
+    """Quantile of Beta(a, b), found by bisection on beta_cdf."""
+    low, high = 0.0, 1.0
+    while high - low > tol:
+        middle = (low + high) / 2
+        if beta_cdf(middle, a, b) < q:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def bayes_interval(successes, n, confidence=0.95, prior=(1.0, 1.0)):
+    """Equal-tailed credible interval of the Beta posterior (uniform prior by default)."""
+    a, b = prior[0] + successes, prior[1] + n - successes
+    tail = (1 - confidence) / 2
+    return beta_ppf(tail, a, b), beta_ppf(1 - tail, a, b)
+
+
+def sequential_evaluate(dataset, evaluate_batch, threshold, scorer="accuracy", batch_size=20,
+                        confidence=0.95, min_rows=20, method="wilson", seed=42):
+    """
+    Evaluate dataset in random mini-batches until the metric is clearly above or below threshold.
+
+    Args:
+        dataset: test DataFrame
+        evaluate_batch: function(DataFrame) -> DataFrame with "output" and "correctness" columns
+        threshold: value the metric is compared against (metric >= threshold passes)
+        scorer: one of "accuracy", "f1", "precision", "recall"
+        batch_size: rows scored per mini-batch
+        confidence: confidence level of the interval
+        min_rows: never stop before this many rows were scored
+        method: "wilson" or "bayes"
+        seed: seed for the row order
+
+    Returns:
+        (evaluated, info) where evaluated is a copy of dataset with a boolean "scored" column;
+        unscored rows have None in "output"/"correctness"/"explanation". info is a dict with
+        "estimate", "interval", "rows_used", "rows_total", "stopped_early" and "decision"
+    """
+    interval_fn = {"wilson": wilson_interval, "bayes": bayes_interval}[method]
+    order = list(dataset.index)
+    random.Random(seed).shuffle(order)
+    if scorer not in PROPORTION_SCORERS:
+        batch_size = len(order)
+
+    batches = []
+    successes = 0
+    used = 0
+    interval = (0.0, 1.0)
+    decision = None
+    for start in range(0, len(order), batch_size):
+        batch = evaluate_batch(dataset.loc[order[start:start + batch_size]])
+        batches.append(batch)
+        successes += int((batch["correctness"] == "correct").sum())
+        used += len(batch)
+        interval = interval_fn(successes, used, confidence)
+        if scorer not in PROPORTION_SCORERS or used < min_rows:
+            continue
+        if interval[0] >= threshold:
+            decision = "above"
+            break
+        if interval[1] < threshold:
+            decision = "below"
+            break
+
+    evaluated = dataset.copy()
+    for col in ["output", "correctness", "explanation"]:
+        evaluated[col] = None
+    evaluated["scored"] = False
+    for batch in batches:
+        for col in ["output", "correctness", "explanation"]:
+            if col in batch.columns:
+                evaluated.loc[batch.index, col] = batch[col]
+        evaluated.loc[batch.index, "scored"] = True
+
+    info = {
+        "estimate": successes / used if used else 0.0,
+        "interval": list(interval),
+        "rows_used": used,
+        "rows_total": len(order),
+        "stopped_early": used < len(order),
+        "decision": decision,
+    }
+    return evaluated, info
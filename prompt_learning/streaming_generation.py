@@ -0,0 +1,234 @@
+"""Streaming generation with early abort on invalid JSON.
+
+generate_output waits for every full completion, so a runaway or malformed
+webpage JSON costs its whole generation time and tokens before the judge
+marks it incorrect. stream_generate streams each completion instead, checks
+the JSON syntax incrementally as chunks arrive (JsonStreamValidator), and
+closes the stream as soon as the output can no longer become valid JSON or
+grows past a size cap. The abort reason is returned with the partial output
+so the judges can mark the row incorrect without calling a model
+(abort_verdict).
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from .llm_cache import cache_key
+from .rate_limiter import is_rate_limit_error
+from .templates import render_column
+
+JSON_RULE = "Always return valid JSON—no trailing commas, unmatched braces, or comments."
+_LITERAL_CHARS = set("0123456789+-.eE" "truefalsn")
+_CLOSERS = {"}": "{", "]": "["}
+
+
+class JsonStreamValidator:
+    """
+    Incremental syntax check of one JSON object arriving in chunks.
+
+    Only errors that no continuation can repair are reported (unbalanced or
+    mismatched brackets, trailing commas, characters that can't appear outside
+    a string, text after the object); an unfinished document is fine until finish().
+    """
+
+    def __init__(self, max_chars=None):
+        self.max_chars = max_chars
+        self.chars = 0
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+        self.done = False
+        self.last = None  # last non-space character outside strings
+
+    def feed(self, chunk):
+        """Check the next chunk; returns an abort reason, or None while the JSON is still valid."""
+        for char in chunk:
+            reason = self._char(char)
+            if reason:
+                return reason
+        self.chars += len(chunk)
+        if self.max_chars and self.chars > self.max_chars:
+            return f"output exceeded {self.max_chars} characters"
+        return None
+
+    def _char(self, char):
+        if self.in_string:
+            if self.escaped:
+                self.escaped = False
+            elif char == "\\":
+                self.escaped = True
+            elif char == '"':
+                self.in_string = False
+                self.last = '"'
+            elif char < " ":
+                return "unescaped control character in a JSON string"
+            return None
+        if char.isspace():
+            return None
+        if self.done:
+            return "text after the end of the JSON object"
+        if not self.started:
+            if char != "{":
+                return "output does not start with a JSON object"
+            self.started = True
+        if char in "{[":
+            self.stack.append(char)
+        elif char in _CLOSERS:
+            if self.last == ",":
+                return f"trailing comma before '{char}'"
+            if not self.stack or self.stack.pop() != _CLOSERS[char]:
+                return f"mismatched '{char}'"
+            self.done = not self.stack
+        elif char == '"':
+            self.in_string = True
+        elif char not in ",:" and char not in _LITERAL_CHARS:
+            return f"unexpected character {char!r} outside a JSON string"
+        self.last = char
+        return None
+
+    def finish(self):
+        """The abort reason for a completed stream that isn't a whole JSON object, else None."""
+        if not self.done:
+            return "output ended before the JSON object was closed"
+        return None
+
+
+def abort_verdict(reason):
+    """The evaluator columns for a row whose generation was aborted."""
+    return {
+        "correctness": "incorrect",
+        "explanation": f"The output was not valid JSON (generation stopped early: {reason}).",
+        "rule_violations": JSON_RULE,
+    }
+
+
+@asynccontextmanager
+async def _no_slot():
+    yield {}
+
+
+async def astream_completion(client, model_name, prompt, model_kwargs=None, instruction=None, max_chars=None,
+                             max_tokens=None, scheduler=None, tracer=None, max_retries=5):
+    """
+    Stream one chat completion and stop it as soon as its JSON is unrecoverable.
+
+    Args:
+        client: openai.AsyncOpenAI client
+        model_name: model to call
+        prompt: user message
+        model_kwargs: extra request parameters (response_format, temperature, ...)
+        instruction: optional system message
+        max_chars: abort once the output is longer than this
+        max_tokens: max_tokens sent with the request; hitting it counts as an abort
+        scheduler: optional AdaptiveScheduler; the slot is held until the stream ends
+        tracer: optional instrumentation.Tracer
+        max_retries: attempts on rate limit errors
+
+    Returns:
+        (text, abort_reason): abort_reason is None for a complete, syntactically valid object
+    """
+    messages = ([{"role": "system", "content": instruction}] if instruction else []) + [
+        {"role": "user", "content": prompt}
+    ]
+    kwargs = dict(model_kwargs or {})
+    if max_tokens:
+        kwargs["max_tokens"] = max_tokens
+
+    for attempt in range(max_retries):
+        validator = JsonStreamValidator(max_chars)
+        parts, reason, usage = [], None, None
+        start = time.perf_counter()
+        prompt_text = "\n".join(message["content"] for message in messages)
+        slot = scheduler.slot(model_name, prompt_text, max_tokens) if scheduler is not None else _no_slot()
+        try:
+            async with slot as slot_usage:
+                stream = await client.chat.completions.create(
+                    model=model_name, messages=messages, stream=True, stream_options={"include_usage": True},
+                    **kwargs
+                )
+                try:
+                    async for chunk in stream:
+                        usage = getattr(chunk, "usage", None) or usage
+                        for choice in chunk.choices or []:
+                            text = choice.delta.content or ""
+                            parts.append(text)
+                            reason = reason or validator.feed(text)
+                            if choice.finish_reason == "length":
+                                reason = reason or f"hit the {max_tokens} max_tokens cap"
+                        if reason:
+                            break
+                finally:
+                    await stream.close()
+                if usage is not None:
+                    slot_usage["total_tokens"] = getattr(usage, "total_tokens", None)
+                    slot_usage["prompt_tokens"] = getattr(usage, "prompt_tokens", None)
+        except Exception as error:
+            if tracer is not None:
+                tracer.record_request(model_name, time.perf_counter() - start,
+                                      rate_limited=is_rate_limit_error(error), error=type(error).__name__)
+            if is_rate_limit_error(error) and attempt < max_retries - 1:
+                await asyncio.sleep(min(2 ** attempt, 30))
+                continue
+            raise
+        if tracer is not None:
+            # Aborted streams report no usage; count the characters received instead
+            tracer.record_request(
+                model_name, time.perf_counter() - start,
+                prompt_tokens=getattr(usage, "prompt_tokens", None),
+                completion_tokens=getattr(usage, "completion_tokens", None) or validator.chars // 4
+            )
+        return "".join(parts), reason or validator.finish()
+
+
+def streaming_generator(client, model_name, model_kwargs=None, cache=None, **stream_kwargs):
+    """
+    Coroutine function prompt -> (text, abort_reason) streaming from model_name.
+
+    Complete outputs are cached like llm_generate's (same cache_key of model, kwargs and
+    prompt); aborted ones are not, so a later run retries them. stream_kwargs are passed
+    to astream_completion.
+    """
+    async def generate(prompt):
+        key = cache_key(model_name, dict(model_kwargs or {}), prompt, None)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            return cached, None
+        text, reason = await astream_completion(client, model_name, prompt, model_kwargs, **stream_kwargs)
+        if cache is not None and text and reason is None:
+            cache.set(key, text, model=model_name)
+        return text, reason
+
+    return generate
+
+
+def stream_generate(dataframe, template, generate, workers=40):
+    """
+    Generate an output for every row of dataframe with a streaming_generator.
+
+    Returns:
+        (outputs, abort_reasons): lists in row order; abort_reasons[i] is None for complete outputs
+    """
+    prompts = render_column(template, dataframe)
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(workers)
+
+        async def one(prompt):
+            async with semaphore:
+                try:
+                    return await generate(prompt)
+                except Exception as error:
+                    print(f"⚠️ Streaming generation failed: {error}")
+                    return None, None
+
+        return await asyncio.gather(*[one(prompt) for prompt in prompts])
+
+    results = asyncio.run(run_all())
+    outputs = [text for text, _ in results]
+    reasons = [reason for _, reason in results]
+    aborted = sum(reason is not None for reason in reasons)
+    if aborted:
+        print(f"✂️ Aborted {aborted}/{len(prompts)} generations early")
+    return outputs, reasons
@@ -0,0 +1,85 @@
+"""Precompiled prompt templates.
+
+Templates use {identifier} variables and leave every other brace alone (the
+judge templates quote JSON). Rendering one by str.replace per variable copies
+the whole ~10 KB template once per variable and row. compile_template splits
+a template into literal and variable segments once (cached per template
+string), and render_column renders a whole DataFrame in one pass per row:
+each variable column is converted to strings once and every prompt is a
+single join.
+"""
+
+import re
+from functools import lru_cache
+
+_TEMPLATE_RE = re.compile(r"\{([a-zA-Z_][a-zA-Z0-9_]*)\}")
+
+
+class CompiledTemplate:
+    """A template split into literals[0], var[0], literals[1], var[1], ..., literals[-1]."""
+
+    __slots__ = ("template", "literals", "slots", "variables")
+
+    def __init__(self, template):
+        self.template = template
+        self.literals = []
+        self.slots = []
+        position = 0
+        for match in _TEMPLATE_RE.finditer(template):
+            self.literals.append(template[position:match.start()])
+            self.slots.append(match.group(1))
+            position = match.end()
+        self.literals.append(template[position:])
+        self.variables = list(dict.fromkeys(self.slots))
+
+    def _join(self, values):
+        parts = [self.literals[0]]
+        for value, literal in zip(values, self.literals[1:]):
+            parts.append(value)
+            parts.append(literal)
+        return "".join(parts)
+
+    def render(self, values, strict=False):
+        """
+        Substitute values (a mapping) for the variables.
+
+        Variables missing from values stay as literal {name} unless strict, which raises KeyError.
+        """
+        if not self.slots:
+            return self.template
+        if strict:
+            return self._join([str(values[var]) for var in self.slots])
+        return self._join([str(values[var]) if var in values else f"{{{var}}}" for var in self.slots])
+
+    def render_column(self, dataframe):
+        """Render every row of dataframe; returns a list of prompts in row order."""
+        if not self.slots:
+            return [self.template] * len(dataframe)
+        columns = {
+            var: [str(value) for value in dataframe[var].tolist()] if var in dataframe.columns
+            else [f"{{{var}}}"] * len(dataframe)
+            for var in self.variables
+        }
+        slot_columns = [columns[var] for var in self.slots]
+        return [self._join(values) for values in zip(*slot_columns)]
+
+
+@lru_cache(maxsize=512)
+def compile_template(template):
+    """Parse a template into literal/variable segments (cached per template string)."""
+    return CompiledTemplate(template)
+
+
+def template_variables(template):
+    """The {identifier} variables of a template, in order of first appearance."""
+    return compile_template(template).variables
+
+
+def render_template(template, row):
+    """Render one row (a mapping); variables missing from row are left as literal {name}."""
+    return compile_template(template).render(row)
+
+
+def render_column(template, dataframe):
+    """Render every row of a DataFrame with a template; returns a list of prompts in row order."""
+    return compile_template(template).render_column(dataframe)
@@ -0,0 +1,94 @@
+"""Failure-focused mini-batch sampling of the train set.
+
+Every optimize_loop iteration regenerates and re-judges the whole train set
+twice, although only failing rows carry feedback the meta-prompt can use.
+FailureSampler picks a per-loop mini-batch instead, weighted toward rows that
+failed when last judged or that break rules still broken somewhere in the
+train set, with a periodic full pass to catch regressions on rows that
+passed. Per-loop cost then scales with the mini-batch size, not the train set.
+"""
+
+import random
+
+from .feedback_packing import violation_set
+
+
+class FailureSampler:
+    """
+    Choose which train rows each optimization loop works on.
+
+    Args:
+        batch_size: rows per mini-batch
+        full_pass_every: every n-th loop uses the whole train set (0 to never do a full pass)
+        failure_weight: extra weight of rows that failed when last judged
+        unresolved_weight: extra weight of rows breaking a rule that is still broken somewhere
+        unseen_weight: extra weight of rows never judged yet
+        seed: random seed; the sample of a loop depends only on seed, loop and recorded verdicts
+    """
+
+    def __init__(self, batch_size, full_pass_every=3, failure_weight=4.0, unresolved_weight=2.0,
+                 unseen_weight=4.0, seed=0):
+        self.batch_size = batch_size
+        self.full_pass_every = full_pass_every
+        self.failure_weight = failure_weight
+        self.unresolved_weight = unresolved_weight
+        self.unseen_weight = unseen_weight
+        self.seed = seed
+        self.failed = {}
+        self.violations = {}
+
+    def unresolved_rules(self):
+        """Rules broken by at least one row that failed when last judged."""
+        rules = set()
+        for index, failed in self.failed.items():
+            if failed:
+                rules |= self.violations.get(index, frozenset())
+        return rules
+
+    def weight(self, index, unresolved):
+        if index not in self.failed:
+            return 1.0 + self.unseen_weight
+        weight = 1.0
+        if self.failed[index]:
+            weight += self.failure_weight
+        if self.violations.get(index, frozenset()) & unresolved:
+            weight += self.unresolved_weight
+        return weight
+
+    def is_full_pass(self, loop):
+        return self.full_pass_every > 0 and loop % self.full_pass_every == 0
+
+    def sample(self, train_set, loop):
+        """
+        Index labels of the train rows to use in loop (1-based).
+
+        Returns the whole index on full-pass loops or when the train set is no larger
+        than batch_size, else a weighted sample without replacement.
+        """
+        if len(train_set) <= self.batch_size or self.is_full_pass(loop):
+            return list(train_set.index)
+        unresolved = self.unresolved_rules()
+        rng = random.Random(f"{self.seed}-{loop}")
+        # Efraimidis-Spirakis weighted sampling without replacement
+        keyed = sorted(
+            train_set.index,
+            key=lambda index: rng.random() ** (1.0 / self.weight(index, unresolved)),
+            reverse=True
+        )
+        chosen = set(keyed[:self.batch_size])
+        return [index for index in train_set.index if index in chosen]
+
+    def update(self, evaluated):
+        """Record the latest verdicts (and rule violations, when present) of evaluated rows."""
+        has_violations = "rule_violations" in evaluated.columns
+        for index, row in evaluated.iterrows():
+            self.failed[index] = row.get("correctness") != "correct"
+            if has_violations:
+                self.violations[index] = violation_set(row.get("rule_violations"))
+
+    def stats(self):
+        return {
+            "seen": len(self.failed),
+            "failing": sum(self.failed.values()),
+            "unresolved_rules": len(self.unresolved_rules()),
+        }
@@ -0,0 +1,61 @@
+import json
+
+import pandas as pd
+
+from prompt_learning.batch_backend import LocalBatchClient, run_batch
+from prompt_learning.llm_cache import LLMResponseCache
+from prompt_learning.mock_openai_server import MockConfig
+
+
+class CountingClient(LocalBatchClient):
+    def __init__(self, directory, config=None):
+        super().__init__(directory, config)
+        self.submitted = []
+
+    def submit(self, input_path):
+        with open(input_path) as f:
+            self.submitted.append([json.loads(line) for line in f if line.strip()])
+        return super().submit(input_path)
+
+
+def parse(response, row_index):
+    return json.loads(response)
+
+
+def judge(dataframe, client, work_dir, cache=None):
+    return run_batch(
+        dataframe, "You are a compliance judge. {output}", "gpt-4o",
+        model_kwargs={"response_format": {"type": "json_object"}}, output_parser=parse,
+        instruction="Judge the page.", client=client, work_dir=str(work_dir), poll_interval=0, cache=cache
+    )
+
+
+def test_local_batch_round_trip_maps_results_back_to_rows(tmp_path):
+    dataframe = pd.DataFrame({"output": ["page a", "page b", "page c"]}, index=[7, 3, 7])
+    client = CountingClient(str(tmp_path / "batches"), MockConfig(latency_median=0, correct_fraction=1.0))
+    result = judge(dataframe, client, tmp_path / "work")
+
+    assert list(result.index) == [7, 3, 7]
+    assert list(result["correctness"]) == ["correct"] * 3
+    assert "rule_violations" in result.columns
+    [requests] = client.submitted
+    assert [r["custom_id"] for r in requests] == ["0", "1", "2"]
+    assert requests[1]["body"]["messages"] == [
+        {"role": "system", "content": "Judge the page."},
+        {"role": "user", "content": "You are a compliance judge. page b"},
+    ]
+    assert requests[0]["body"]["response_format"] == {"type": "json_object"}
+
+
+def test_cached_rows_are_not_submitted_again(tmp_path):
+    dataframe = pd.DataFrame({"output": ["page a", "page b"]})
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"))
+    client = CountingClient(str(tmp_path / "batches"), MockConfig(latency_median=0))
+    first = judge(dataframe, client, tmp_path / "work", cache)
+
+    more = pd.DataFrame({"output": ["page a", "page b", "page c"]})
+    second = judge(more, client, tmp_path / "work", cache)
+
+    assert [len(batch) for batch in client.submitted] == [2, 1]
+    assert client.submitted[1][0]["body"]["messages"][-1]["content"].endswith("page c")
+    assert second.iloc[:2].to_dict("records") == first.to_dict("records")
@@ -0,0 +1,44 @@
+import pandas as pd
+
+from prompt_learning.beam_search import beam_step, candidates_per_member, select_beam
+
+
+class FakeOptimizer:
+    def __init__(self, prompt, seen):
+        self.prompt = prompt
+        self.seen = seen
+
+    def optimize(self, dataset, output_column, feedback_columns=None, context_size_k=None):
+        self.seen.append(self.prompt)
+        return f"{self.prompt}+{len(self.seen)}"
+
+
+def feedback():
+    return pd.DataFrame({"output": [f"o{i}" for i in range(10)], "correctness": "incorrect"})
+
+
+def test_candidates_are_split_across_members():
+    assert candidates_per_member(5, 2) == [3, 2]
+    assert candidates_per_member(4, 4) == [1, 1, 1, 1]
+
+
+def test_every_beam_member_is_expanded():
+    seen = []
+    beam = beam_step(
+        ["best", "second"], lambda prompt: FakeOptimizer(prompt, seen), feedback(), ["correctness"],
+        lambda prompts: [len(prompt) for prompt in prompts], k=4, width=2
+    )
+    assert sorted(seen) == ["best", "best", "second", "second"]
+    assert len(beam) == 2
+    assert all(prompt.startswith("second+") for prompt, _ in beam)
+
+
+def test_a_single_prompt_beam_gets_all_k_candidates():
+    seen = []
+    beam_step(["p"], lambda prompt: FakeOptimizer(prompt, seen), feedback(), ["correctness"],
+              lambda prompts: [0] * len(prompts), k=3, width=2)
+    assert seen == ["p"] * 3
+
+
+def test_select_beam_keeps_the_earlier_prompt_on_ties():
+    assert select_beam(["a", "b", "c"], [0.5, 0.9, 0.9], 2) == [("b", 0.9), ("c", 0.9)]
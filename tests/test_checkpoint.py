@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+from prompt_learning.checkpoint import RunCheckpoint, fingerprint
+from prompt_learning.incremental_eval import VerdictMemo
+
+
+class Crash(Exception):
+    pass
+
+
+def crash():
+    raise Crash()
+
+
+def inputs(rows=3):
+    return {"train_set": pd.DataFrame({"input": [f"q{i}" for i in range(rows)]}), "system_prompt": "p"}
+
+
+def test_resume_skips_completed_stages(tmp_path):
+    calls = []
+
+    def compute(name):
+        calls.append(name)
+        return name.upper()
+
+    checkpoint = RunCheckpoint(str(tmp_path))
+    assert checkpoint.stage("loop1/test", lambda: compute("loop1/test")) == "LOOP1/TEST"
+    with pytest.raises(Crash):
+        checkpoint.stage("loop1/train", crash)
+    assert checkpoint.last_stage() == "loop1/test"
+
+    resumed = RunCheckpoint(str(tmp_path))
+    assert resumed.stage("loop1/test", lambda: compute("again")) == "LOOP1/TEST"
+    assert resumed.stage("loop1/train", lambda: compute("loop1/train")) == "LOOP1/TRAIN"
+    assert calls == ["loop1/test", "loop1/train"]
+
+
+def test_tracked_state_is_restored_with_its_stage(tmp_path):
+    def judge(memo, output):
+        memo.put("judge", 10, "q", output, {"correctness": "correct"})
+        return output
+
+    memo = VerdictMemo()
+    checkpoint = RunCheckpoint(str(tmp_path))
+    checkpoint.track(memo=memo, sampler=None)
+    checkpoint.stage("loop1/a", lambda: judge(memo, "a"))
+    checkpoint.stage("loop1/b", lambda: judge(memo, "b"))
+    with pytest.raises(Crash):
+        checkpoint.stage("loop1/c", crash)
+
+    fresh = VerdictMemo()
+    resumed = RunCheckpoint(str(tmp_path))
+    resumed.track(memo=fresh)
+    resumed.stage("loop1/a", crash)
+    assert fresh.get("judge", 10, "q", "b") is None  # restored only once replay reaches the last stage
+    resumed.stage("loop1/b", crash)
+    assert fresh.get("judge", 10, "q", "a") == {"correctness": "correct"}
+    assert fresh.get("judge", 10, "q", "b") == {"correctness": "correct"}
+
+
+def test_start_refuses_other_inputs_or_settings(tmp_path):
+    RunCheckpoint(str(tmp_path)).start(inputs(), kind="optimize_loop", num_rules=10, loops=5)
+    RunCheckpoint(str(tmp_path)).start(inputs(), kind="optimize_loop", num_rules=10, loops=5)
+
+    with pytest.raises(ValueError, match="inputs"):
+        RunCheckpoint(str(tmp_path)).start(inputs(rows=4), kind="optimize_loop", num_rules=10, loops=5)
+    with pytest.raises(ValueError, match="num_rules"):
+        RunCheckpoint(str(tmp_path)).start(inputs(), kind="optimize_loop", num_rules=50, loops=5)
+
+
+def test_start_checks_runs_checkpointed_without_a_fingerprint(tmp_path):
+    checkpoint = RunCheckpoint(str(tmp_path))
+    checkpoint.set_info(kind="optimize_loop", num_rules=10)
+    checkpoint.stage("inputs", inputs)
+    with pytest.raises(ValueError, match="inputs"):
+        RunCheckpoint(str(tmp_path)).start(inputs(rows=4), kind="optimize_loop", num_rules=10)
+
+
+def test_fingerprint_depends_on_content_not_identity():
+    assert fingerprint(inputs()) == fingerprint(inputs())
+    changed = inputs()
+    changed["train_set"].loc[0, "input"] = "other"
+    assert fingerprint(changed) != fingerprint(inputs())
@@ -0,0 +1,47 @@
+import pandas as pd
+
+from prompt_learning.feedback_packing import count_tokens, pack_feedback, violation_set
+
+COLUMNS = ["correctness", "explanation", "rule_violations"]
+
+
+def dataset():
+    return pd.DataFrame({
+        "output": ["o" * 400, "o" * 40, "o" * 400, "o" * 40, "o" * 40],
+        "correctness": ["incorrect", "incorrect", "incorrect", "correct", "incorrect"],
+        "explanation": ["bad", "bad", "bad", "good", "bad"],
+        "rule_violations": ["Rule A\nRule A", "Rule A", "Rule B", "", "Rule A\nRule B"],
+    })
+
+
+def test_violation_set_ignores_bullets_and_duplicates():
+    assert violation_set("- Rule A\n* Rule A\n\nRule B") == frozenset({"Rule A", "Rule B"})
+    assert violation_set(None) == frozenset()
+
+
+def test_large_budget_keeps_every_row_with_deduped_violations():
+    packed, stats = pack_feedback(dataset(), COLUMNS, token_budget=10_000)
+    assert packed.index.tolist() == [0, 1, 2, 3, 4]
+    assert packed.loc[0, "rule_violations"] == "Rule A"
+    assert stats["clusters"] == 4
+
+
+def test_budget_picks_one_cheap_representative_per_cluster_first():
+    row_cost = {i: sum(count_tokens(dataset().loc[i, c]) for c in ["output"] + COLUMNS) for i in range(5)}
+    budget = row_cost[1] + row_cost[2] + row_cost[3] + row_cost[4]
+    packed, stats = pack_feedback(dataset(), COLUMNS, token_budget=budget)
+    # Row 0 shares row 1's cluster and costs more
+    assert packed.index.tolist() == [1, 2, 3, 4]
+    assert stats["tokens"] <= budget
+
+
+def test_no_row_fits_keeps_the_cheapest_failing_row():
+    packed, stats = pack_feedback(dataset(), COLUMNS, token_budget=1)
+    assert packed.index.tolist() == [1]
+    assert stats["rows_out"] == 1
+
+
+def test_no_failures_keeps_the_cheapest_row():
+    passing = dataset().assign(correctness="correct")
+    packed, _ = pack_feedback(passing, COLUMNS, token_budget=1)
+    assert len(packed) == 1
@@ -0,0 +1,56 @@
+import json
+import os
+
+import pandas as pd
+
+from prompt_learning import core
+
+REPO = os.path.join(os.path.dirname(__file__), "..")
+
+
+def test_parser_fills_all_three_columns():
+    response = json.dumps({
+        "correctness": "incorrect",
+        "explanation": "No footer.",
+        "rule_violations": ["Add a footer", "Use a hero image"],
+    })
+    assert core.fused_judge_parser(response, 0) == {
+        "correctness": "incorrect",
+        "explanation": "No footer.",
+        "rule_violations": "Add a footer\nUse a hero image",
+    }
+
+
+def test_parser_returns_empty_violations_for_correct_pages():
+    response = json.dumps({"correctness": "correct", "explanation": "Fine.", "rule_violations": []})
+    assert core.fused_judge_parser(response, 0)["rule_violations"] == ""
+
+
+def test_unparseable_response_leaves_every_column_empty():
+    assert core.fused_judge_parser("not json", 0) == {
+        "correctness": None, "explanation": None, "rule_violations": None
+    }
+
+
+def test_fused_judge_returns_its_columns_in_one_call(monkeypatch):
+    monkeypatch.chdir(REPO)
+    monkeypatch.setattr(core, "USE_LOCAL_RULE_ENGINE", False)
+    calls = []
+
+    def run_judge(dataframe, template, output_parser, judge="judge"):
+        calls.append(template)
+        responses = [
+            json.dumps({"correctness": "correct", "explanation": "ok", "rule_violations": []}),
+            json.dumps({"correctness": "incorrect", "explanation": "bad", "rule_violations": ["Rule A"]}),
+        ]
+        return pd.DataFrame([output_parser(r, i) for i, r in enumerate(responses)], index=dataframe.index)
+
+    monkeypatch.setattr(core, "run_judge", run_judge)
+    dataset = pd.DataFrame({"input": ["a", "b"], "output": ["{}", "{}"]}, index=[5, 9])
+    judged, columns = core.fused_judge(dataset, num_rules=10)
+
+    assert len(calls) == 1 and "rule_violations" in calls[0]
+    assert columns == ["correctness", "explanation", "rule_violations"]
+    assert judged.loc[5, ["correctness", "rule_violations"]].tolist() == ["correct", ""]
+    assert judged.loc[9, ["correctness", "explanation", "rule_violations"]].tolist() == ["incorrect", "bad", "Rule A"]
+    assert "correctness" not in dataset.columns
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from prompt_learning.incremental_eval import VerdictMemo
+
+
+def dataset(outputs):
+    return pd.DataFrame({"input": [f"q{i}" for i in range(len(outputs))], "output": outputs})
+
+
+def counting_evaluator(calls):
+    def evaluator(batch):
+        calls.append(len(batch))
+        batch = batch.copy()
+        batch["correctness"] = ["correct" if "good" in o else "incorrect" for o in batch["output"]]
+        batch["explanation"] = "judged"
+        return batch, ["correctness", "explanation"]
+    return evaluator
+
+
+def test_only_changed_rows_are_judged_again():
+    memo, calls = VerdictMemo(), []
+    evaluate = memo.wrap("judge", counting_evaluator(calls), num_rules=10)
+    evaluate(dataset(["good a", "bad b", "good c"]))
+    result, columns = evaluate(dataset(["good a", "good b", "good c"]))
+    assert calls == [3, 1]
+    assert columns == ["correctness", "explanation"]
+    assert result["correctness"].tolist() == ["correct"] * 3
+    assert memo.stats()["reused"] == 2
+
+
+def test_rule_count_is_part_of_the_key():
+    memo, calls = VerdictMemo(), []
+    memo.wrap("judge", counting_evaluator(calls), num_rules=10)(dataset(["good a"]))
+    memo.wrap("judge", counting_evaluator(calls), num_rules=50)(dataset(["good a"]))
+    assert calls == [1, 1]
+
+
+def test_memo_filled_through_bind_serves_wrap():
+    memo, calls = VerdictMemo(), []
+    bound = memo.bind("judge", 10)
+    bound.put({"input": "q0", "output": "good a"}, {"correctness": "correct", "explanation": "ok"})
+    result, columns = memo.wrap("judge", counting_evaluator(calls), num_rules=10)(dataset(["good a"]))
+    assert calls == []
+    assert columns == ["correctness", "explanation"]
+    assert result["explanation"].tolist() == ["ok"]
+
+
+def test_failed_verdicts_are_not_remembered():
+    memo = VerdictMemo()
+    memo.put("judge", 10, "q0", "a", {"correctness": None, "explanation": None})
+    assert memo.get("judge", 10, "q0", "a") is None
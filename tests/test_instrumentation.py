@@ -0,0 +1,105 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from prompt_learning.instrumentation import UNSTAGED, Tracer, estimate_cost
+from prompt_learning.llm_client import trace_client
+
+
+def test_requests_are_aggregated_per_model_and_stage():
+    tracer = Tracer()
+    with tracer.span("optimize"):
+        tracer.record_request("gpt-4o", 0.3, prompt_tokens=1000, completion_tokens=200)
+        tracer.record_request("gpt-4o", 1.5, rate_limited=True, error="RateLimitError")
+    tracer.record_request("gpt-4o-mini", 0.1, prompt_tokens=10)
+
+    summary = tracer.summary()
+    model = summary["models"]["gpt-4o"]
+    assert (model["requests"], model["rate_limited"], model["errors"]) == (2, 1, 0)
+    assert model["prompt_tokens"] == 1000
+    assert model["latency_histogram"]["<=0.5s"] == 1
+    assert sum(model["latency_histogram"].values()) == 1  # failed requests have no latency
+
+    optimize = summary["stages"]["optimize"]
+    assert (optimize["count"], optimize["requests"], optimize["prompt_tokens"]) == (1, 2, 1000)
+    assert optimize["estimated_cost_usd"] == pytest.approx(estimate_cost("gpt-4o", 1000, 200))
+    assert summary["stages"][UNSTAGED]["requests"] == 1
+
+
+def test_summary_since_mark_only_counts_later_events():
+    tracer = Tracer()
+    tracer.record_request("gpt-4o", 1.0, prompt_tokens=5)
+    with tracer.span("a"):
+        pass
+    since = tracer.mark()
+    tracer.record_request("gpt-4o", 1.0, prompt_tokens=7)
+
+    summary = tracer.summary(since)
+    assert summary["models"]["gpt-4o"]["requests"] == 1
+    assert summary["models"]["gpt-4o"]["prompt_tokens"] == 7
+    assert "a" not in summary["stages"]
+
+
+def test_percentiles_are_within_a_bucket():
+    tracer = Tracer()
+    for i in range(1, 101):
+        tracer.record_request("gpt-4o", i / 100)
+    model = tracer.summary()["models"]["gpt-4o"]
+    assert 0.5 <= model["latency_p50"] <= 0.5 * 1.19 + 0.01
+    assert 0.95 <= model["latency_p95"] <= 0.95 * 1.19 + 0.01
+
+
+def test_memory_does_not_grow_with_events(tmp_path):
+    path = tmp_path / "events.jsonl"
+    tracer = Tracer(str(path))
+    sizes = []
+    for _ in range(1000):
+        with tracer.span("loop1/generation"):
+            tracer.record_request("gpt-4o", 0.2, prompt_tokens=3)
+        sizes.append(len(json.dumps(tracer.mark())))
+    assert sizes[-1] - sizes[0] < 50  # only the counter digits grow
+    assert len(path.read_text().splitlines()) == 2000  # raw events still go to the file
+
+
+def fake_client(create):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def response(prompt_tokens):
+    return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=1,
+                                                 prompt_tokens_details=None))
+
+
+def test_trace_client_records_sync_and_async_requests():
+    tracer = Tracer()
+
+    async def acreate(**kwargs):
+        return response(20)
+
+    sync_client = fake_client(lambda **kwargs: response(10))
+    async_client = fake_client(acreate)
+    assert trace_client(sync_client, tracer)
+    assert trace_client(async_client, tracer, "gpt-4o-mini")
+    assert not trace_client(object(), tracer)
+
+    sync_client.chat.completions.create(model="gpt-4o", messages=[])
+    asyncio.run(async_client.chat.completions.create(model="ignored", messages=[]))
+
+    models = tracer.summary()["models"]
+    assert models["gpt-4o"]["prompt_tokens"] == 10
+    assert models["gpt-4o-mini"]["prompt_tokens"] == 20
+
+
+def test_trace_client_records_failures():
+    tracer = Tracer()
+
+    def create(**kwargs):
+        raise ValueError("boom")
+
+    client = fake_client(create)
+    trace_client(client, tracer)
+    with pytest.raises(ValueError):
+        client.chat.completions.create(model="gpt-4o")
+    assert tracer.summary()["models"]["gpt-4o"]["errors"] == 1
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import pandas as pd
+
+from prompt_learning.judge_cascade import JudgeCascade, cascade_stats
+from prompt_learning.rule_sharding import shard_template
+
+
+class CheapJudge:
+    """Says "correct" with the confidence found in the row's output."""
+
+    async def _async_generate(self, prompt, instruction=None):
+        assert '"confidence"' in prompt
+        confidence = float(prompt.split("confidence=")[1].split()[0])
+        return json.dumps({"correctness": "correct", "explanation": "cheap", "confidence": confidence})
+
+
+def parse(response, index):
+    data = json.loads(response)
+    return {"correctness": data["correctness"], "explanation": data["explanation"]}
+
+
+def cascade(audit_fraction=0.0):
+    return JudgeCascade(CheapJudge(), shard_template("Judge {output}", 0), parse, "test_cascade",
+                        threshold=0.8, audit_fraction=audit_fraction)
+
+
+def judge(cascade, confidence, row_id=0):
+    strong_calls = []
+
+    async def strong():
+        strong_calls.append(row_id)
+        return {"correctness": "incorrect", "explanation": "strong"}
+
+    row = {"input": f"q{row_id}", "output": f"confidence={confidence} page"}
+    verdict = asyncio.run(cascade.ajudge(row, row_id, strong))
+    return verdict, bool(strong_calls)
+
+
+def test_low_confidence_rows_escalate():
+    before = cascade_stats.snapshot()
+    verdict, escalated = judge(cascade(), 0.3)
+    assert escalated and verdict == {"correctness": "incorrect", "explanation": "strong"}
+
+    verdict, escalated = judge(cascade(), 0.95)
+    assert not escalated and verdict == {"correctness": "correct", "explanation": "cheap"}
+    counts = cascade_stats.since(before)["test_cascade"]
+    assert (counts["judged"], counts["escalated"], counts["audited"]) == (2, 1, 0)
+
+
+def test_audit_fraction_is_honoured_with_a_stable_sample():
+    judge_cascade = cascade(audit_fraction=0.25)
+    rows = [{"input": f"q{i}", "output": "o"} for i in range(2000)]
+    audited = [judge_cascade.route({"correctness": "correct", "confidence": 0.99}, row)[1] for row in rows]
+    assert 0.22 < sum(audited) / len(rows) < 0.28
+    # The same rows are audited every time
+    assert audited == [judge_cascade.route({"correctness": "correct", "confidence": 0.99}, row)[1] for row in rows]
+    assert not any(cascade().route({"correctness": "correct", "confidence": 0.99}, row)[1] for row in rows)
+
+
+def test_strong_verdict_wins_on_audited_rows_and_agreement_is_counted():
+    judge_cascade = cascade(audit_fraction=1.0)
+    before = cascade_stats.snapshot()
+    verdict, called = judge(judge_cascade, 0.99)
+    assert called and verdict["explanation"] == "strong"
+    counts = cascade_stats.since(before)["test_cascade"]
+    assert (counts["escalated"], counts["audited"], counts["agreed"]) == (0, 1, 0)
+
+
+def test_judge_frame_sends_only_selected_rows_to_the_strong_judge():
+    judge_cascade = cascade()
+    dataset = pd.DataFrame({"input": ["a", "b", "c"], "output": ["o"] * 3})
+    cheap = pd.DataFrame({"correctness": ["correct"] * 3, "explanation": ["cheap"] * 3,
+                          "confidence": [0.9, 0.1, None]})
+    sent = []
+
+    def strong(frame):
+        sent.extend(frame["input"])
+        return pd.DataFrame({"correctness": "incorrect", "explanation": "strong"}, index=frame.index)
+
+    result = judge_cascade.judge_frame(dataset, lambda *args: cheap, strong)
+    assert sent == ["b", "c"]
+    assert result["explanation"].tolist() == ["cheap", "strong", "strong"]
+    assert "confidence" not in result.columns
@@ -0,0 +1,64 @@
+from prompt_learning.judge_parsing import (
+    EVALUATE_OUTPUT_SCHEMA,
+    RULE_CHECKER_SCHEMA,
+    ParseStats,
+    parse_judge_response,
+)
+
+
+def parse(text, schema=EVALUATE_OUTPUT_SCHEMA):
+    return parse_judge_response(text, schema, "test")
+
+
+def test_valid_json_with_escaped_quotes():
+    values, status = parse('{"correctness": "Correct", "explanation": "uses \\"type\\" fields"}')
+    assert status == "ok"
+    assert values == {"correctness": "correct", "explanation": 'uses "type" fields'}
+
+
+def test_list_explanation_is_joined_one_item_per_line():
+    values, status = parse('{"correctness": "incorrect", "explanation": ["Rule A", "", "Rule B"]}')
+    assert (values["explanation"], status) == ("Rule A\nRule B", "ok")
+
+
+def test_fenced_response_with_trailing_comma_is_repaired():
+    text = 'Here you go:\n```json\n{"correctness": "incorrect", "explanation": "bad",}\n```'
+    values, status = parse(text)
+    assert status == "repaired"
+    assert values == {"correctness": "incorrect", "explanation": "bad"}
+
+
+def test_single_quotes_are_repaired():
+    values, status = parse("{'correctness': 'correct', 'explanation': 'fine'}")
+    assert (values["correctness"], status) == ("correct", "repaired")
+
+
+def test_fields_are_extracted_from_broken_json():
+    values, status = parse('{"correctness": "incorrect", "explanation": "missing brace"')
+    assert status == "repaired"
+    assert values == {"correctness": "incorrect", "explanation": "missing brace"}
+
+
+def test_top_level_list_of_strings_fills_the_only_text_field():
+    values, status = parse('["Rule A", "Rule B"]', RULE_CHECKER_SCHEMA)
+    assert (values["explanation"], status) == ("Rule A\nRule B", "repaired")
+
+
+def test_unknown_verdict_and_empty_responses_fail():
+    assert parse('{"correctness": "maybe", "explanation": "x"}') == (
+        {"correctness": None, "explanation": "x"}, "failed"
+    )
+    for text in (None, "", "   "):
+        assert parse(text) == ({"correctness": None, "explanation": None}, "failed")
+
+
+def test_parse_stats_since_snapshot():
+    stats = ParseStats()
+    stats.record("judge", "ok")
+    snapshot = stats.snapshot()
+    stats.record("judge", "failed")
+    stats.record("other", "repaired")
+    assert stats.since(snapshot) == {
+        "judge": {"ok": 0, "repaired": 0, "failed": 1},
+        "other": {"ok": 0, "repaired": 1, "failed": 0},
+    }
@@ -0,0 +1,81 @@
+import pytest
+
+from prompt_learning import llm_cache
+from prompt_learning.llm_cache import LLMResponseCache, cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return clock
+
+
+def test_key_covers_model_kwargs_instruction_and_prompt():
+    base = cache_key("gpt-4o", {"temperature": 0}, "prompt", "system")
+    assert base == cache_key("gpt-4o", {"temperature": 0}, "prompt", "system")
+    assert len({
+        base,
+        cache_key("gpt-4o-mini", {"temperature": 0}, "prompt", "system"),
+        cache_key("gpt-4o", {"temperature": 1}, "prompt", "system"),
+        cache_key("gpt-4o", {"temperature": 0}, "prompt", None),
+        cache_key("gpt-4o", {"temperature": 0}, "other", "system"),
+    }) == 5
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"  # a is now more recently used than b
+    cache.set("c", "C")
+    assert len(cache) == 2
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+
+def test_limits_apply_while_the_cache_is_used(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+    for i in range(100):
+        cache.set(str(i), "x")
+    assert len(cache) == 10
+    assert cache.get("99") == "x" and cache.get("0") is None
+
+    cache = LLMResponseCache(str(tmp_path / "big.sqlite"), max_entries=1000)
+    for i in range(1050):
+        cache.set(str(i), "x")
+    assert len(cache) <= 1000 * 1.1
+
+
+def test_hits_are_written_in_batches(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    cache = LLMResponseCache(path)
+    cache.set("a", "A")
+    reader = LLMResponseCache(path)
+    written = reader._conn.execute("SELECT accessed FROM responses").fetchone()[0]
+    cache.get("a")
+    assert reader._conn.execute("SELECT accessed FROM responses").fetchone()[0] == written
+    cache.close()  # pending access times are flushed before evicting
+    assert reader._conn.execute("SELECT accessed FROM responses").fetchone()[0] > written
+
+
+def test_expired_entries_are_misses_and_evicted(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    cache = LLMResponseCache(path, max_age_seconds=10)
+    cache.set("old", "x")
+    assert cache.get("old") == "x"
+    clock.now += 100
+    assert cache.get("old") is None
+    cache.evict()
+    assert len(cache) == 0
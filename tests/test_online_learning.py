@@ -0,0 +1,60 @@
+import json
+
+from prompt_learning.instrumentation import Tracer
+from prompt_learning.online_learning import OnlinePromptLearner
+
+
+class FakeOptimizer:
+    def __init__(self, prompt, calls):
+        self.prompt = prompt
+        self.calls = calls
+
+    def optimize(self, dataset, output_column, feedback_columns=None, context_size_k=None):
+        self.calls.append(len(dataset))
+        return self.prompt + "!"
+
+
+def traces(n):
+    return [{"input": f"q{i}", "output": f"o{i}"} for i in range(n)]
+
+
+def test_updates_after_enough_new_failures_with_a_bounded_window():
+    tracer = Tracer()
+    calls = []
+
+    def judge(batch):
+        tracer.record_request("gpt-4o", 0.1, prompt_tokens=100)
+        batch = batch.copy()
+        batch["correctness"] = "incorrect"
+        batch["explanation"] = "broken"
+        return batch
+
+    learner = OnlinePromptLearner(
+        "prompt", tracer.wrap("online/judge", judge), lambda prompt: FakeOptimizer(prompt, calls),
+        batch_size=10, window_size=25, min_new_failures=20
+    )
+    marks = []
+    for _ in range(50):
+        learner.process_batch(traces(10))
+        marks.append(len(json.dumps(tracer.mark())))
+
+    assert learner.prompt == "prompt" + "!" * 25
+    assert calls[0] == 20 and set(calls[1:]) == {25}
+    assert len(learner.failures) == 25
+    assert marks[-1] - marks[1] < 50  # tracer counters, not events, are kept
+
+
+def test_human_labels_skip_the_judge():
+    judged = []
+
+    def judge(batch):
+        judged.append(len(batch))
+        batch = batch.copy()
+        batch["correctness"] = "correct"
+        return batch
+
+    learner = OnlinePromptLearner("prompt", judge, lambda prompt: FakeOptimizer(prompt, []), min_new_failures=5)
+    learner.process_batch([{"input": "a", "output": "b", "correctness": "incorrect"}, {"input": "c", "output": "d"}])
+    assert judged == [1]
+    assert learner.stats()["human_labeled"] == 1
+    assert learner.stats()["failures"] == 1
@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+from prompt_learning import parallel_runner
+from prompt_learning.llm_cache import LLMResponseCache
+from prompt_learning.parallel_runner import experiment_grid, split_quota
+
+
+def test_grid_keys_match_the_sequential_runner():
+    assert [spec["key"] for spec in experiment_grid([10, 50])] == ["10_rules", "50_rules"]
+    keys = [spec["key"] for spec in experiment_grid([10], seeds=(1, 2), scorers=("f1",))]
+    assert keys == ["10_rules_seed1_f1", "10_rules_seed2_f1"]
+
+
+def test_quota_is_split_between_workers():
+    assert split_quota({"gpt-4o": {"rpm": 500, "tpm": 3}}, 4) == {"gpt-4o": {"rpm": 125, "tpm": 1}}
+
+
+def test_each_experiment_gets_its_own_paths(monkeypatch):
+    monkeypatch.setattr(parallel_runner, "_CONFIGURED_PATHS", {})
+    run = SimpleNamespace(RESULTS_STORE_PATH="results", INSTRUMENTATION_PATH="trace.jsonl")
+
+    run.INSTRUMENTATION_PATH = parallel_runner._experiment_path(run, "INSTRUMENTATION_PATH", "10_rules")
+    assert run.INSTRUMENTATION_PATH == "trace-10_rules.jsonl"
+    # The next experiment in the same worker derives its path from the configured one, not the previous one
+    assert parallel_runner._experiment_path(run, "INSTRUMENTATION_PATH", "50_rules") == "trace-50_rules.jsonl"
+    assert parallel_runner._experiment_path(run, "RESULTS_STORE_PATH", "50_rules", directory=True) == "results/50_rules"
+    run.RESULTS_STORE_PATH = None
+    monkeypatch.setattr(parallel_runner, "_CONFIGURED_PATHS", {})
+    assert parallel_runner._experiment_path(run, "RESULTS_STORE_PATH", "50_rules", directory=True) is None
+
+
+def test_workers_share_one_response_cache(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    first, second = LLMResponseCache(path), LLMResponseCache(path)
+    first.set("key", "answer")
+    assert second.get("key") == "answer"
+    assert second._conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
@@ -0,0 +1,59 @@
+import json
+
+import pandas as pd
+
+from prompt_learning.pipeline import run_pipeline
+
+
+class FakeModel:
+    def __init__(self, respond):
+        self.respond = respond
+
+    async def _async_generate(self, prompt, instruction=None):
+        return self.respond(prompt)
+
+
+def parse(response, row_index):
+    return json.loads(response)
+
+
+def judge_response(prompt):
+    correct = "good" in prompt
+    return json.dumps({"correctness": "correct" if correct else "incorrect", "explanation": prompt})
+
+
+def run(dataset, judge=judge_response, **kwargs):
+    return run_pipeline(
+        dataset, "{input}", FakeModel(lambda prompt: f"output for {prompt}"), FakeModel(judge),
+        "judge {output}", parse, generation_workers=2, judge_workers=2, queue_size=2, **kwargs
+    )
+
+
+def test_rows_flow_from_generation_to_judging():
+    result = run(pd.DataFrame({"input": ["good a", "bad b", "good c"]}))
+    assert result["output"].tolist() == ["output for good a", "output for bad b", "output for good c"]
+    assert result["correctness"].tolist() == ["correct", "incorrect", "correct"]
+
+
+def test_duplicate_index_labels_keep_every_row():
+    dataset = pd.DataFrame({"input": ["good a", "bad b"]}, index=[7, 7])
+    result = run(dataset)
+    assert result.index.tolist() == [7, 7]
+    assert result["correctness"].tolist() == ["correct", "incorrect"]
+
+
+class ExplodingMemo:
+    def get(self, row):
+        if "boom" in row["input"]:
+            raise TypeError("unhashable type: 'list'")
+        return None
+
+    def put(self, row, verdict):
+        pass
+
+
+def test_a_failing_row_does_not_stop_the_pass():
+    dataset = pd.DataFrame({"input": ["boom"] * 3 + ["good a", "bad b"] * 5})
+    result = run(dataset, memo=ExplodingMemo())
+    assert result["correctness"].iloc[:3].isna().all()
+    assert result["correctness"].tolist()[3:] == ["correct", "incorrect"] * 5
@@ -0,0 +1,40 @@
+import glob
+import os
+import re
+
+import pytest
+
+from prompt_learning.prefix_cache import DATA_REFERENCE, split_template
+
+VARIABLE_RE = re.compile(r"\{([a-zA-Z_][a-zA-Z0-9_]*)\}")
+PROMPT_FILES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "prompts", "*.txt")))
+
+
+def test_prompt_files_are_found():
+    assert len(PROMPT_FILES) >= 9
+
+
+@pytest.mark.parametrize("path", PROMPT_FILES, ids=os.path.basename)
+def test_prompt_files_split_into_static_instruction_and_data_block(path):
+    with open(path) as f:
+        template = f.read()
+    instruction, row_template = split_template(template)
+
+    assert instruction is not None
+    assert VARIABLE_RE.findall(instruction) == []
+    assert DATA_REFERENCE in instruction
+    assert row_template.startswith("Here is the data:")
+    assert row_template.endswith("[END DATA]")
+    assert "output" in VARIABLE_RE.findall(row_template)
+    # Nothing is lost: every variable of the template is still rendered per row
+    assert set(VARIABLE_RE.findall(row_template)) == set(VARIABLE_RE.findall(template))
+
+
+def test_template_without_data_block_is_left_alone():
+    template = "Judge this page against the rules.\n{output}"
+    assert split_template(template) == (None, template)
+
+
+def test_variables_outside_the_data_block_keep_the_template_whole():
+    template = "Rules for {product}:\n[BEGIN DATA]\n{output}\n[END DATA]\nAnswer in JSON."
+    assert split_template(template) == (None, template)
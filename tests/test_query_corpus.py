@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from prompt_learning.query_corpus import QueryCorpus, _allocate
+
+
+def test_allocate_uses_largest_remainders():
+    assert _allocate({"a": 50, "b": 30, "c": 20}, 10) == {"a": 5, "b": 3, "c": 2}
+    counts = _allocate({"a": 1, "b": 1, "c": 1}, 2)
+    assert sum(counts.values()) == 2 and set(counts.values()) == {0, 1}
+    assert _allocate({"a": 3, "b": 1}, 0) == {"a": 3, "b": 1}  # 0 selects every row
+    assert _allocate({"a": 3, "b": 1}, 10) == {"a": 3, "b": 1}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    source = tmp_path / "queries.csv"
+    pd.DataFrame({
+        "input": [f"query {i}" for i in range(100)],
+        "kind": ["shop" if i % 4 else "blog" for i in range(100)],
+    }).to_csv(source, index=False)
+    return QueryCorpus(str(source), cache_dir=str(tmp_path / "cache"), chunk_rows=16)
+
+
+def test_split_is_seeded_disjoint_and_sized(corpus):
+    train, test = corpus.split_rows(40, 0.5, seed=1)
+    assert (len(train), len(test)) == (20, 20)
+    assert not set(train) & set(test)
+    again = corpus.split_rows(40, 0.5, seed=1)
+    assert list(train) == list(again[0]) and list(test) == list(again[1])
+    assert list(corpus.split_rows(40, 0.5, seed=2)[0]) != list(train)
+
+
+def test_stratified_split_keeps_the_shares(corpus):
+    train_set, test_set = corpus.split(40, 0.5, seed=3, stratify="kind")
+    assert (train_set["kind"] == "blog").sum() == 5
+    assert (test_set["kind"] == "blog").sum() == 5
+    assert train_set["input"].tolist() == [f"query {i}" for i in train_set.index]
+
+
+def test_corpus_is_cached_by_content_hash(corpus, tmp_path):
+    entry = corpus.fetch()
+    assert entry["rows"] == 100
+    (tmp_path / "queries.csv").unlink()  # the cached copy is enough from now on
+    reopened = QueryCorpus(corpus.source, cache_dir=str(tmp_path / "cache"))
+    assert reopened.content_hash == entry["content_hash"]
+    assert sum(len(chunk) for chunk in corpus.iter_chunks()) == 100
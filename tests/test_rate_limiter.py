@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from prompt_learning.rate_limiter import AdaptiveScheduler, ModelLimiter, TokenBucket
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class InternalServerError(Exception):
+    status_code = 500
+
+
+def test_limit_grows_additively_and_halves_on_429():
+    limiter = ModelLimiter(initial_concurrency=8, max_concurrency=64)
+    for _ in range(8):
+        limiter.in_flight += 1
+        limiter.release(0.1)
+    assert limiter.limit == pytest.approx(9, abs=0.1)  # about one more slot per window of successes
+
+    limiter.in_flight += 1
+    limiter.release(0.1, rate_limited=True)
+    assert limiter.limit == pytest.approx(4.5, abs=0.1)
+    assert limiter.stats()["rate_limited"] == 1
+
+
+def test_limit_stays_within_bounds():
+    limiter = ModelLimiter(min_concurrency=2, max_concurrency=4, initial_concurrency=3)
+    for _ in range(10):
+        limiter.in_flight += 1
+        limiter.release(0.1, rate_limited=True)
+    assert limiter.limit == 2
+    for _ in range(100):
+        limiter.in_flight += 1
+        limiter.release(0.1)
+    assert limiter.limit == 4
+
+
+def test_slow_calls_shrink_the_limit():
+    limiter = ModelLimiter(initial_concurrency=10, latency_target=1.0)
+    limiter.in_flight += 1
+    limiter.release(2.0)
+    assert limiter.limit == pytest.approx(9)
+
+
+def test_token_bucket_refuses_and_reports_the_wait():
+    bucket = TokenBucket(60)
+    assert bucket.try_take(60) == 0.0
+    assert bucket.try_take(1) == pytest.approx(1.0, abs=0.05)
+    bucket.give_back(10)
+    assert bucket.try_take(10) == 0.0
+
+
+def test_slot_releases_and_counts_rate_limits():
+    scheduler = AdaptiveScheduler(initial_concurrency=4)
+
+    async def run():
+        async with scheduler.slot("gpt-4o", "hello") as usage:
+            usage["prompt_tokens"] = 5
+        with pytest.raises(RateLimitError):
+            async with scheduler.slot("gpt-4o", "hello"):
+                raise RateLimitError()
+
+    asyncio.run(run())
+    limiter = scheduler.limiter("gpt-4o")
+    assert limiter.in_flight == 0
+    assert limiter.stats()["completed"] == 1 and limiter.stats()["rate_limited"] == 1
+    assert limiter.stats()["prompt_tokens"] == 5
+
+
+def test_in_flight_requests_never_exceed_the_limit():
+    scheduler = AdaptiveScheduler(max_concurrency=3, initial_concurrency=3)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with scheduler.slot("gpt-4o", "x"):
+            peak = max(peak, scheduler.limiter("gpt-4o").in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(12)))
+
+    asyncio.run(run())
+    assert peak == 3
+
+
+@pytest.mark.parametrize("error, shrinks", [
+    (InternalServerError(), True),
+    (TimeoutError(), True),
+    (ConnectionResetError(), True),
+    (ValueError("bad response"), False),
+])
+def test_failed_calls_never_grow_the_limit(error, shrinks):
+    scheduler = AdaptiveScheduler(initial_concurrency=8)
+
+    async def run():
+        for _ in range(20):
+            with pytest.raises(type(error)):
+                async with scheduler.slot("gpt-4o", "x"):
+                    raise error
+
+    asyncio.run(run())
+    stats = scheduler.limiter("gpt-4o").stats()
+    assert (stats["completed"], stats["rate_limited"], stats["errors"]) == (0, 0, 20)
+    assert stats["ewma_latency"] is None
+    assert (stats["concurrency_limit"] < 8) if shrinks else (stats["concurrency_limit"] == 8)
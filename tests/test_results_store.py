@@ -0,0 +1,33 @@
+import pandas as pd
+
+from prompt_learning.results_store import ResultsStore
+
+
+def evaluated(correctness):
+    return pd.DataFrame({
+        "input": ["q0", "q1"],
+        "output": ["o0", "o1"],
+        "correctness": correctness,
+        "explanation": ["e0", "e1"],
+    })
+
+
+def test_iterations_round_trip_through_the_store(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    store.append_iteration("exp/1", 0, evaluated(["correct", "incorrect"]), "prompt 0", 0.5)
+    store.append_iteration("exp/1", 1, evaluated(["correct", "correct"]), "prompt 1", 1.0)
+
+    frames = store.frames("exp/1")
+    assert len(frames) == 2
+    assert frames[-1]["correctness"].tolist() == ["correct", "correct"]
+    assert frames[0]["input"].tolist() == ["q0", "q1"]
+    assert store.prompts("exp/1")["metric"].tolist() == [0.5, 1.0]
+    assert frames.to_json_ref()["iterations"] == 2
+
+
+def test_scan_reads_only_the_requested_columns(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    store.append_iteration("a", 0, evaluated(["correct", "incorrect"]), "p")
+    scanned = store.scan(columns=["correctness"])
+    assert list(scanned.columns) == ["experiment", "iteration", "row_id", "input", "correctness"]
+    assert len(scanned) == 2
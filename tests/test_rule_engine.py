@@ -0,0 +1,64 @@
+import json
+import math
+
+from prompt_learning.rule_engine import RuleEngine
+
+JSON_RULE = "Always return valid JSON—no trailing commas, unmatched braces, or comments."
+SECTION_RULE = (
+    'Every section object requires a "type" field drawn from a fixed vocabulary '
+    "(header, text, image, productGrid, gallery, form, button, footer, embed)."
+)
+LINK_RULE = "Internal links must start with /; external links with http."
+RESIDUAL_RULE = "Match the tone of the user's request."
+
+
+def engine():
+    return RuleEngine([JSON_RULE, SECTION_RULE, LINK_RULE, RESIDUAL_RULE])
+
+
+def page(**fields):
+    return json.dumps({"page": {"title": "Home", **fields}})
+
+
+def test_residual_rules_are_left_for_the_judge():
+    assert engine().residual_rules == [RESIDUAL_RULE]
+    assert engine().checked_rules == [JSON_RULE, SECTION_RULE, LINK_RULE]
+
+
+def test_valid_page_has_no_violations():
+    output = page(sections=[{"type": "text", "content": "Hi", "link": "/about"}])
+    assert engine().check(output) == {"valid_json": True, "violations": []}
+
+
+def test_invalid_json_breaks_the_json_rule():
+    assert engine().check('{"page": {"title": "Home",}}') == {"valid_json": False, "violations": [JSON_RULE]}
+
+
+def test_non_string_outputs_are_invalid_json():
+    for output in (None, math.nan, 3, ["page"]):
+        assert engine().check(output) == {"valid_json": False, "violations": [JSON_RULE]}
+
+
+def test_parsed_page_is_checked():
+    assert engine().check({"page": {"sections": [{"type": "video"}]}})["violations"] == [SECTION_RULE]
+
+
+def test_unhashable_section_type_is_a_violation():
+    output = json.dumps({"page": {"sections": [{"type": ["text"]}, {"type": {"name": "text"}}]}})
+    assert engine().check(output)["violations"] == [SECTION_RULE]
+
+
+def test_missing_section_type_is_a_violation():
+    assert engine().check(page(sections=[{"content": "Hi"}]))["violations"] == [SECTION_RULE]
+
+
+def test_link_prefixes():
+    for link in ("/about", "https://example.com", "http://example.com", "mailto:a@b.co", "tel:+15550100", "#top"):
+        assert engine().check(page(sections=[{"type": "text", "link": link}]))["violations"] == [], link
+    assert engine().check(page(sections=[{"type": "text", "link": "about"}]))["violations"] == [LINK_RULE]
+
+
+def test_evaluate_produces_evaluator_columns():
+    columns = engine().evaluate([page(sections=[{"type": "text"}]), "not json"])
+    assert columns["correctness"] == ["correct", "incorrect"]
+    assert columns["rule_violations"] == ["", JSON_RULE]
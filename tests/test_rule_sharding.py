@@ -0,0 +1,54 @@
+import json
+
+import pandas as pd
+
+from prompt_learning.rule_sharding import judge_sharded, merge_verdicts, shard_template
+
+RULES = [
+    "Every page needs a title of at most sixty characters for search results.",
+    "Internal links must start with a slash so they resolve on every host name.",
+    "Images require alt text describing the picture for screen reader users.",
+    "Use the brand colors only for buttons and never for long passages of body text.",
+]
+TEMPLATE = "Judge {output}\n[BEGIN RULE SET]\n************\n" + "\n\n".join(RULES) + "\n************\n[END RULE SET]"
+
+
+def shards():
+    return shard_template(TEMPLATE, 2)
+
+
+def test_rule_set_is_split_into_equal_shards():
+    assert [shard["rules"] for shard in shards()] == [RULES[:2], RULES[2:]]
+    assert RULES[3] not in shards()[0]["template"]
+    assert shard_template(TEMPLATE, 0) == [{"rules": None, "template": TEMPLATE, "instruction": None}]
+
+
+def test_conflicting_shard_verdicts_merge_to_incorrect():
+    merged = merge_verdicts([
+        {"correctness": "correct", "explanation": "all good", "rule_violations": ""},
+        {"correctness": "incorrect", "explanation": "no alt text",
+         "rule_violations": "- Images require alt text describing the picture for screen reader users"},
+    ], shards())
+    assert merged == {"correctness": "incorrect", "explanation": "no alt text", "rule_violations": RULES[2]}
+
+
+def test_failed_shard_makes_an_otherwise_correct_row_unknown():
+    merged = merge_verdicts([{"correctness": "correct", "explanation": "fine", "rule_violations": ""}, {}], shards())
+    assert merged == {"correctness": None, "explanation": "fine", "rule_violations": None}
+
+    # A violation found by another shard still decides the row
+    merged = merge_verdicts([{}, {"correctness": "incorrect", "explanation": "x", "rule_violations": "made up"}], shards())
+    assert (merged["correctness"], merged["rule_violations"]) == ("incorrect", "made up")
+
+
+class FakeJudge:
+    async def _async_generate(self, prompt, instruction=None):
+        verdict = "incorrect" if "bad" in prompt else "correct"
+        return json.dumps({"correctness": verdict, "explanation": prompt.split()[1]})
+
+
+def test_judge_sharded_keeps_rows_with_repeated_index_labels():
+    dataset = pd.DataFrame({"output": ["good-a", "bad-b", "good-c"]}, index=[0, 0, 1])
+    columns = judge_sharded(dataset, shards(), FakeJudge(), lambda response, index: json.loads(response), workers=2)
+    assert columns["correctness"] == ["correct", "incorrect", "correct"]
+    assert columns["explanation"] == ["good-a good-a", "bad-b bad-b", "good-c good-c"]
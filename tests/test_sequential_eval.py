@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+
+from prompt_learning.sequential_eval import bayes_interval, beta_cdf, beta_ppf, sequential_evaluate, wilson_interval
+
+
+def test_wilson_interval_matches_the_closed_form():
+    low, high = wilson_interval(18, 20)
+    assert low == pytest.approx(0.6990, abs=1e-4)
+    assert high == pytest.approx(0.9721, abs=1e-4)
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+
+
+def test_beta_cdf_matches_closed_forms():
+    # I_x(2, 5) = 1 - (1 - x)^6 - 6x(1 - x)^5
+    assert beta_cdf(0.3, 2, 5) == pytest.approx(1 - 0.7 ** 6 - 6 * 0.3 * 0.7 ** 5)
+    assert beta_cdf(0.9, 5, 2) == pytest.approx(1 - beta_cdf(0.1, 2, 5))
+    assert beta_ppf(0.5, 40, 40) == pytest.approx(0.5)
+
+
+def test_bayes_interval_with_all_failures_or_successes():
+    # Beta(1, n + 1) has quantile 1 - (1 - q)^(1 / (n + 1))
+    low, high = bayes_interval(0, 50)
+    assert low == pytest.approx(1 - 0.975 ** (1 / 51))
+    assert high == pytest.approx(1 - 0.025 ** (1 / 51))
+    assert bayes_interval(50, 50) == pytest.approx((1 - high, 1 - low))
+
+
+def evaluate_batch(correct):
+    def evaluate(batch):
+        batch = batch.copy()
+        batch["output"] = "o"
+        batch["correctness"] = ["correct" if correct(i) else "incorrect" for i in batch.index]
+        batch["explanation"] = ""
+        return batch
+    return evaluate
+
+
+@pytest.mark.parametrize("method", ["wilson", "bayes"])
+def test_clear_results_stop_early(method):
+    dataset = pd.DataFrame({"input": range(500)})
+    _, info = sequential_evaluate(dataset, evaluate_batch(lambda i: True), threshold=0.5, method=method)
+    assert info["decision"] == "above"
+    assert info["rows_used"] == 20
+
+    _, info = sequential_evaluate(dataset, evaluate_batch(lambda i: False), threshold=0.5, method=method)
+    assert info["decision"] == "below"
+
+
+def test_borderline_results_score_every_row():
+    dataset = pd.DataFrame({"input": range(100)})
+    evaluated, info = sequential_evaluate(dataset, evaluate_batch(lambda i: i % 2 == 0), threshold=0.5)
+    assert info["rows_used"] == 100 and not info["stopped_early"]
+    assert evaluated["correctness"].notna().all()
+
+
+def test_non_proportion_scorers_evaluate_everything_at_once():
+    dataset = pd.DataFrame({"input": range(60)})
+    _, info = sequential_evaluate(dataset, evaluate_batch(lambda i: True), threshold=0.5, scorer="f1")
+    assert info["rows_used"] == 60 and info["decision"] is None
+
+
+def test_early_stop_marks_unscored_rows():
+    dataset = pd.DataFrame({"input": range(200)})
+    evaluated, info = sequential_evaluate(dataset, evaluate_batch(lambda i: True), threshold=0.5)
+    assert evaluated["scored"].sum() == info["rows_used"] < 200
+    assert evaluated.loc[~evaluated["scored"], "output"].isna().all()
+
+
+def test_optimize_loop_records_only_scored_test_rows(monkeypatch):
+    from prompt_learning import core
+
+    test_set = pd.DataFrame({"input": [f"q{i}" for i in range(40)], "output": ["previous"] * 40})
+
+    def early_stop(test_set, system_prompt, num_rules, scorer, threshold, memo=None):
+        evaluated, info = sequential_evaluate(test_set, evaluate_batch(lambda i: True), threshold)
+        return evaluated, info["estimate"], info
+
+    monkeypatch.setattr(core, "evaluate_test_set", early_stop)
+    result = core.optimize_loop(pd.DataFrame({"input": ["t"]}), test_set, "prompt", [], threshold=0.5, loops=1)
+
+    stored = result["raw"][0]
+    assert len(stored) == 20 and "scored" not in stored.columns
+    assert stored["output"].notna().all()
+    assert (test_set["output"] == "o").sum() == 20
+    assert (test_set["output"] == "previous").sum() == 20
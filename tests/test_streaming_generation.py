@@ -0,0 +1,51 @@
+import json
+
+from prompt_learning.streaming_generation import JsonStreamValidator, abort_verdict
+
+
+def feed(chunks, max_chars=None):
+    validator = JsonStreamValidator(max_chars)
+    for chunk in chunks:
+        reason = validator.feed(chunk)
+        if reason:
+            return reason
+    return validator.finish()
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_valid_json_passes_in_any_chunking():
+    text = json.dumps({"page": {"title": 'say "hi" {not a brace}', "sections": [{"n": -1.5e3, "ok": True}, None]}})
+    for size in (1, 3, 7, len(text)):
+        assert feed(chunked(text, size)) is None, size
+
+
+def test_unrecoverable_errors_abort_at_once():
+    assert feed(['{"a": [1, 2,', "]}"]) == "trailing comma before ']'"
+    assert feed(['{"a": [1}']) == "mismatched '}'"
+    assert feed(['{"a": 1} extra']) == "text after the end of the JSON object"
+    assert feed(["Sure! {"]) == "output does not start with a JSON object"
+    assert feed(['{"a": 1 // comment']) == "unexpected character '/' outside a JSON string"
+    assert feed(['{"a": "line\nbreak"}']) == "unescaped control character in a JSON string"
+
+
+def test_escaped_quote_split_across_chunks_stays_in_the_string():
+    assert feed(['{"a": "x\\', '"}', '"}']) is None
+
+
+def test_unfinished_object_fails_only_at_finish():
+    validator = JsonStreamValidator()
+    assert validator.feed('{"a": [1, 2') is None
+    assert validator.finish() == "output ended before the JSON object was closed"
+
+
+def test_size_cap():
+    assert feed(['{"a": "' + "x" * 50], max_chars=20) == "output exceeded 20 characters"
+
+
+def test_abort_verdict_marks_the_row_incorrect():
+    verdict = abort_verdict("mismatched '}'")
+    assert verdict["correctness"] == "incorrect"
+    assert "mismatched" in verdict["explanation"]
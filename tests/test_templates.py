@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+from prompt_learning.templates import compile_template, render_column, render_template, template_variables
+
+JUDGE = 'Input: {input}\nOutput: {output}\nAnswer as {"correctness": "correct"} for {input}'
+
+
+def test_json_braces_are_left_alone():
+    assert template_variables(JUDGE) == ["input", "output"]
+    assert render_template(JUDGE, {"input": "q", "output": "o"}) == (
+        'Input: q\nOutput: o\nAnswer as {"correctness": "correct"} for q'
+    )
+
+
+def test_missing_variables_stay_literal_unless_strict():
+    assert render_template("{a} and {b}", {"a": 1}) == "1 and {b}"
+    with pytest.raises(KeyError):
+        compile_template("{a} and {b}").render({"a": 1}, strict=True)
+
+
+def test_values_are_not_substituted_again():
+    assert render_template("{a}{b}", {"a": "{b}", "b": "x"}) == "{b}x"
+
+
+def test_render_column_matches_rendering_each_row():
+    dataset = pd.DataFrame({"input": ["q1", "q2"], "output": [None, 3]})
+    expected = [render_template(JUDGE, row) for row in dataset.to_dict("records")]
+    assert render_column(JUDGE, dataset) == expected
+    assert render_column(JUDGE, dataset.iloc[:0]) == []
+    assert render_column("{missing}", dataset) == ["{missing}", "{missing}"]
+    assert render_column("static", dataset) == ["static", "static"]
+
+
+def test_compiled_templates_are_cached():
+    assert compile_template(JUDGE) is compile_template(JUDGE)
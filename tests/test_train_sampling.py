@@ -0,0 +1,84 @@
+import pandas as pd
+
+from prompt_learning.train_sampling import FailureSampler
+
+
+def train_set(rows=20):
+    return pd.DataFrame({"input": [f"query {i}" for i in range(rows)]}, index=[f"q{i}" for i in range(rows)])
+
+
+def verdicts(frame, failing, violations=None):
+    evaluated = pd.DataFrame(
+        {"correctness": ["incorrect" if index in failing else "correct" for index in frame.index]},
+        index=frame.index
+    )
+    if violations is not None:
+        evaluated["rule_violations"] = [violations.get(index, "") for index in frame.index]
+    return evaluated
+
+
+def test_every_nth_loop_is_a_full_pass():
+    frame = train_set()
+    sampler = FailureSampler(batch_size=5, full_pass_every=3)
+
+    for loop in range(1, 10):
+        chosen = sampler.sample(frame, loop)
+        if loop % 3 == 0:
+            assert chosen == list(frame.index)
+        else:
+            assert len(chosen) == 5
+            assert set(chosen) <= set(frame.index)
+            # Chosen rows keep their train set order
+            assert chosen == [index for index in frame.index if index in chosen]
+
+
+def test_full_pass_can_be_turned_off_and_small_sets_are_used_whole():
+    frame = train_set()
+    sampler = FailureSampler(batch_size=5, full_pass_every=0)
+    assert all(len(sampler.sample(frame, loop)) == 5 for loop in range(1, 10))
+    assert FailureSampler(batch_size=20).sample(frame, 1) == list(frame.index)
+
+
+def test_sample_depends_only_on_seed_loop_and_verdicts():
+    frame = train_set()
+    first, second = FailureSampler(batch_size=5, seed=7), FailureSampler(batch_size=5, seed=7)
+    assert first.sample(frame, 1) == second.sample(frame, 1)
+    assert first.sample(frame, 1) != first.sample(frame, 2)
+
+
+def test_failing_rows_are_sampled_far_more_often():
+    frame = train_set()
+    failing = {"q1", "q4", "q9", "q15"}
+    sampler = FailureSampler(batch_size=5, full_pass_every=0, failure_weight=20.0)
+    sampler.update(verdicts(frame, failing))
+
+    counts = dict.fromkeys(frame.index, 0)
+    for loop in range(1, 401):
+        for index in sampler.sample(frame, loop):
+            counts[index] += 1
+    failing_rate = sum(counts[index] for index in failing) / (400 * len(failing))
+    passing_rate = sum(counts[index] for index in frame.index if index not in failing) / (400 * (len(frame) - len(failing)))
+    assert failing_rate > 0.7
+    assert passing_rate < 0.15
+
+
+def test_weights_favour_unseen_failed_and_unresolved_rows():
+    frame = train_set(4)
+    sampler = FailureSampler(batch_size=2, failure_weight=4.0, unresolved_weight=2.0, unseen_weight=3.0)
+    sampler.update(verdicts(
+        frame.iloc[:3], failing={"q0"},
+        violations={"q0": "- Use a hero image\n- Add a footer", "q1": "- Use a hero image"}
+    ))
+
+    unresolved = sampler.unresolved_rules()
+    assert unresolved == {"Use a hero image", "Add a footer"}
+    assert sampler.weight("q0", unresolved) == 1.0 + 4.0 + 2.0
+    assert sampler.weight("q1", unresolved) == 1.0 + 2.0
+    assert sampler.weight("q2", unresolved) == 1.0
+    assert sampler.weight("q3", unresolved) == 1.0 + 3.0
+    assert sampler.stats() == {"seen": 3, "failing": 1, "unresolved_rules": 2}
+
+    # Once q0 passes, nothing is failing and its rule no longer counts as unresolved
+    sampler.update(verdicts(frame.iloc[:1], failing=set()))
+    assert sampler.unresolved_rules() == set()
+    assert sampler.weight("q1", sampler.unresolved_rules()) == 1.0